@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Airline adapters: where each reward calendar lives, when it is ready and how to read it
+"""
+
+import logging
+import re
+from typing import Any, Dict, List, Optional, Pattern, Tuple, Type
+
+from availability_api import (
+    AVAILABILITY_URL_RE, availability_days, capture_json, parse_availability_json, replay_json,
+)
+from calendar_parser import (
+    CABIN_CODES, CALENDAR_DAY_SELECTOR, DEFAULT_GRAMMAR, EXTRACT_CALENDAR_JS, Calendar, CalendarGrammar,
+    parse_calendar_cells,
+)
+from metrics import span
+from models import FlightSearch, UnsupportedAirline
+from politeness import Blocked, CircuitOpen, check_blocked, check_challenge
+from readiness import COOKIE_REJECT_SELECTORS, AdaptiveTimeouts, dismiss_cookie_consent, wait_for_calendar_ready
+from refresh import content_hash
+
+logger = logging.getLogger(__name__)
+
+class AirlineAdapter:
+    """Base adapter: subclasses describe a site, the fetch paths are shared
+
+    Every adapter gets the same fast path (replay a known availability API
+    URL, else capture it from a page load that stops at the first byte)
+    and the same DOM fallback, so a new airline only declares its URLs,
+    selectors, labels and rate limit.
+    """
+    name: str = ""
+    base_url: str = ""
+    # Availability XHR the month page loads its data from
+    api_url_re: Pattern = AVAILABILITY_URL_RE
+    grammar: CalendarGrammar = DEFAULT_GRAMMAR
+    day_selector: str = CALENDAR_DAY_SELECTOR
+    consent_selectors: List[str] = COOKIE_REJECT_SELECTORS
+    # Starting searches per second for the site's host unless tracking.airline_rate_limits says otherwise
+    rate_limit: float = 1.0
+
+    def __init__(self, base_url: Optional[str] = None):
+        self.base_url = (base_url or self.base_url).rstrip("/")
+        # (origin, destination, month, year) -> captured availability API URL
+        self.api_urls: Dict[tuple, str] = {}
+
+    def month_url(self, search: FlightSearch) -> str:
+        raise NotImplementedError
+
+    def api_url(self, search: FlightSearch) -> Optional[str]:
+        """The availability API URL captured for this search, if any"""
+        return self.api_urls.get((search.origin, search.destination, search.month, search.year))
+
+    def parse_json(self, payload: Any) -> Calendar:
+        return parse_availability_json(payload, self.grammar.cabin_codes)
+
+    async def dismiss_consent(self, page) -> bool:
+        with span("consent", self.name):
+            return await dismiss_cookie_consent(page, selectors=self.consent_selectors)
+
+    async def wait_until_ready(self, page, timeouts: AdaptiveTimeouts) -> int:
+        with span("readiness", self.name):
+            return await wait_for_calendar_ready(page, timeouts, self.day_selector)
+
+    async def extract_cells(self, page) -> Dict[str, Any]:
+        """Every calendar cell's date and text, read in one evaluate call"""
+        with span("extract", self.name):
+            return await page.evaluate(EXTRACT_CALENDAR_JS, self.day_selector)
+
+    async def extract_dom(self, page) -> Calendar:
+        """Read every calendar cell in one evaluate call, then parse in one pass"""
+        extracted = await self.extract_cells(page)
+        with span("parse", self.name):
+            return parse_calendar_cells(extracted, self.grammar)
+
+    async def fetch_json_payload(self, page, search: FlightSearch, timeouts: AdaptiveTimeouts) -> Any:
+        """Replay a known availability API URL, or capture it from a page load"""
+        key = (search.origin, search.destination, search.month, search.year)
+        api_url = self.api_url(search)
+        if api_url:
+            try:
+                with span("replay", self.name):
+                    return await replay_json(page, api_url)
+            except (Blocked, CircuitOpen):
+                # The host refused us: falling back to a page load would just hit it again
+                raise
+            except Exception as e:
+                logger.info(f"Replaying {api_url} failed, capturing it again: {e}")
+                self.api_urls.pop(key, None)
+
+        # Navigation that stops as soon as the availability XHR answers
+        with span("capture", self.name):
+            payload, self.api_urls[key] = await timeouts.wait(
+                "availability_api",
+                lambda timeout: capture_json(page, self.month_url(search), self.api_url_re, timeout=timeout),
+            )
+        return payload
+
+    async def fetch_json(self, page, search: FlightSearch, timeouts: AdaptiveTimeouts) -> Calendar:
+        payload = await self.fetch_json_payload(page, search, timeouts)
+        with span("parse", self.name):
+            return self.parse_json(payload)
+
+    async def render_month(self, page, search: FlightSearch, timeouts: AdaptiveTimeouts) -> Dict[str, Any]:
+        """Load the month page, wait for the calendar and return its raw cells"""
+        url = self.month_url(search)
+        with span("goto", self.name):
+            response = await page.goto(url, wait_until="domcontentloaded")
+        check_blocked(response, url)
+        try:
+            await self.wait_until_ready(page, timeouts)
+        except Exception:
+            # A challenge page never grows calendar cells; report it as a block, not a timeout
+            check_challenge(await page.evaluate("() => document.body ? document.body.innerText : ''"), url)
+            raise
+        extracted = await self.extract_cells(page)
+        if not extracted["cells"]:
+            check_challenge(extracted["text"], url)
+        return extracted
+
+    async def fetch_month(self, page, search: FlightSearch, timeouts: AdaptiveTimeouts, fetch_mode: str = "api",
+                          known_hash: Optional[str] = None) -> Tuple[Optional[Calendar], str]:
+        """The month's calendar and a hash of its raw content
+
+        The calendar is None when the hash equals known_hash: the content
+        is what we already parsed and stored, so parsing is skipped.
+        Only the API's day list is hashed, not the envelope around it.
+        """
+        if fetch_mode == "api":
+            try:
+                payload = await self.fetch_json_payload(page, search, timeouts)
+                digest = "json:" + content_hash(availability_days(payload) or payload)
+                if digest == known_hash:
+                    return None, digest
+                with span("parse", self.name):
+                    return self.parse_json(payload), digest
+            except Blocked:
+                # Loading the full page instead would only hit the site harder
+                raise
+            except Exception as e:
+                logger.warning(f"{self.name} availability API capture failed, scraping the page instead: {e}")
+
+        extracted = await self.render_month(page, search, timeouts)
+        digest = "dom:" + content_hash(extracted)
+        if digest == known_hash:
+            return None, digest
+        with span("parse", self.name):
+            return parse_calendar_cells(extracted, self.grammar), digest
+
+ADAPTERS: Dict[str, Type[AirlineAdapter]] = {}
+
+def register(adapter: Type[AirlineAdapter]) -> Type[AirlineAdapter]:
+    """Class decorator adding an adapter to the registry under its name"""
+    ADAPTERS[adapter.name] = adapter
+    return adapter
+
+def get_adapter(name: str, base_url: Optional[str] = None) -> AirlineAdapter:
+    if name not in ADAPTERS:
+        raise UnsupportedAirline(f"No scraper for airline {name!r}")
+    return ADAPTERS[name](base_url)
+
+@register
+class VirginAtlanticAdapter(AirlineAdapter):
+    name = "virgin_atlantic"
+    base_url = "https://www.virginatlantic.com"
+
+    def month_url(self, search: FlightSearch) -> str:
+        return (f"{self.base_url}/reward-flight-finder/results/month?origin={search.origin}"
+                f"&destination={search.destination}&month={search.month}&year={search.year}")
+
+BRITISH_AIRWAYS_CABIN_CODES = {
+    **CABIN_CODES,
+    "world traveller": "economy",
+    "euro traveller": "economy",
+    "world traveller plus": "premium",
+    "club world": "business",
+    "club europe": "business",
+    "club suite": "business",
+    "club": "business",
+    "first": "first",
+}
+
+@register
+class BritishAirwaysAdapter(AirlineAdapter):
+    name = "british_airways"
+    base_url = "https://www.britishairways.com"
+    api_url_re = re.compile(r"/api/.*(?:reward|availability|calendar|redemption)", re.IGNORECASE)
+    grammar = CalendarGrammar(BRITISH_AIRWAYS_CABIN_CODES, units=("avios", "pts", "points"))
+    day_selector = "[data-date], .calendar-day, .reward-calendar__day"
+    # BA's consent banner is OneTrust
+    consent_selectors = ["#onetrust-reject-all-handler", *COOKIE_REJECT_SELECTORS]
+    rate_limit = 0.5
+
+    def month_url(self, search: FlightSearch) -> str:
+        return (f"{self.base_url}/travel/reward-flight-finder/public/en_gb?from={search.origin}"
+                f"&to={search.destination}&month={search.year}-{search.month:02d}&oneWay=true")
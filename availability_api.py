@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Capture the reward calendar's availability API response instead of scraping the rendered page
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+
+from calendar_parser import Calendar, CABIN_CODES, day_from_attribute, parse_points
+from politeness import check_blocked
+
+# XHR the month calendar loads its data from
+AVAILABILITY_URL_RE = re.compile(r"/api/.*(?:reward|availability|calendar)", re.IGNORECASE)
+
+# Blocked by the browser profiles; the calendar data needs none of them
+ANALYTICS_HOSTS_RE = re.compile(
+    r"google-analytics|googletagmanager|doubleclick|adobedtm|omtrdc|demdex|"
+    r"hotjar|facebook\.net|optimizely|quantummetric|newrelic|nr-data|bing\.com",
+    re.IGNORECASE,
+)
+
+DAY_LIST_KEYS = ("days", "calendar", "dates", "availability")
+CABIN_LIST_KEYS = ("cabins", "fares", "cabinPrices", "prices")
+CABIN_NAME_KEYS = ("cabinClass", "cabin", "cabinName", "name")
+POINTS_KEYS = ("points", "miles", "avios", "pointsPrice", "amount")
+
+def is_availability_response(response, url_pattern: Pattern = AVAILABILITY_URL_RE) -> bool:
+    # Matched whatever the status, so a throttled XHR fails fast instead of timing out
+    return url_pattern.search(response.url) is not None
+
+async def capture_json(page, url: str, url_pattern: Pattern = AVAILABILITY_URL_RE,
+                       timeout: float = 15000) -> Tuple[Any, str]:
+    """Load a page only until a JSON response matching url_pattern answers
+
+    Returns the payload and the API URL so later searches can replay it
+    without a page load.
+    """
+    async with page.expect_response(lambda r: is_availability_response(r, url_pattern), timeout=timeout) as info:
+        check_blocked(await page.goto(url, wait_until="commit"), url)
+    response = await info.value
+    check_blocked(response)
+    if not response.ok:
+        raise RuntimeError(f"Availability API returned {response.status}")
+    return await response.json(), response.url
+
+async def replay_json(page, api_url: str, timeout: float = 10000) -> Any:
+    """Call a previously captured API URL directly with the page's cookies"""
+    response = await page.request.get(api_url, timeout=timeout)
+    check_blocked(response, api_url)
+    if not response.ok:
+        raise RuntimeError(f"Availability API returned {response.status}")
+    return await response.json()
+
+def _first(item: Dict[str, Any], keys) -> Any:
+    for key in keys:
+        if key in item:
+            return item[key]
+    return None
+
+def _find_day_list(payload: Any) -> Optional[List[Dict[str, Any]]]:
+    """Locate the list of day objects, wherever the API nests it"""
+    if isinstance(payload, list):
+        if payload and all(isinstance(item, dict) and "date" in item for item in payload):
+            return payload
+        for item in payload:
+            found = _find_day_list(item)
+            if found is not None:
+                return found
+    elif isinstance(payload, dict):
+        for key in DAY_LIST_KEYS:
+            if key in payload:
+                found = _find_day_list(payload[key])
+                if found is not None:
+                    return found
+        for value in payload.values():
+            if isinstance(value, (dict, list)):
+                found = _find_day_list(value)
+                if found is not None:
+                    return found
+    return None
+
+def availability_days(payload: Any) -> Optional[List[Dict[str, Any]]]:
+    """The day objects of a payload without the envelope around them (request ids, timestamps)"""
+    return _find_day_list(payload)
+
+def _json_cabin_code(name: str, cabin_codes: Dict[str, str]) -> Optional[str]:
+    return cabin_codes.get(" ".join(str(name).replace("_", " ").lower().split()))
+
+def _points(value: Any) -> int:
+    """Points as the API sent them: a number, or a display string such as '47,500' or '47.5k'"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    return parse_points(str(value))
+
+def parse_availability_json(payload: Any, cabin_codes: Dict[str, str] = CABIN_CODES) -> Calendar:
+    """Turn an availability API payload into day -> cabin -> points"""
+    days = _find_day_list(payload)
+    if days is None:
+        raise ValueError("No calendar days found in availability response")
+
+    calendar: Calendar = {}
+    for entry in days:
+        day = day_from_attribute(entry.get("date"))
+        if day is None:
+            continue
+        cabins = calendar.setdefault(day, {})
+        for fare in _first(entry, CABIN_LIST_KEYS) or []:
+            cabin = _json_cabin_code(_first(fare, CABIN_NAME_KEYS) or "", cabin_codes)
+            if cabin is None:
+                continue
+            points = _first(fare, POINTS_KEYS)
+            available = fare.get("available", points is not None)
+            cabins[cabin] = _points(points) if available and points is not None else None
+    return calendar
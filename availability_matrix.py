@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Columnar availability matrix: latest points per route, cabin and day in flat arrays, memory-mappable
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import load_config
+from storage import BASE_DIR, DB_PATH, AvailabilityStore
+
+MAGIC = b"RSAM"
+VERSION = 1
+# magic, version, index length; the JSON index follows, then the columns
+HEADER = struct.Struct("<4sHxxI")
+ALIGN = 8
+
+# Points column value for days without a bookable price, so argmin never picks them
+NO_POINTS = 2 ** 31 - 1
+# Column dtypes as stored on disk, whatever the host byte order
+POINTS_DTYPE = np.dtype("<i4")
+SEATS_DTYPE = np.dtype("u1")
+# Seats column values
+SEATS_UNKNOWN = 0
+SEATS_NONE = 1
+SEATS_AVAILABLE = 2
+
+# (airline, origin, destination)
+RouteKey = Tuple[str, str, str]
+
+def route_label(route: RouteKey) -> str:
+    airline, origin, destination = route
+    return f"{airline}:{origin}-{destination}"
+
+class AvailabilityMatrix:
+    """One int32 points column and one uint8 seats column per (route, cabin), indexed by day offset
+
+    Both columns are single contiguous little-endian buffers laid out
+    route-major, then cabin, then day, held as (route, cabin, day) numpy
+    views, so a (route, cabin, date range) query is a zero-copy slice and
+    queries across routes run as array operations. A matrix opened from a
+    file is backed by a read-only mmap that every process shares through
+    the page cache.
+    """
+
+    def __init__(self, start: date, days: int, cabins: Sequence[str], routes: Sequence[RouteKey],
+                 points: np.ndarray, seats: np.ndarray, mapped: Optional[mmap.mmap] = None):
+        self.start = start
+        self.days = days
+        self.cabins = list(cabins)
+        self.routes = [tuple(route) for route in routes]
+        self.cabin_index = {cabin: i for i, cabin in enumerate(self.cabins)}
+        self.route_index = {route: i for i, route in enumerate(self.routes)}
+        shape = (len(self.routes), len(self.cabins), days)
+        self.points = points.reshape(shape)
+        self.seats = seats.reshape(shape)
+        self._mapped = mapped
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> "AvailabilityMatrix":
+        """Build from latest-observation rows (airline, origin, destination, travel_date, cabin, points, available)"""
+        rows = list(rows)
+        if not rows:
+            return cls(date.today(), 0, [], [], np.empty(0, POINTS_DTYPE), np.empty(0, SEATS_DTYPE))
+        dates = [row["travel_date"] for row in rows]
+        start, end = date.fromisoformat(min(dates)), date.fromisoformat(max(dates))
+        days = (end - start).days + 1
+        cabins = sorted({row["cabin"] for row in rows})
+        routes = sorted({(row["airline"], row["origin"], row["destination"]) for row in rows})
+        cells = len(routes) * len(cabins) * days
+        matrix = cls(start, days, cabins, routes, np.full(cells, NO_POINTS, POINTS_DTYPE),
+                     np.zeros(cells, SEATS_DTYPE))
+        # One scatter per column rather than a numpy call per row
+        route_at = np.fromiter((matrix.route_index[(row["airline"], row["origin"], row["destination"])]
+                                for row in rows), np.intp, len(rows))
+        cabin_at = np.fromiter((matrix.cabin_index[row["cabin"]] for row in rows), np.intp, len(rows))
+        day_at = np.array(dates, "datetime64[D]") - np.datetime64(start, "D")
+        bookable = np.fromiter((bool(row["available"]) and row["points"] is not None for row in rows), bool,
+                               len(rows))
+        points = np.fromiter((row["points"] if ok else NO_POINTS for row, ok in zip(rows, bookable)), np.int64,
+                             len(rows))
+        cell = (route_at, cabin_at, day_at.astype(np.intp))
+        matrix.points[cell] = points
+        matrix.seats[cell] = np.where(bookable, SEATS_AVAILABLE, SEATS_NONE)
+        return matrix
+
+    @classmethod
+    def from_store(cls, store: AvailabilityStore) -> "AvailabilityMatrix":
+        return cls.from_rows(store.iter_latest())
+
+    @classmethod
+    def open(cls, path: str) -> "AvailabilityMatrix":
+        """Map a saved matrix read-only; the columns are views into the mapping, nothing is copied"""
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, index_length = HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC or version != VERSION:
+            mapped.close()
+            raise ValueError(f"{path} is not a version {VERSION} availability matrix")
+        index = json.loads(mapped[HEADER.size:HEADER.size + index_length])
+        cells = len(index["routes"]) * len(index["cabins"]) * index["days"]
+        offset = _aligned(HEADER.size + index_length)
+        points = np.frombuffer(mapped, POINTS_DTYPE, cells, offset)
+        seats = np.frombuffer(mapped, SEATS_DTYPE, cells, offset + points.nbytes)
+        return cls(date.fromisoformat(index["start"]), index["days"], index["cabins"], index["routes"],
+                   points, seats, mapped)
+
+    def save(self, path: str):
+        """Write to a temporary file and rename it over path, so readers never see a partial matrix"""
+        index = json.dumps({
+            "start": self.start.isoformat(),
+            "days": self.days,
+            "cabins": self.cabins,
+            "routes": self.routes,
+        }).encode()
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(index)))
+            f.write(index)
+            f.write(b"\0" * (_aligned(HEADER.size + len(index)) - HEADER.size - len(index)))
+            f.write(self.points.astype(POINTS_DTYPE, copy=False).tobytes())
+            f.write(self.seats.astype(SEATS_DTYPE, copy=False).tobytes())
+        os.replace(temporary, path)
+
+    def close(self):
+        """Unmap a matrix opened from a file
+
+        If a caller still holds a slice of the columns the mapping can't be
+        closed yet; it is then unmapped once the last slice is gone.
+        """
+        if self._mapped is None:
+            return
+        shape = self.points.shape
+        self.points = np.empty(shape, POINTS_DTYPE)
+        self.seats = np.empty(shape, SEATS_DTYPE)
+        try:
+            self._mapped.close()
+        except BufferError:
+            pass
+        self._mapped = None
+
+    @property
+    def nbytes(self) -> int:
+        return self.points.nbytes + self.seats.nbytes
+
+    def _day_range(self, start: Optional[date], end: Optional[date]) -> Tuple[int, int]:
+        """Clamped [lo, hi) day offsets for an inclusive date range"""
+        lo = 0 if start is None else max(0, (start - self.start).days)
+        hi = self.days if end is None else min(self.days, (end - self.start).days + 1)
+        return lo, max(lo, hi)
+
+    def _routes(self, routes: Optional[Iterable[RouteKey]]) -> List[RouteKey]:
+        if routes is None:
+            return self.routes
+        return [tuple(route) for route in routes if tuple(route) in self.route_index]
+
+    def _block(self, cabin: str, start: Optional[date], end: Optional[date],
+               routes: Optional[Iterable[RouteKey]]) -> Tuple[List[RouteKey], int, np.ndarray]:
+        """(routes, first day offset, points[route, day]) for one cabin; a view when routes is None"""
+        lo, hi = self._day_range(start, end)
+        cabin_at = self.cabin_index[cabin]
+        if routes is None:
+            return self.routes, lo, self.points[:, cabin_at, lo:hi]
+        selected = self._routes(routes)
+        rows = np.fromiter((self.route_index[route] for route in selected), np.intp, len(selected))
+        return selected, lo, self.points[rows, cabin_at, lo:hi]
+
+    def points_range(self, route: RouteKey, cabin: str, start: Optional[date] = None,
+                     end: Optional[date] = None) -> np.ndarray:
+        """The points column for one route and cabin between two dates (NO_POINTS where not bookable)"""
+        if route not in self.route_index or cabin not in self.cabin_index:
+            return np.empty(0, POINTS_DTYPE)
+        lo, hi = self._day_range(start, end)
+        return self.points[self.route_index[route], self.cabin_index[cabin], lo:hi]
+
+    def cheapest_per_route(self, cabin: str, start: Optional[date] = None, end: Optional[date] = None,
+                           routes: Optional[Iterable[RouteKey]] = None) -> Dict[RouteKey, Tuple[date, int]]:
+        """Lowest bookable points and its date for each route with any seats in the range"""
+        if cabin not in self.cabin_index:
+            return {}
+        selected, lo, block = self._block(cabin, start, end, routes)
+        if not block.size:
+            return {}
+        # argmin takes the first, i.e. earliest, day at the lowest points
+        days = block.argmin(axis=1)
+        lowest = block[np.arange(len(selected)), days]
+        return {
+            selected[i]: (self.start + timedelta(days=lo + int(days[i])), int(lowest[i]))
+            for i in np.flatnonzero(lowest != NO_POINTS)
+        }
+
+    def cheapest(self, cabin: str, start: Optional[date] = None, end: Optional[date] = None,
+                 routes: Optional[Iterable[RouteKey]] = None) -> Optional[Dict[str, Any]]:
+        """The single cheapest bookable day across routes, or None"""
+        per_route = self.cheapest_per_route(cabin, start, end, routes)
+        if not per_route:
+            return None
+        route, (day, points) = min(per_route.items(), key=lambda item: (item[1][1], item[1][0]))
+        return {"route": route_label(route), "date": day.isoformat(), "cabin": cabin, "points": points}
+
+    def available(self, cabin: str, start: Optional[date] = None, end: Optional[date] = None,
+                  max_points: Optional[int] = None,
+                  routes: Optional[Iterable[RouteKey]] = None) -> List[Dict[str, Any]]:
+        """Every bookable day at or under max_points, by route then date"""
+        if cabin not in self.cabin_index:
+            return []
+        selected, lo, block = self._block(cabin, start, end, routes)
+        ceiling = NO_POINTS - 1 if max_points is None else max_points
+        # Row-major, so matches come out by route then date
+        route_at, day_at = np.nonzero(block <= ceiling)
+        labels = [route_label(route) for route in selected]
+        dates = (np.datetime64(self.start, "D") + np.arange(lo, lo + block.shape[1])).astype(str).tolist()
+        return [
+            {"route": labels[r], "date": dates[d], "cabin": cabin, "points": points}
+            for r, d, points in zip(route_at.tolist(), day_at.tolist(), block[route_at, day_at].tolist())
+        ]
+
+class SharedMatrix:
+    """The latest saved matrix, remapped whenever the file on disk is replaced"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.matrix: Optional[AvailabilityMatrix] = None
+        self._identity = None
+
+    def get(self) -> Optional[AvailabilityMatrix]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if identity != self._identity:
+            # Not closed here: a request may still hold a view into the old mapping
+            # (points_range), and closing would raise BufferError under it. The
+            # mmap is unmapped once the last reference is gone
+            self.matrix = AvailabilityMatrix.open(self.path)
+            self._identity = identity
+        return self.matrix
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+def matrix_path(config: Dict[str, Any]) -> str:
+    """matrix.path from config.json, relative to the project"""
+    path = config.get("matrix", {}).get("path") or "availability.matrix"
+    return path if os.path.isabs(path) else os.path.join(BASE_DIR, path)
+
+def rebuild(config: Dict[str, Any], store: Optional[AvailabilityStore] = None) -> AvailabilityMatrix:
+    """Rebuild the matrix file from the store's latest observations"""
+    owned = store is None
+    store = store or AvailabilityStore(config.get("storage", {}).get("path", DB_PATH))
+    try:
+        matrix = AvailabilityMatrix.from_store(store)
+    finally:
+        if owned:
+            store.close()
+    matrix.save(matrix_path(config))
+    return matrix
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the availability matrix or query it")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild from the availability database first")
+    parser.add_argument("--cabin", default="upper_class")
+    parser.add_argument("--start", type=date.fromisoformat, default=None)
+    parser.add_argument("--end", type=date.fromisoformat, default=None)
+    args = parser.parse_args()
+
+    config = load_config()
+    if args.rebuild:
+        matrix = rebuild(config)
+        print(f"Wrote {matrix_path(config)}: {len(matrix.routes)} routes x {len(matrix.cabins)} cabins "
+              f"x {matrix.days} days, {matrix.nbytes:,} bytes")
+    matrix = AvailabilityMatrix.open(matrix_path(config))
+    for route, (day, points) in sorted(matrix.cheapest_per_route(args.cabin, args.start, args.end).items()):
+        print(f"{route_label(route):<28} {day}  {points:,} pts")
+    print(f"Cheapest: {matrix.cheapest(args.cabin, args.start, args.end)}")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Compare browser cold launch with warm reuse (CDP attach and in-process context reuse)
+
+Usage: python -m benchmarks.bench_browser_startup [--runs 5] [--profile scraper]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from playwright.async_api import async_playwright
+
+from benchmarks.fixture_server import serve_fixtures
+from browser_factory import resolve_profile, start_browser
+
+CDP_PORT = 9333
+
+def report(label: str, timings):
+    print(f"{label:<28} median={statistics.median(timings) * 1000:8.1f}ms "
+          f"max={max(timings) * 1000:8.1f}ms")
+
+async def first_page(session, url: str):
+    page = await session.new_page()
+    await page.goto(url, wait_until="domcontentloaded")
+
+async def cold(url: str, profile: str, runs: int):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        session = await start_browser(profile)
+        await first_page(session, url)
+        timings.append(time.perf_counter() - started)
+        await session.close()
+    report("cold launch", timings)
+
+async def warm_cdp(url: str, profile: str, runs: int):
+    settings = resolve_profile(profile)
+    async with async_playwright() as playwright:
+        server = await playwright.chromium.launch(
+            headless=True, args=settings.get("args", []) + [f"--remote-debugging-port={CDP_PORT}"]
+        )
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            session = await start_browser(profile, cdp_endpoint=f"http://127.0.0.1:{CDP_PORT}")
+            await first_page(session, url)
+            timings.append(time.perf_counter() - started)
+            await session.close()
+        await server.close()
+    report("warm attach over CDP", timings)
+
+async def warm_context(url: str, profile: str, runs: int):
+    session = await start_browser(profile)
+    timings = []
+    try:
+        for _ in range(runs):
+            started = time.perf_counter()
+            context = await session.new_context()
+            page = await context.new_page()
+            await page.goto(url, wait_until="domcontentloaded")
+            timings.append(time.perf_counter() - started)
+            await context.close()
+    finally:
+        await session.close()
+    report("warm new context", timings)
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--profile", default="scraper")
+    args = parser.parse_args()
+
+    with serve_fixtures() as base_url:
+        url = f"{base_url}/reward-flight-finder/results/month?origin=LHR&destination=BLR&month=10&year=2025"
+        await cold(url, args.profile, args.runs)
+        await warm_cdp(url, args.profile, args.runs)
+        await warm_context(url, args.profile, args.runs)
+
+if __name__ == "__main__":
+    asyncio.run(main())
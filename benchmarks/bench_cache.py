@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Load test the search cache against a mocked scraper and count real scrapes
+
+Usage: python -m benchmarks.bench_cache [--requests 2000] [--keys 12] [--scrape-ms 500]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from models import FlightSearch
+from result_cache import ResultCache, search_cache_key
+
+DESTINATIONS = ("BLR", "JFK", "LAX", "DEL")
+
+class MockScraper:
+    def __init__(self, scrape_seconds: float):
+        self.scrape_seconds = scrape_seconds
+        self.scrapes = 0
+
+    async def fetch(self, search: FlightSearch):
+        self.scrapes += 1
+        await asyncio.sleep(self.scrape_seconds)
+        return []
+
+async def run(args, cached: bool):
+    scraper = MockScraper(args.scrape_ms / 1000)
+    cache = ResultCache(ttl_seconds=args.ttl, stale_seconds=args.ttl)
+    searches = [
+        FlightSearch(origin="LHR", destination=destination, month=month, year=2025)
+        for destination in DESTINATIONS
+        for month in range(10, 13)
+    ][:args.keys]
+    rng = random.Random(1)
+
+    async def client():
+        # Arrivals spread over a few seconds, like a burst of page loads
+        await asyncio.sleep(rng.uniform(0, args.spread))
+        search = rng.choice(searches)
+        if cached:
+            await cache.get_or_fetch(search_cache_key(search), lambda: scraper.fetch(search))
+        else:
+            await scraper.fetch(search)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.requests)))
+    elapsed = time.perf_counter() - started
+    label = "cached" if cached else "uncached"
+    print(f"{label:<9} requests={args.requests} scrapes={scraper.scrapes:<5} elapsed={elapsed:5.2f}s")
+    if cached:
+        print(f"          {cache.stats()}")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--keys", type=int, default=12)
+    parser.add_argument("--scrape-ms", type=float, default=500)
+    parser.add_argument("--spread", type=float, default=3.0)
+    parser.add_argument("--ttl", type=float, default=300)
+    args = parser.parse_args()
+
+    await run(args, cached=False)
+    await run(args, cached=True)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Compare the single-pass calendar parser with the old per-date regex scans
+
+Usage: python -m benchmarks.bench_calendar_parser [--iterations 200]
+"""
+
+import argparse
+import glob
+import os
+import re
+import time
+from html.parser import HTMLParser
+
+from benchmarks.fixture_server import FIXTURES_DIR
+from calendar_parser import parse_calendar_text
+
+BLOCK_TAGS = {"div", "p", "li", "tr", "td", "h1", "h2", "h3", "header", "main", "section"}
+
+class TextExtractor(HTMLParser):
+    """Rough stand-in for innerText: block elements start a new line"""
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        self.parts.append(data)
+
+def html_to_text(html: str) -> str:
+    extractor = TextExtractor()
+    extractor.feed(html)
+    return "".join(extractor.parts)
+
+def legacy_upper_class(page_text: str, days) -> dict:
+    """The patterns extract_points.py used, run once per target date"""
+    found = {}
+    for day in days:
+        patterns = [
+            rf'(?:Sun|Mon|Tue|Wed|Thu|Fri|Sat)\s+{day}\s+.*?Upper\s+Class\s+(\d+(?:,\d{{3}})*)\s*pts',
+            rf'{day}\s+Economy.*?Upper\s+Class\s+(\d+(?:,\d{{3}})*)\s*pts',
+        ]
+        for pattern in patterns:
+            for match in re.finditer(pattern, page_text, re.IGNORECASE | re.DOTALL):
+                found.setdefault(day, int(match.group(1).replace(',', '')))
+    return found
+
+def bench(label: str, fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    per_call = (time.perf_counter() - started) / iterations
+    print(f"  {label:<28} {per_call * 1000:8.3f} ms/month")
+    return per_call
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "virgin_atlantic_*.html"))):
+        with open(path) as f:
+            text = html_to_text(f.read())
+        days = range(1, 32)
+
+        print(f"{os.path.basename(path)} ({len(text)} chars)")
+        legacy = bench("legacy per-date regex", lambda: legacy_upper_class(text, days), args.iterations)
+        single = bench("single-pass parser", lambda: parse_calendar_text(text), args.iterations)
+        print(f"  speedup: {legacy / single:.1f}x")
+
+        # The lazy legacy patterns run past 'Not available' cells into the next day
+        parsed = parse_calendar_text(text)
+        old = legacy_upper_class(text, days)
+        differing = [day for day in days if old.get(day) != parsed.get(day, {}).get("upper_class")]
+        if differing:
+            print(f"  legacy patterns disagree on days: {differing}")
+
+if __name__ == "__main__":
+    main()
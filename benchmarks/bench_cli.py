@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Cold start of CLI commands versus importing main.py, each in a fresh interpreter
+
+Usage: python -m benchmarks.bench_cli [--runs 5]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMMANDS = (
+    ("python (empty)", [sys.executable, "-c", "pass"]),
+    ("import main", [sys.executable, "-c", "import main"]),
+    ("cli.py --help", [sys.executable, "cli.py", "--help"]),
+    ("cli.py search --help", [sys.executable, "cli.py", "search", "--help"]),
+    ("cli.py notify --dry-run", [sys.executable, "cli.py", "notify", "--dry-run", "--message", "test"]),
+    ("cli.py watch list", [sys.executable, "cli.py", "watch", "list"]),
+)
+
+def wall_ms(command, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(command, cwd=BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    timings = [(label, wall_ms(command, args.runs)) for label, command in COMMANDS]
+    floor = timings[0][1]
+    before = timings[1][1] - floor
+    print(f"Median wall time over {args.runs} runs; import cost is time above an empty interpreter")
+    for label, ms in timings:
+        share = f"{(ms - floor) / before:6.0%} of import main" if label != "python (empty)" else ""
+        print(f"  {label:<26} {ms:8.1f} ms  {ms - floor:8.1f} ms imports  {share}")
+
+if __name__ == "__main__":
+    main()
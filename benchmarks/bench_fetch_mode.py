@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Compare per-month search wall time for API capture versus DOM scraping
+
+Usage: python -m benchmarks.bench_fetch_mode [--searches 10]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.fixture_server import serve_fixtures, unthrottled
+from models import FlightSearch
+from tracker import RewardSeatTracker
+
+async def time_mode(base_url: str, fetch_mode: str, searches: int):
+    tracker = RewardSeatTracker(pool_settings={"size": 1}, base_urls={"virgin_atlantic": base_url},
+                                fetch_mode=fetch_mode, politeness=unthrottled())
+    await tracker.start_browser()
+    search = FlightSearch(origin="LHR", destination="BLR", month=10, year=2025)
+    timings = []
+    try:
+        for _ in range(searches):
+            started = time.perf_counter()
+            results = await tracker.search(search)
+            timings.append(time.perf_counter() - started)
+    finally:
+        await tracker.close_browser()
+
+    print(f"{fetch_mode:<4} first={timings[0]:6.2f}s median={statistics.median(timings):6.2f}s "
+          f"results={len(results)}")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--searches", type=int, default=10)
+    args = parser.parse_args()
+
+    with serve_fixtures() as base_url:
+        for fetch_mode in ("dom", "api"):
+            await time_mode(base_url, fetch_mode, args.searches)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+History and trend queries from the incremental rollups versus aggregating raw observations
+
+Writes a synthetic year of 09:00/20:00 scrapes (every cabin for the next
+--horizon travel days) and, as the history grows, times a month of travel
+dates both ways: what /history and /trends run, and the GROUP BY over
+observations they replace.
+
+Usage: python -m benchmarks.bench_history [--routes 1] [--horizon 120] [--days 365] [--db /tmp/bench_history.db]
+"""
+
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from storage import AvailabilityStore
+
+CABINS = ("economy", "premium", "upper_class")
+DESTINATIONS = ("BLR", "JFK", "LAX", "DEL", "BOS", "SFO", "MIA", "JNB")
+START = datetime(2025, 1, 1, 9, 0)
+
+RAW_HISTORY = """
+SELECT airline, travel_date, cabin, COUNT(*) AS observations,
+       MIN(CASE WHEN available THEN points END) AS min_points,
+       MAX(CASE WHEN available THEN points END) AS max_points,
+       MIN(observed_at) AS first_observed_at, MAX(observed_at) AS last_observed_at,
+       MIN(CASE WHEN available THEN observed_at END) AS first_available_at,
+       MAX(CASE WHEN available THEN observed_at END) AS last_available_at
+FROM observations
+WHERE origin = ? AND destination = ? AND travel_date BETWEEN ? AND ?
+GROUP BY airline, travel_date, cabin ORDER BY travel_date, cabin
+"""
+
+RAW_TREND = """
+SELECT substr(observed_at, 1, 10) AS observed_on,
+       MIN(CASE WHEN available THEN points END) AS min_points,
+       MAX(CASE WHEN available THEN points END) AS max_points,
+       COUNT(*) AS observations, SUM(available) AS available_observations
+FROM observations
+WHERE origin = ? AND destination = ? AND cabin = ? AND travel_date BETWEEN ? AND ? AND observed_at >= ?
+GROUP BY observed_on ORDER BY observed_on
+"""
+
+def synthetic_scrape(rng: random.Random, prices: dict, destination: str, observed_at: datetime, horizon: int):
+    """The next `horizon` travel dates in every cabin; a date's price moves now and then"""
+    first = observed_at.date() + timedelta(days=1)
+    for offset in range(horizon):
+        travel_date = (first + timedelta(days=offset)).isoformat()
+        for cabin in CABINS:
+            key = (destination, travel_date, cabin)
+            if key not in prices or rng.random() < 0.1:
+                prices[key] = rng.choice((None, 10000, 20000, 35000, 47500, 57500))
+            points = prices[key]
+            yield ("virgin_atlantic", "LHR", destination, travel_date, cabin, points,
+                   int(points is not None), observed_at.isoformat())
+
+def median_ms(fn, repeat: int = 15) -> tuple:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = fn()
+        timings.append(time.perf_counter() - started)
+    return sorted(timings)[len(timings) // 2] * 1000, len(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--routes", type=int, default=1)
+    parser.add_argument("--horizon", type=int, default=120, help="travel dates covered by each scrape")
+    parser.add_argument("--days", type=int, default=365, help="days of twice-daily scrapes")
+    parser.add_argument("--checkpoints", default="30,90,180,365", help="days of history at which to time queries")
+    parser.add_argument("--db", default="/tmp/bench_history.db")
+    args = parser.parse_args()
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(args.db + suffix):
+            os.remove(args.db + suffix)
+
+    rng = random.Random(1)
+    prices = {}
+    store = AvailabilityStore(args.db)
+    checkpoints = sorted(int(day) for day in args.checkpoints.split(",") if int(day) <= args.days)
+    total, write_seconds = 0, 0.0
+    print(f"{args.routes} route(s), {args.horizon} travel dates x {len(CABINS)} cabins per scrape, twice a day")
+    print(f"  {'history':>8} {'observations':>13} {'history raw':>12} {'rollup':>8} "
+          f"{'trend raw':>10} {'rollup':>8}")
+    for day in range(1, args.days + 1):
+        for hour in (0, 11):
+            observed = START + timedelta(days=day - 1, hours=hour)
+            for destination in DESTINATIONS[:args.routes]:
+                rows = list(synthetic_scrape(rng, prices, destination, observed, args.horizon))
+                started = time.perf_counter()
+                total += store.save_rows(rows)
+                write_seconds += time.perf_counter() - started
+        if day not in checkpoints:
+            continue
+
+        # A month of travel dates starting a fortnight after today, and the last 30 days of trend
+        today = (START + timedelta(days=day - 1)).date()
+        first = (today + timedelta(days=14)).isoformat()
+        last = (today + timedelta(days=44)).isoformat()
+        since = (today - timedelta(days=30)).isoformat()
+        history_raw, raw_rows = median_ms(lambda: store.conn.execute(
+            RAW_HISTORY, ("LHR", "BLR", first, last)).fetchall())
+        history_rollup, rollup_rows = median_ms(lambda: store.price_history("LHR", "BLR", first, last))
+        assert raw_rows == rollup_rows
+        trend_raw, raw_rows = median_ms(lambda: store.conn.execute(
+            RAW_TREND, ("LHR", "BLR", "upper_class", first, last, since)).fetchall())
+        trend_rollup, rollup_rows = median_ms(lambda: store.price_trend("LHR", "BLR", "upper_class", first, last,
+                                                                        since))
+        assert raw_rows == rollup_rows
+        print(f"  {day:>6} d {total:>13,} {history_raw:>9.2f} ms {history_rollup:>5.2f} ms "
+              f"{trend_raw:>7.2f} ms {trend_rollup:>5.2f} ms")
+
+    print(f"Wrote {total:,} observations with rollups in {write_seconds:.1f}s ({total / write_seconds:,.0f} rows/s)")
+    started = time.perf_counter()
+    store.rebuild_rollups()
+    print(f"Rebuilding the rollups from scratch takes {time.perf_counter() - started:.1f}s")
+    store.close()
+
+if __name__ == "__main__":
+    main()
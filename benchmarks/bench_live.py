@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Live change fan-out under load: idle subscriber cost, delivery latency and slow-consumer eviction
+
+A simulated source writes bursts of changes (one scheduler check's worth)
+to a temporary change log from a thread, as another process would; the
+API's ChangeFeed tails it and the hub fans out to in-process consumers
+that stand in for connections:
+
+- idle: subscribed to routes that never change, waiting like an open /live stream
+- active: one hot route each, draining as events arrive
+- firehose: every hot route
+- slow: every hot route, but taking --slow-ms per batch, so their buffers fill
+
+Usage: python -m benchmarks.bench_live [--idle 0,1000,10000] [--active 200] [--bursts 20] [--burst-size 200]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from change_detection import AvailabilityChange, ChangeType
+from live import ChangeFeed, ChangeHub, SubscriptionClosed
+from storage import AvailabilityStore
+
+HOT_ROUTES = [("LHR", destination) for destination in ("BLR", "JFK", "LAX", "DEL", "BOS", "SFO", "MIA", "JNB", "SEA",
+                                                       "ATL")]
+
+def synthetic_changes(rng: random.Random, count: int):
+    for _ in range(count):
+        origin, destination = rng.choice(HOT_ROUTES)
+        travel_date = (date(2026, 1, 1) + timedelta(days=rng.randrange(365))).isoformat()
+        yield AvailabilityChange(kind=ChangeType.POINTS_DROPPED, airline="virgin_atlantic", origin=origin,
+                                 destination=destination, travel_date=travel_date, cabin="upper_class",
+                                 old_points=60000, new_points=rng.randrange(10, 59) * 1000)
+
+async def consume(subscription, latencies, sent, heartbeat: float, delay: float = 0):
+    """What a /live handler does, minus the socket: wait, drain, write"""
+    try:
+        while True:
+            batch = await subscription.next_batch(heartbeat)
+            now = time.perf_counter()
+            latencies.extend(now - sent[event.id] for event in batch)
+            if delay:
+                await asyncio.sleep(delay)
+    except SubscriptionClosed:
+        pass
+
+async def run(idle: int, args) -> dict:
+    directory = tempfile.mkdtemp(prefix="bench_live_")
+    path = os.path.join(directory, "live.db")
+    source = AvailabilityStore(path)
+    hub = ChangeHub(buffer_size=args.buffer, max_subscriptions=idle + args.active + 100)
+    feed = ChangeFeed(path, hub, poll_seconds=args.poll_ms / 1000)
+    latencies, slow_latencies = [], []
+    sent = {}
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tasks = []
+    for n in range(idle):
+        subscription = hub.subscribe([("IDL", f"{n % 1000:03d}")], [f"2026-{n % 12 + 1:02d}"])
+        tasks.append(asyncio.create_task(consume(subscription, latencies, sent, args.heartbeat)))
+    await asyncio.sleep(0)
+    idle_bytes = (tracemalloc.get_traced_memory()[0] - before) / idle if idle else 0
+    tracemalloc.stop()
+
+    for n in range(args.active):
+        subscription = hub.subscribe([HOT_ROUTES[n % len(HOT_ROUTES)]])
+        tasks.append(asyncio.create_task(consume(subscription, latencies, sent, args.heartbeat)))
+    for _ in range(args.firehose):
+        tasks.append(asyncio.create_task(consume(hub.subscribe(HOT_ROUTES), latencies, sent, args.heartbeat)))
+    slow = [hub.subscribe(HOT_ROUTES) for _ in range(args.slow)]
+    tasks.extend(asyncio.create_task(consume(subscription, slow_latencies, sent, args.heartbeat,
+                                             args.slow_ms / 1000))
+                 for subscription in slow)
+
+    # Nothing to publish: what the idle subscribers and an empty poll loop cost
+    feed.start()
+    cpu = time.process_time()
+    await asyncio.sleep(args.quiet_seconds)
+    quiet_cpu = (time.process_time() - cpu) / args.quiet_seconds
+
+    rng = random.Random(1)
+
+    def write_burst():
+        changes = list(synthetic_changes(rng, args.burst_size))
+        source.record_changes(changes)
+        now = time.perf_counter()
+        last = source.last_change_id()
+        sent.update((event_id, now) for event_id in range(last - len(changes) + 1, last + 1))
+
+    cpu, started = time.process_time(), time.perf_counter()
+    for _ in range(args.bursts):
+        await asyncio.to_thread(write_burst)
+        await asyncio.sleep(args.interval_ms / 1000)
+    await asyncio.sleep(args.poll_ms / 1000 * 4)
+    busy_cpu = (time.process_time() - cpu) / (time.perf_counter() - started)
+
+    await feed.stop()
+    stats = hub.stats()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    source.close()
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    os.rmdir(directory)
+
+    latencies.sort()
+    return {
+        "idle_bytes": idle_bytes,
+        "quiet_cpu": quiet_cpu,
+        "busy_cpu": busy_cpu,
+        "published": stats["published"],
+        "delivered": stats["delivered"],
+        "evicted": stats["evicted"],
+        "p50": statistics.median(latencies) * 1000 if latencies else 0,
+        "p99": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0,
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--idle", default="0,1000,10000", help="comma-separated idle subscriber counts")
+    parser.add_argument("--active", type=int, default=200)
+    parser.add_argument("--firehose", type=int, default=5)
+    parser.add_argument("--slow", type=int, default=5)
+    parser.add_argument("--slow-ms", type=float, default=500)
+    parser.add_argument("--bursts", type=int, default=20)
+    parser.add_argument("--burst-size", type=int, default=200, help="changes per simulated check")
+    parser.add_argument("--interval-ms", type=float, default=250, help="time between bursts")
+    parser.add_argument("--buffer", type=int, default=256)
+    parser.add_argument("--poll-ms", type=float, default=50)
+    parser.add_argument("--heartbeat", type=float, default=15)
+    parser.add_argument("--quiet-seconds", type=float, default=2)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    print(f"{args.active} active + {args.firehose} firehose + {args.slow} slow subscribers, "
+          f"{args.bursts} bursts of {args.burst_size} changes every {args.interval_ms:g} ms, "
+          f"buffer {args.buffer}, poll {args.poll_ms:g} ms")
+    print(f"  {'idle':>7} {'bytes/idle':>11} {'quiet CPU':>10} {'busy CPU':>9} {'published':>10} "
+          f"{'delivered':>10} {'evicted':>8} {'p50 ms':>7} {'p99 ms':>7}")
+    for idle in (int(n) for n in args.idle.split(",")):
+        result = await run(idle, args)
+        print(f"  {idle:>7,} {result['idle_bytes']:>11,.0f} {result['quiet_cpu']:>9.1%} {result['busy_cpu']:>8.1%} "
+              f"{result['published']:>10,} {result['delivered']:>10,} {result['evicted']:>8} "
+              f"{result['p50']:>7.1f} {result['p99']:>7.1f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Memory and query time of the columnar availability matrix versus a list of FlightResult models
+
+Usage: python -m benchmarks.bench_matrix [--routes 50] [--days 365] [--iterations 20]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+from availability_matrix import AvailabilityMatrix
+from models import FlightResult
+
+CABINS = ("economy", "premium", "upper_class")
+Q4 = (date(2025, 10, 1), date(2025, 12, 31))
+
+def synthetic_rows(routes: int, days: int, seed: int = 1):
+    rng = random.Random(seed)
+    start = date(2025, 1, 1)
+    for route in range(routes):
+        for offset in range(days):
+            travel_date = (start + timedelta(days=offset)).isoformat()
+            for cabin in CABINS:
+                points = rng.choice((None, None, 10000, 20000, 35000, 47500, 57500, 72500))
+                yield {"airline": "virgin_atlantic", "origin": f"O{route:03d}", "destination": "BLR",
+                       "travel_date": travel_date, "cabin": cabin, "points": points,
+                       "available": points is not None}
+
+def as_models(rows):
+    """What the API holds today: (route, FlightResult) per day and cabin"""
+    observed = datetime(2025, 1, 1, 9, 0)
+    return [
+        ((row["airline"], row["origin"], row["destination"]), FlightResult(
+            date=row["travel_date"], availability=row["available"],
+            price=f"{row['points']:,} pts" if row["points"] else "Not available",
+            booking_class=row["cabin"], timestamp=observed, points=row["points"],
+        ))
+        for row in rows
+    ]
+
+def models_cheapest(results, cabin, start, end):
+    best = None
+    for route, result in results:
+        if result.booking_class != cabin or not result.availability or result.points is None:
+            continue
+        day = date.fromisoformat(result.date)
+        if start <= day <= end and (best is None or (result.points, day) < (best[2], best[1])):
+            best = (route, day, result.points)
+    return best
+
+def models_available(results, cabin, start, end, max_points):
+    return [
+        (route, result.date, result.points) for route, result in results
+        if result.booking_class == cabin and result.availability and result.points is not None
+        and result.points <= max_points and start <= date.fromisoformat(result.date) <= end
+    ]
+
+def measure(build):
+    tracemalloc.start()
+    value = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, current
+
+def timed(fn, iterations: int) -> float:
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--routes", type=int, default=50)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = list(synthetic_rows(args.routes, args.days))
+    models, models_bytes = measure(lambda: as_models(rows))
+    matrix, matrix_bytes = measure(lambda: AvailabilityMatrix.from_rows(rows))
+    print(f"{len(rows):,} route/day/cabin cells")
+    print(f"  {'memory':<34} {models_bytes / 2**20:9.2f} MiB models  {matrix_bytes / 2**20:9.2f} MiB matrix "
+          f"({models_bytes / matrix_bytes:.0f}x)")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "availability.matrix")
+        matrix.save(path)
+        started = time.perf_counter()
+        mapped = AvailabilityMatrix.open(path)
+        open_ms = (time.perf_counter() - started) * 1000
+        print(f"  {'file size / mmap open':<34} {os.path.getsize(path) / 2**20:9.2f} MiB        {open_ms:9.2f} ms")
+
+        expected = models_cheapest(models, "upper_class", *Q4)
+        found = mapped.cheapest("upper_class", *Q4)
+        assert found["points"] == expected[2] and found["date"] == expected[1].isoformat(), (found, expected)
+        assert len(mapped.available("economy", *Q4, max_points=20000)) == \
+            len(models_available(models, "economy", *Q4, 20000))
+
+        queries = (
+            ("cheapest upper class, Q4",
+             lambda: models_cheapest(models, "upper_class", *Q4),
+             lambda: mapped.cheapest("upper_class", *Q4)),
+            ("economy <= 20k pts, Q4",
+             lambda: models_available(models, "economy", *Q4, 20000),
+             lambda: mapped.available("economy", *Q4, max_points=20000)),
+            ("cheapest per route, full year",
+             lambda: models_cheapest(models, "premium", date(2025, 1, 1), date(2025, 12, 31)),
+             lambda: mapped.cheapest_per_route("premium")),
+        )
+        for label, slow, fast in queries:
+            before, after = timed(slow, args.iterations), timed(fast, args.iterations)
+            print(f"  {label:<34} {before:9.2f} ms models  {after:9.2f} ms matrix ({before / after:.0f}x)")
+        mapped.close()
+
+if __name__ == "__main__":
+    main()
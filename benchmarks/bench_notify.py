@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Time alert fan-out through the pooled dispatcher against one SMTP connection per message
+
+Runs a local SMTP sink (aiosmtpd) and a local webhook endpoint, so nothing leaves the machine.
+
+Usage: python -m benchmarks.bench_notify [--alerts 1000] [--smtp-latency-ms 20]
+"""
+
+import argparse
+import asyncio
+import smtplib
+import socket
+import threading
+import time
+from email.mime.text import MIMEText
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from change_detection import AvailabilityChange, ChangeType
+from notify_dispatcher import NotificationDispatcher, SmtpChannel, WebhookChannel
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    Controller = None
+
+class SlowSink:
+    """Accepts every message after a fixed per-command delay, like a remote relay"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.received = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        await asyncio.sleep(self.latency)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.latency)
+        self.received += 1
+        return "250 OK"
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(204)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+def free_port() -> int:
+    # aiosmtpd's Controller cannot bind port 0 itself
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def make_change(i: int) -> AvailabilityChange:
+    return AvailabilityChange(
+        kind=ChangeType.POINTS_DROPPED,
+        airline="virgin_atlantic",
+        origin="LHR",
+        destination="BLR",
+        travel_date=f"2025-10-{1 + i % 28:02d}",
+        cabin="upper_class",
+        old_points=57500,
+        new_points=47500,
+    )
+
+def send_per_message(host: str, port: int, recipient: str, change: AvailabilityChange):
+    """What send_email.py does: connect, greet and quit around every message"""
+    message = MIMEText(change.describe(), "plain")
+    message["From"] = "tracker@example.com"
+    message["To"] = recipient
+    message["Subject"] = "Reward seat change"
+    server = smtplib.SMTP(host, port)
+    server.sendmail("tracker@example.com", [recipient], message.as_string())
+    server.quit()
+
+async def run_baseline(args, port: int) -> float:
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def send(i):
+        async with semaphore:
+            await asyncio.to_thread(send_per_message, "127.0.0.1", port, "alerts@example.com", make_change(i))
+
+    await asyncio.gather(*(send(i) for i in range(args.alerts)))
+    return time.perf_counter() - started
+
+async def run_pooled(args, port: int, webhook_url: str):
+    channels = [
+        SmtpChannel("127.0.0.1", port, sender="tracker@example.com", recipients=["alerts@example.com"],
+                    use_tls=False, pool_size=args.pool_size),
+        WebhookChannel(webhook_url, pool_size=args.concurrency),
+    ]
+    dispatcher = NotificationDispatcher(channels, concurrency=args.concurrency, max_retries=1)
+
+    # Individual alerts, same count as the baseline, over reused connections
+    started = time.perf_counter()
+    deliveries = [
+        (channel, recipient, "Reward seat change", make_change(i).describe())
+        for i in range(args.alerts)
+        for channel in channels
+        for recipient in channel.recipients
+    ]
+    outcome = await dispatcher.deliver(deliveries)
+    individual = time.perf_counter() - started
+
+    # The scheduler's path: everything from one sweep as a single digest
+    started = time.perf_counter()
+    dispatcher.enqueue([make_change(i) for i in range(args.alerts)])
+    digest = await dispatcher.flush()
+    batched = time.perf_counter() - started
+
+    await dispatcher.close()
+    return individual, outcome, batched, digest
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--alerts", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--smtp-latency-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    if Controller is None:
+        raise SystemExit("aiosmtpd is required for this benchmark: pip install aiosmtpd")
+
+    sink = SlowSink(args.smtp_latency_ms / 1000)
+    port = free_port()
+    controller = Controller(sink, hostname="127.0.0.1", port=port)
+    controller.start()
+
+    webhook = ThreadingHTTPServer(("127.0.0.1", 0), WebhookHandler)
+    threading.Thread(target=webhook.serve_forever, daemon=True).start()
+    webhook_url = f"http://127.0.0.1:{webhook.server_address[1]}/hook"
+
+    try:
+        baseline = await run_baseline(args, port)
+        print(f"per-message  alerts={args.alerts} smtp_only        elapsed={baseline:6.2f}s "
+              f"({args.alerts / baseline:7.1f}/s)")
+        individual, outcome, batched, digest = await run_pooled(args, port, webhook_url)
+        print(f"pooled       alerts={args.alerts} smtp+webhook     elapsed={individual:6.2f}s "
+              f"({args.alerts / individual:7.1f}/s) sent={outcome['sent']} failed={outcome['failed']}")
+        print(f"digest       alerts={args.alerts} smtp+webhook     elapsed={batched:6.2f}s "
+              f"messages={digest['sent']} failed={digest['failed']}")
+        print(f"SMTP sink received {sink.received} messages")
+    finally:
+        webhook.shutdown()
+        controller.stop()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Show that check latency no longer depends on notifier latency once alerts go through the outbox
+
+Usage: python -m benchmarks.bench_outbox [--checks 20] [--send-ms 400] [--failure-rate 0.2]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import tempfile
+import time
+
+from change_detection import AvailabilityChange, ChangeType
+from notify_dispatcher import NotificationDispatcher
+from outbox import Outbox, OutboxWorker
+
+class SlowChannel:
+    """Stands in for iMessage/SMS: slow, and fails some of the time"""
+    name = "slow"
+
+    def __init__(self, recipients, send_seconds: float, failure_rate: float, seed: int = 1):
+        self.recipients = recipients
+        self.send_seconds = send_seconds
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.sent = 0
+
+    async def send(self, recipient, subject, body, key=None):
+        await asyncio.sleep(self.send_seconds)
+        if self.rng.random() < self.failure_rate:
+            raise ConnectionError("notifier unavailable")
+        self.sent += 1
+
+    async def close(self):
+        pass
+
+def changes_for(check: int):
+    return [AvailabilityChange(
+        kind=ChangeType.SEAT_APPEARED,
+        airline="virgin_atlantic",
+        origin="LHR",
+        destination="BLR",
+        travel_date=f"2025-10-{1 + check % 28:02d}",
+        cabin="upper_class",
+        old_points=None,
+        new_points=47500,
+    )]
+
+async def run_inline(args) -> float:
+    channel = SlowChannel(["a", "b", "c"], args.send_ms / 1000, args.failure_rate)
+    dispatcher = NotificationDispatcher([channel], max_retries=3, backoff_seconds=args.send_ms / 1000)
+    latencies = []
+    for check in range(args.checks):
+        started = time.perf_counter()
+        await asyncio.sleep(args.scrape_ms / 1000)
+        dispatcher.enqueue(changes_for(check))
+        await dispatcher.flush()
+        latencies.append(time.perf_counter() - started)
+    return sum(latencies) / len(latencies)
+
+async def run_outbox(args, path: str):
+    channel = SlowChannel(["a", "b", "c"], args.send_ms / 1000, args.failure_rate)
+    dispatcher = NotificationDispatcher([channel])
+    outbox = Outbox(path)
+    worker = OutboxWorker(outbox, [channel], backoff_seconds=args.send_ms / 1000, poll_seconds=0.05)
+    delivery = asyncio.create_task(worker.run_forever())
+
+    latencies = []
+    max_depth = 0
+    for check in range(args.checks):
+        started = time.perf_counter()
+        await asyncio.sleep(args.scrape_ms / 1000)
+        outbox.enqueue(dispatcher.outbox_messages(changes_for(check), f"check-{check}"))
+        worker.wake()
+        latencies.append(time.perf_counter() - started)
+        max_depth = max(max_depth, outbox.stats()["depth"])
+
+    while outbox.stats()["depth"]:
+        await asyncio.sleep(0.05)
+    delivery.cancel()
+    stats = outbox.stats()
+    outbox.close()
+    return sum(latencies) / len(latencies), max_depth, stats
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--checks", type=int, default=20)
+    parser.add_argument("--scrape-ms", type=float, default=100)
+    parser.add_argument("--send-ms", type=float, default=400)
+    parser.add_argument("--failure-rate", type=float, default=0.2)
+    args = parser.parse_args()
+    # Injected failures are expected; keep the retry warnings out of the results
+    logging.basicConfig(level=logging.ERROR)
+
+    inline = await run_inline(args)
+    print(f"inline  mean check latency={inline * 1000:7.1f}ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        mean, max_depth, stats = await run_outbox(args, os.path.join(tmp, "outbox.db"))
+    print(f"outbox  mean check latency={mean * 1000:7.1f}ms  max depth={max_depth}")
+    print(f"        delivered={stats['delivered']} dead={stats['dead']} "
+          f"lag mean={stats['delivery_lag_mean_seconds']}s max={stats['delivery_lag_max_seconds']}s")
+
+if __name__ == "__main__":
+    asyncio.run(main())
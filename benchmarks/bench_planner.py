@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Browser navigations per cycle: every watch fetching its own months versus the deduplicated fetch plan
+
+Watches get random windows of 1-60 days over the next year on --routes
+routes; the tracker is a mock that counts navigations and holds its page
+for --scrape-ms.
+
+Usage: python -m benchmarks.bench_planner [--watches 200,1000,5000] [--routes 10] [--scrape-ms 5]
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import time
+from datetime import date, timedelta
+
+from models import FlightSearch
+from orchestrator import Orchestrator
+from planner import FetchPlanner
+from watches import Watch
+
+TODAY = date(2026, 1, 1)
+
+class CountingTracker:
+    def __init__(self, scrape_seconds: float):
+        self.scrape_seconds = scrape_seconds
+        self.navigations = 0
+
+    async def fetch(self, search: FlightSearch):
+        self.navigations += 1
+        await asyncio.sleep(self.scrape_seconds)
+        return []
+
+def synthetic_watches(count: int, routes: int, seed: int = 1):
+    rng = random.Random(seed)
+    for watch_id in range(count):
+        start = TODAY + timedelta(days=rng.randrange(365))
+        yield Watch(id=watch_id, origin="LHR", destination=f"D{rng.randrange(routes):02d}", start=start,
+                    end=start + timedelta(days=rng.randrange(60)), cabin="upper_class", max_points=None,
+                    airline=None, recipients=(f"email:user{watch_id}@example.com",))
+
+def per_watch_searches(watches):
+    """Today's behaviour: each consumer fetches every month it needs itself"""
+    searches = []
+    for watch in watches:
+        planner = FetchPlanner(today=TODAY)
+        planner.add_watches([watch])
+        searches.extend(planner.plan().searches)
+    return searches
+
+async def timed_sweep(searches, args) -> tuple:
+    tracker = CountingTracker(args.scrape_ms / 1000)
+    started = time.perf_counter()
+    await Orchestrator(tracker, concurrency=args.concurrency, max_retries=1).run(searches)
+    return tracker.navigations, time.perf_counter() - started
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--watches", default="200,1000,5000", help="comma-separated watch counts")
+    parser.add_argument("--routes", type=int, default=10)
+    parser.add_argument("--scrape-ms", type=float, default=5)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    print(f"{args.routes} routes, windows starting in the next year; navigations and sweep time per cycle")
+    print(f"  {'watches':>8} {'naive navs':>11} {'planned navs':>13} {'dedup':>7} {'naive s':>8} {'planned s':>10}")
+    for count in (int(n) for n in args.watches.split(",")):
+        watches = list(synthetic_watches(count, args.routes))
+        started = time.perf_counter()
+        planner = FetchPlanner(today=TODAY)
+        planner.add_watches(watches)
+        plan = planner.plan()
+        plan_ms = (time.perf_counter() - started) * 1000
+
+        naive_navs, naive_s = await timed_sweep(per_watch_searches(watches), args)
+        planned_navs, planned_s = await timed_sweep(plan.searches, args)
+        assert planned_navs == len({(s.destination, s.year, s.month) for s in plan.searches})
+        print(f"  {count:>8,} {naive_navs:>11,} {planned_navs:>13,} {plan.dedup_ratio:>6.1f}x "
+              f"{naive_s:>8.2f} {planned_s:>10.2f}  (planned in {plan_ms:.1f} ms)")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Sustained throughput against a throttling host: fixed-rate bursts versus the AIMD host policy
+
+The simulated host serves `--capacity` requests per second. Past that it
+answers 429 with Retry-After, and too many 429s in ten seconds get the
+client banned (403) for `--ban-seconds`.
+
+Usage: python -m benchmarks.bench_politeness [--capacity 20] [--seconds 20] [--fixed-rate 40]
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from politeness import Blocked, CircuitOpen, HostPolicy, TokenBucket
+
+class ThrottlingHost:
+    def __init__(self, capacity: float, ban_after: int, ban_seconds: float, latency: float):
+        self.capacity = capacity
+        self.ban_after = ban_after
+        self.ban_seconds = ban_seconds
+        self.latency = latency
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.strikes = deque()
+        self.banned_until = 0.0
+        self.banned_seconds = 0.0
+
+    async def request(self):
+        await asyncio.sleep(self.latency)
+        now = time.monotonic()
+        if now < self.banned_until:
+            raise Blocked("banned", status=403)
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return
+        self.strikes.append(now)
+        while self.strikes and now - self.strikes[0] > 10:
+            self.strikes.popleft()
+        if len(self.strikes) >= self.ban_after:
+            self.banned_until = now + self.ban_seconds
+            self.banned_seconds += self.ban_seconds
+            self.strikes.clear()
+        raise Blocked("too many requests", status=429, retry_after=1.0)
+
+class FixedRate:
+    """The old per-airline limiter: a steady pace that ignores 429s and Retry-After"""
+
+    def __init__(self, rate: float, burst: float):
+        self.bucket = TokenBucket(rate, burst)
+        self.rate = rate
+
+    async def acquire(self) -> bool:
+        await self.bucket.acquire()
+        return False
+
+    @contextmanager
+    def request(self, probe: bool = False):
+        yield
+
+async def run(args, policy):
+    host = ThrottlingHost(args.capacity, args.ban_after, args.ban_seconds, args.latency_ms / 1000)
+    counts = {"ok": 0, "429": 0, "403": 0, "circuit_open": 0}
+    deadline = time.monotonic() + args.seconds
+
+    async def worker():
+        while time.monotonic() < deadline:
+            try:
+                probe = await policy.acquire()
+                with policy.request(probe):
+                    await host.request()
+                counts["ok"] += 1
+            except CircuitOpen as e:
+                counts["circuit_open"] += 1
+                await asyncio.sleep(min(e.retry_in, max(0.0, deadline - time.monotonic())))
+            except Blocked as e:
+                counts[str(e.status)] += 1
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return counts, policy.rate, policy.breaker.opens if isinstance(policy, HostPolicy) else 0
+
+def report(label: str, args, result):
+    counts, final_rate, opens = result
+    print(f"  {label:<10} {counts['ok'] / args.seconds:8.1f} ok/s  {counts['429']:6d} x429  "
+          f"{counts['403']:6d} x403  {opens:3d} circuit opens  final rate {final_rate:.1f}/s")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--capacity", type=float, default=20, help="requests/second the host tolerates")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--fixed-rate", type=float, default=40, help="rate of the fixed limiter")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--ban-after", type=int, default=20, help="429s within 10s that get the client banned")
+    parser.add_argument("--ban-seconds", type=float, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    print(f"Host capacity {args.capacity:g}/s, {args.seconds:g}s run, {args.concurrency} workers")
+    report("fixed", args, await run(args, FixedRate(args.fixed_rate, burst=args.concurrency)))
+    adaptive = HostPolicy("adaptive", args.capacity / 4, burst=1, max_rate=args.capacity * 3, increase=0.5,
+                          decrease=0.5, failure_threshold=3, cooldown_seconds=2, max_cooldown_seconds=10)
+    report("aimd", args, await run(args, adaptive))
+
+if __name__ == "__main__":
+    asyncio.run(main())
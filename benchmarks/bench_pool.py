@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent searches against the fixture server at different pool sizes
+
+Usage: python -m benchmarks.bench_pool [--requests 32] [--sizes 1,2,4,8]
+"""
+
+import argparse
+import asyncio
+import time
+from typing import List
+
+from benchmarks.fixture_server import serve_fixtures, unthrottled
+from browser_pool import PoolExhausted
+from models import FlightSearch
+from tracker import RewardSeatTracker
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+async def run_once(base_url: str, pool_size: int, requests: int):
+    tracker = RewardSeatTracker(
+        pool_settings={"size": pool_size, "max_waiters": requests},
+        base_urls={"virgin_atlantic": base_url},
+        politeness=unthrottled(),
+    )
+    await tracker.start_browser()
+    search = FlightSearch(origin="LHR", destination="BLR", month=10, year=2025)
+    latencies = []
+    rejected = 0
+
+    async def one():
+        nonlocal rejected
+        started = time.perf_counter()
+        try:
+            await tracker.search(search)
+        except PoolExhausted:
+            rejected += 1
+            return
+        latencies.append(time.perf_counter() - started)
+
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+    finally:
+        await tracker.close_browser()
+
+    if latencies:
+        print(f"pool={pool_size:<3} req/s={len(latencies) / elapsed:6.2f} "
+              f"p50={percentile(latencies, 50):6.2f}s p99={percentile(latencies, 99):6.2f}s "
+              f"rejected={rejected}")
+    else:
+        print(f"pool={pool_size:<3} all {rejected} requests rejected")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--sizes", default="1,2,4,8")
+    args = parser.parse_args()
+
+    with serve_fixtures() as base_url:
+        for size in [int(s) for s in args.sizes.split(",")]:
+            await run_once(base_url, size, args.requests)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Time to first result and peak memory for a month span, buffered sweep versus streaming
+
+Usage: python -m benchmarks.bench_range [--routes 4] [--months 24] [--scrape-ms 300]
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+from datetime import datetime
+
+from models import FlightResult, RangeSearch, Route
+from orchestrator import Orchestrator
+
+DESTINATIONS = ("BLR", "JFK", "LAX", "DEL", "SFO", "BOS", "MIA", "JNB")
+
+class MockScraper:
+    """Returns a full month (31 days x 3 cabins) after a fixed delay"""
+
+    def __init__(self, scrape_seconds: float):
+        self.scrape_seconds = scrape_seconds
+
+    async def fetch(self, search):
+        await asyncio.sleep(self.scrape_seconds)
+        observed = datetime.now()
+        return [
+            FlightResult(date=f"{search.year}-{search.month:02d}-{day:02d}", availability=True,
+                         price="47,500 pts", booking_class=cabin, timestamp=observed, points=47500)
+            for day in range(1, 32)
+            for cabin in ("economy", "premium", "upper_class")
+        ]
+
+def range_search(args) -> RangeSearch:
+    end = args.months - 1
+    return RangeSearch(
+        routes=[Route(origin="LHR", destination=d) for d in DESTINATIONS[:args.routes]],
+        start_month=1, start_year=2026,
+        end_month=end % 12 + 1, end_year=2026 + end // 12,
+    )
+
+async def run(args, streaming: bool):
+    orchestrator = Orchestrator(MockScraper(args.scrape_ms / 1000), concurrency=args.concurrency)
+    search = range_search(args)
+    tracemalloc.start()
+    started = time.perf_counter()
+    first = None
+    months = 0
+    if streaming:
+        async for job in orchestrator.stream(search.searches()):
+            first = first or time.perf_counter() - started
+            job.to_dict()
+            months += 1
+    else:
+        sweep = await orchestrator.run(list(search.searches()))
+        first = time.perf_counter() - started
+        sweep.to_dict()
+        months = len(sweep.jobs)
+    total = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    label = "streaming" if streaming else "buffered"
+    print(f"{label:<10} months={months:<4} first result={first:6.2f}s total={total:6.2f}s "
+          f"peak memory={peak / 1024 / 1024:6.1f} MiB")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--routes", type=int, default=4)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--scrape-ms", type=float, default=300)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    await run(args, streaming=False)
+    await run(args, streaming=True)
+
+if __name__ == "__main__":
+    asyncio.run(main())
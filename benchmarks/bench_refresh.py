@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Scrapes, parses, CPU and rows written per check, full refresh versus incremental
+
+Replays a simulated week of 09:00/20:00 checks through FlightCheck against a
+mock tracker whose months change less often the further ahead they are.
+
+Usage: python -m benchmarks.bench_refresh [--routes 20] [--months 12] [--days 7]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from airlines import get_adapter
+from availability_api import availability_days
+from models import calendar_to_results
+from refresh import MonthFetch, content_hash, month_key
+from scheduler import FlightCheck
+
+DESTINATIONS = ("BLR", "JFK", "LAX", "DEL", "SFO", "BOS", "MIA", "JNB", "SEA", "ATL")
+CABINS = ("ECONOMY", "PREMIUM", "UPPER_CLASS")
+
+class MockTracker:
+    """Serves availability API payloads that drift between checks, parsed by the real adapter"""
+
+    def __init__(self, args, seed: int = 1):
+        self.browser = self
+        self.args = args
+        self.rng = random.Random(seed)
+        self.payloads = {}
+        self.adapter = get_adapter("virgin_atlantic")
+        self.parses = 0
+
+    def is_connected(self) -> bool:
+        return True
+
+    async def close_browser(self):
+        pass
+
+    def payload(self, search):
+        key = month_key(search)
+        if key not in self.payloads:
+            self.payloads[key] = {
+                "calendar": {"days": [
+                    {"date": f"{search.year}-{search.month:02d}-{day:02d}", "cabins": [
+                        {"cabinClass": cabin, "available": True, "points": self.rng.randrange(10, 120) * 1000}
+                        for cabin in CABINS
+                    ]}
+                    for day in range(1, 29)
+                ]},
+            }
+        return self.payloads[key]
+
+    def advance(self, now: datetime):
+        """Between checks, near-term months change often and far-off months rarely"""
+        for (_, _, _, year, month), payload in self.payloads.items():
+            months_ahead = max(0, (year - now.year) * 12 + month - now.month)
+            if self.rng.random() < self.args.hot_rate * 0.6 ** months_ahead:
+                fare = self.rng.choice(self.rng.choice(payload["calendar"]["days"])["cabins"])
+                fare["points"] = self.rng.randrange(10, 120) * 1000
+
+    async def fetch_month(self, search, known_hash=None) -> MonthFetch:
+        payload = self.payload(search)
+        # The envelope changes on every response; only the day list is hashed
+        payload["requestId"] = self.rng.getrandbits(64)
+        digest = "json:" + content_hash(availability_days(payload))
+        if digest == known_hash:
+            return MonthFetch(results=None, content_hash=digest)
+        self.parses += 1
+        results = calendar_to_results(self.adapter.parse_json(payload), search)
+        return MonthFetch(results=results, content_hash=digest)
+
+    async def fetch(self, search):
+        return (await self.fetch_month(search)).results
+
+def bench_config(args, directory: str, incremental: bool):
+    # Numbered origins keep routes distinct once the destinations repeat
+    routes = [
+        {"origin": f"O{i:02d}", "destination": DESTINATIONS[i % len(DESTINATIONS)], "year": 2026,
+         "months": list(range(1, args.months + 1)), "airlines": ["virgin_atlantic"]}
+        for i in range(args.routes)
+    ]
+    return {
+        "routes": routes,
+        "notifications": {},
+        "storage": {"path": os.path.join(directory, f"bench-{incremental}.db")},
+        "refresh": {"enabled": incremental},
+        "tracking": {"concurrency": 16, "max_retries": 1},
+    }
+
+async def run(args, incremental: bool):
+    with tempfile.TemporaryDirectory() as directory:
+        check = FlightCheck(bench_config(args, directory, incremental))
+        check.tracker = MockTracker(args)
+        now = datetime(2026, 1, 1, 9, 0)
+        totals = {"scraped": 0, "unchanged": 0, "rows_written": 0, "cpu": 0.0, "checks": 0}
+        try:
+            while now < datetime(2026, 1, 1) + timedelta(days=args.days):
+                check.tracker.advance(now)
+                cpu = time.process_time()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    record = await check.check(now)
+                totals["cpu"] += time.process_time() - cpu
+                totals["checks"] += 1
+                totals["scraped"] += record["jobs"]
+                totals["unchanged"] += record["unchanged"]
+                totals["rows_written"] += record["rows_written"]
+                now += timedelta(hours=11) if now.hour == 9 else timedelta(hours=13)
+            totals["parses"] = check.tracker.parses
+        finally:
+            await check.close()
+    return totals
+
+def report(label: str, totals):
+    checks = totals["checks"]
+    print(f"{label:<12} {totals['scraped'] / checks:8.1f} {totals['parses'] / checks:8.1f} "
+          f"{totals['rows_written'] / checks:10.0f} {totals['cpu'] / checks * 1000:10.1f}")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--routes", type=int, default=20)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--days", type=int, default=7, help="simulated days of twice-daily checks")
+    parser.add_argument("--hot-rate", type=float, default=0.8,
+                        help="chance the current month changes between checks (decays 0.6x per month ahead)")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    print(f"{args.routes} routes x {args.months} months, {args.days} days of checks; per check:")
+    print(f"{'':<12} {'scraped':>8} {'parsed':>8} {'rows':>10} {'cpu ms':>10}")
+    full = await run(args, incremental=False)
+    report("full", full)
+    incremental = await run(args, incremental=True)
+    report("incremental", incremental)
+    print(f"rows written: {incremental['rows_written'] / max(full['rows_written'], 1):.1%} of full, "
+          f"CPU: {incremental['cpu'] / max(full['cpu'], 1e-9):.1%} of full")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Load a synthetic observation history into SQLite and time the query helpers
+
+Usage: python -m benchmarks.bench_storage [--routes 5] [--scrapes 180] [--db /tmp/bench.db]
+"""
+
+import argparse
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from storage import AvailabilityStore
+
+CABINS = ("economy", "premium", "upper_class")
+DESTINATIONS = ("BLR", "JFK", "LAX", "DEL", "BOS", "SFO", "MIA", "JNB")
+
+def synthetic_scrape(origin: str, destination: str, observed_at: datetime, days: int):
+    """One scrape of a year of travel dates, every cabin"""
+    start = date(2025, 1, 1)
+    for offset in range(days):
+        travel_date = (start + timedelta(days=offset)).isoformat()
+        for cabin in CABINS:
+            points = random.choice((None, 10000, 20000, 35000, 47500, 57500))
+            yield ("virgin_atlantic", origin, destination, travel_date, cabin, points,
+                   int(points is not None), observed_at.isoformat())
+
+def timed(label: str, fn, repeat: int = 20):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        rows = fn()
+    elapsed = (time.perf_counter() - started) / repeat
+    print(f"  {label:<34} {elapsed * 1000:8.2f} ms ({len(rows)} rows)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--routes", type=int, default=5)
+    parser.add_argument("--scrapes", type=int, default=180)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--db", default="/tmp/bench_availability.db")
+    args = parser.parse_args()
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(args.db + suffix):
+            os.remove(args.db + suffix)
+
+    random.seed(1)
+    store = AvailabilityStore(args.db)
+    observed = datetime(2025, 1, 1, 9, 0)
+    total = 0
+    started = time.perf_counter()
+    for scrape in range(args.scrapes):
+        for destination in DESTINATIONS[:args.routes]:
+            total += store.save_rows(list(synthetic_scrape("LHR", destination, observed, args.days)))
+        observed += timedelta(hours=12)
+    elapsed = time.perf_counter() - started
+    print(f"Inserted {total:,} observations in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+
+    timed("latest snapshot, one month", lambda: store.latest_snapshot("LHR", "BLR", "2025-10-01", "2025-10-31"))
+    timed("latest snapshot, one month, cabin", lambda: store.latest_snapshot("LHR", "BLR", "2025-10-01", "2025-10-31", cabin="upper_class"))
+    timed("history, one date", lambda: store.history("LHR", "BLR", "2025-10-19"))
+    timed("history, one date, cabin", lambda: store.history("LHR", "BLR", "2025-10-19", cabin="upper_class"))
+    store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Time a full routes x months sweep against the fixture server at different concurrency
+
+Usage: python -m benchmarks.bench_sweep [--routes 3] [--months 3] [--concurrency 1,4]
+"""
+
+import argparse
+import asyncio
+
+from benchmarks.fixture_server import serve_fixtures, unthrottled
+from tracker import RewardSeatTracker
+from models import FlightSearch
+from orchestrator import Orchestrator
+
+DESTINATIONS = ("BLR", "JFK", "LAX", "DEL", "BOS", "SFO", "MIA", "JNB")
+
+async def sweep(base_url: str, jobs, concurrency: int):
+    tracker = RewardSeatTracker(pool_settings={"size": concurrency}, base_urls={"virgin_atlantic": base_url},
+                                politeness=unthrottled())
+    await tracker.start_browser()
+    try:
+        result = await Orchestrator(tracker, concurrency=concurrency).run(jobs)
+    finally:
+        await tracker.close_browser()
+    failed = sum(1 for job in result.jobs if not job.ok)
+    print(f"concurrency={concurrency:<3} jobs={len(jobs):<4} total={result.duration:6.2f}s "
+          f"per job={result.duration / len(jobs):5.2f}s failed={failed}")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--routes", type=int, default=3)
+    parser.add_argument("--months", type=int, default=3)
+    parser.add_argument("--concurrency", default="1,4")
+    args = parser.parse_args()
+
+    jobs = [
+        FlightSearch(origin="LHR", destination=destination, month=month, year=2025)
+        for destination in DESTINATIONS[:args.routes]
+        for month in range(10, 10 + args.months)
+    ]
+    with serve_fixtures() as base_url:
+        for concurrency in [int(c) for c in args.concurrency.split(",")]:
+            await sweep(base_url, jobs, concurrency)
+
+if __name__ == "__main__":
+    asyncio.run(main())
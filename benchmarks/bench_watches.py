@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Matching one scraped month against a growing number of watches: bucketed index versus scanning every watch
+
+Watches are spread over count / --per-route routes, windows of 1-30 days
+across a year, so each route keeps a similar number of watches however
+many users there are.
+
+Usage: python -m benchmarks.bench_watches [--counts 1000,10000,100000] [--per-route 20]
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from watches import Watch, WatchIndex, match_rows
+
+CABINS = ("economy", "premium", "upper_class")
+YEAR_START = date(2026, 1, 1)
+
+def synthetic_watches(count: int, per_route: int, seed: int = 1):
+    rng = random.Random(seed)
+    routes = max(1, count // per_route)
+    for watch_id in range(count):
+        start = YEAR_START + timedelta(days=rng.randrange(365))
+        yield Watch(
+            id=watch_id,
+            origin="LHR",
+            destination=f"D{rng.randrange(routes):05d}",
+            start=start,
+            end=start + timedelta(days=rng.randrange(30)),
+            cabin=rng.choice((None,) + CABINS),
+            max_points=rng.choice((None, 30000, 50000, 80000)),
+            airline=None,
+            recipients=(f"email:user{watch_id % 5000}@example.com",),
+        )
+
+def scraped_month(seed: int = 2):
+    """Every day and cabin of October on one route with seats, as latest_snapshot returns them"""
+    rng = random.Random(seed)
+    return [
+        {"airline": "virgin_atlantic", "origin": "LHR", "destination": "D00000", "travel_date": f"2026-10-{day:02d}",
+         "cabin": cabin, "points": rng.choice((20000, 47500, 72500))}
+        for day in range(1, 32) for cabin in CABINS
+    ]
+
+def indexed(index, rows):
+    matched, _ = match_rows(index.covering(rows), {})
+    return matched
+
+def scan(watches, rows):
+    """What matching costs without an index: every seat against every watch"""
+    pairs = []
+    for row in rows:
+        travel_date = date.fromisoformat(row["travel_date"])
+        for watch in watches:
+            if (watch.origin, watch.destination) == (row["origin"], row["destination"]) \
+                    and watch.covers(row["airline"], row["cabin"], travel_date):
+                pairs.append((watch, row))
+    matched, _ = match_rows(pairs, {})
+    return matched
+
+def timed(fn, iterations: int) -> float:
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", default="1000,10000,100000", help="comma-separated watch counts")
+    parser.add_argument("--per-route", type=int, default=20, help="average watches per route")
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = scraped_month()
+    print(f"{len(rows)} seats (one route-month) matched against N watches, {args.per_route} per route")
+    print(f"  {'watches':>8} {'build ms':>9} {'candidates':>11} {'index ms':>9} {'scan ms':>9} {'speedup':>8}")
+    for count in (int(n) for n in args.counts.split(",")):
+        watches = list(synthetic_watches(count, args.per_route))
+        started = time.perf_counter()
+        index = WatchIndex()
+        for watch in watches:
+            index.add(watch)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        matched = indexed(index, rows)
+        scanned = scan(watches, rows)
+        assert {k: len(v) for k, v in matched.items()} == {k: len(v) for k, v in scanned.items()}
+        candidates = sum(len(index.candidates(row["origin"], row["destination"],
+                                              date.fromisoformat(row["travel_date"])))
+                         for row in rows)
+
+        index_ms = timed(lambda: indexed(index, rows), args.iterations)
+        # The scan is slow at large counts; a few runs are enough
+        scan_ms = timed(lambda: scan(watches, rows), max(1, min(args.iterations, 200000 // count)))
+        print(f"  {count:>8,} {build_ms:>9.1f} {candidates:>11,} {index_ms:>9.3f} {scan_ms:>9.1f} "
+              f"{scan_ms / index_ms:>7.0f}x")
+
+if __name__ == "__main__":
+    main()
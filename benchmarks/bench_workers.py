@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Sweep throughput through the Celery worker pool as airlines, each with its own worker, are added
+
+Runs without Redis or Chromium: the broker is kombu's filesystem transport,
+results go to the file backend, and each worker's tracker is a mock that
+holds its single page for --scrape-ms (plus --parse-repeat calendar parses
+of CPU) per month. Every airline's queue gets one single-process worker, as
+in production, and the sweep's months are spread over that many airlines.
+
+Usage: python -m benchmarks.bench_workers [--workers 1,2,4] [--jobs 24] [--scrape-ms 500]
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import List
+
+import tasks
+from models import FlightResult, FlightSearch
+from refresh import MonthFetch
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class MockTracker:
+    """A worker's tracker: one page, so one month at a time, like a real single-context worker"""
+
+    def __init__(self, scrape_seconds: float, parse_repeat: int):
+        self.scrape_seconds = scrape_seconds
+        self.parse_repeat = parse_repeat
+        self.text = ""
+
+    async def start_browser(self):
+        from benchmarks.bench_calendar_parser import html_to_text
+        from benchmarks.fixture_server import FIXTURES_DIR
+
+        with open(os.path.join(FIXTURES_DIR, "virgin_atlantic_month_text.html")) as f:
+            self.text = html_to_text(f.read())
+
+    async def close_browser(self):
+        pass
+
+    async def fetch_month(self, search: FlightSearch, known_hash=None) -> MonthFetch:
+        from calendar_parser import parse_calendar_text
+
+        await asyncio.sleep(self.scrape_seconds)
+        for _ in range(self.parse_repeat):
+            calendar = parse_calendar_text(self.text)
+        observed = datetime.now()
+        results = [
+            FlightResult(date=f"{search.year}-{search.month:02d}-{day:02d}", availability=True,
+                         price="47,500 pts", booking_class="upper_class", timestamp=observed, points=47500)
+            for day in range(1, 29)
+        ]
+        return MonthFetch(results=results, content_hash=f"mock:{len(calendar) if self.parse_repeat else 0}")
+
+def configure(directory: str):
+    """Point the app at a private filesystem broker and file result backend under directory"""
+    tasks.celery_app.conf.update(tasks.celery_settings({"workers": {
+        "broker_url": "filesystem://",
+        "broker_folder": os.path.join(directory, "broker"),
+        "result_backend": f"file://{os.path.join(directory, 'results')}",
+    }}))
+    os.makedirs(os.path.join(directory, "results"), exist_ok=True)
+
+# Imported by the worker processes (celery -A benchmarks.bench_workers): configure from the environment
+if os.environ.get("BENCH_WORKERS_DIR"):
+    configure(os.environ["BENCH_WORKERS_DIR"])
+    tasks.tracker_factory = lambda: MockTracker(float(os.environ["BENCH_SCRAPE_SECONDS"]),
+                                                int(os.environ["BENCH_PARSE_REPEAT"]))
+celery_app = tasks.celery_app
+
+def airlines(count: int):
+    return [f"airline{i}" for i in range(count)]
+
+def start_workers(count: int, directory: str, args) -> List[subprocess.Popen]:
+    env = {
+        **os.environ,
+        "BENCH_WORKERS_DIR": directory,
+        "BENCH_SCRAPE_SECONDS": str(args.scrape_ms / 1000),
+        "BENCH_PARSE_REPEAT": str(args.parse_repeat),
+    }
+    return [subprocess.Popen(
+        [sys.executable, "-m", "celery", "-A", "benchmarks.bench_workers", "worker", "--pool", "prefork",
+         "--concurrency", "1", "--queues", tasks.airline_queue(airline), "-n", f"{airline}@%h",
+         "--loglevel", "ERROR", "--without-heartbeat", "--without-gossip", "--without-mingle"],
+        cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    ) for airline in airlines(count)]
+
+def searches(count: int, airline_count: int):
+    names = airlines(airline_count)
+    return [FlightSearch(origin="LHR", destination=f"D{i:02d}", month=i % 12 + 1, year=2026,
+                         airline=names[i % airline_count]) for i in range(count)]
+
+async def sweep(count: int, directory: str, args) -> float:
+    from orchestrator import Orchestrator
+
+    workers = start_workers(count, directory, args)
+    try:
+        remote = tasks.RemoteTracker(timeout_seconds=120)
+        # Warm up every worker process (browser start) before timing
+        await asyncio.gather(*(remote.fetch(search) for search in searches(count, count)))
+        started = time.perf_counter()
+        sweep = await Orchestrator(remote, concurrency=args.jobs, max_retries=1,
+                                   timeout_seconds=120).run(searches(args.jobs, count))
+        elapsed = time.perf_counter() - started
+        failed = [job.error for job in sweep.jobs if not job.ok]
+        if failed:
+            print(f"  {len(failed)} jobs failed, e.g. {failed[0]}")
+        return elapsed
+    finally:
+        for worker in workers:
+            worker.send_signal(signal.SIGTERM)
+        for worker in workers:
+            worker.wait(timeout=30)
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated airline (and worker) counts")
+    parser.add_argument("--jobs", type=int, default=24, help="months per sweep")
+    parser.add_argument("--scrape-ms", type=float, default=500, help="time each mock scrape holds its page")
+    parser.add_argument("--parse-repeat", type=int, default=0, help="CPU work per month, in calendar parses")
+    args = parser.parse_args()
+
+    print(f"{args.jobs} months, {args.scrape_ms:g}ms per scrape, {os.cpu_count()} CPUs")
+    baseline = None
+    # One broker folder for the whole run: kombu caches its transport options on first publish
+    with tempfile.TemporaryDirectory() as directory:
+        configure(directory)
+        for count in (int(n) for n in args.workers.split(",")):
+            elapsed = await sweep(count, directory, args)
+            baseline = baseline or elapsed
+            print(f"  {count:2d} airlines {elapsed:6.2f}s  {args.jobs / elapsed:6.1f} months/s  "
+                  f"speedup {baseline / elapsed:.1f}x")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Local HTTP server that serves saved airline pages and API responses so benchmarks never hit the live site
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures")
+CORPUS_PATH = os.path.join(FIXTURES_DIR, "corpus.json")
+
+CONTENT_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".json": "application/json",
+}
+
+def load_corpus(path: str = CORPUS_PATH) -> List[Dict[str, Any]]:
+    """Fixture cases: file, airline, month, the URL path (and query) it answers and spot-checked values"""
+    with open(path) as f:
+        return json.load(f)["cases"]
+
+def match_case(cases: List[Dict[str, Any]], url: str) -> Optional[Dict[str, Any]]:
+    """First case whose path matches and whose query constraints all hold"""
+    parsed = urlparse(url)
+    query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+    for case in cases:
+        if case["path"] == parsed.path and all(query.get(k) == v for k, v in case.get("query", {}).items()):
+            return case
+    return None
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        case = match_case(self.server.cases, self.path)
+        if case is None:
+            self.send_error(404)
+            return
+
+        # Stand-in for network and origin time on the real site
+        delay = self.server.latency_ms + random.uniform(0, self.server.jitter_ms)
+        if delay:
+            time.sleep(delay / 1000)
+
+        body = self.server.bodies[case["file"]]
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPES[os.path.splitext(case["file"])[1]])
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def unthrottled():
+    """Politeness without pacing: the fixture server is local, so rate limits would only skew timings"""
+    from airlines import ADAPTERS
+    from politeness import Politeness
+
+    return Politeness(airline_rates={name: 0 for name in ADAPTERS})
+
+@contextmanager
+def serve_fixtures(port: int = 0, latency_ms: float = 0, jitter_ms: float = 0, corpus_path: str = CORPUS_PATH):
+    """Run the fixture server in a background thread and yield its base URL
+
+    Every response is delayed by latency_ms plus up to jitter_ms.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), FixtureHandler)
+    server.daemon_threads = True
+    server.cases = load_corpus(corpus_path)
+    server.bodies = {}
+    for case in server.cases:
+        with open(os.path.join(FIXTURES_DIR, case["file"]), "rb") as f:
+            server.bodies[case["file"]] = f.read()
+    server.latency_ms = latency_ms
+    server.jitter_ms = jitter_ms
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the fixture corpus locally")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    with serve_fixtures(args.port, args.latency_ms, args.jitter_ms) as base_url:
+        print(f"Serving fixtures at {base_url} (Ctrl+C to stop)")
+        for case in load_corpus():
+            query = "&".join(f"{k}={v}" for k, v in case.get("query", {}).items())
+            print(f"  {case['name']:<16} {case['path']}{'?' + query if query else ''}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
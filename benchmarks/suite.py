@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Extraction benchmark suite over the fixture corpus, compared against stored baselines
+
+Measures parse time per corpus case, Python memory per parsed month, end-to-end
+search latency and memory through RewardSeatTracker, and browser cold start.
+Exits non-zero if a fixture parses wrongly or a metric regresses past its
+tolerance. Browser metrics are skipped when Chromium can't be launched.
+
+Usage: python -m benchmarks.suite [--only parse,search,browser] [--latency-ms 50] [--update-baseline]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Optional
+
+from airlines import get_adapter
+from benchmarks.bench_calendar_parser import html_to_text
+from benchmarks.fixture_server import FIXTURES_DIR, load_corpus, serve_fixtures, unthrottled
+from calendar_parser import parse_calendar_text
+from models import FlightSearch, calendar_to_results
+from readiness import AdaptiveTimeouts
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+DEFAULT_TOLERANCE = 0.25
+
+class Suite:
+    def __init__(self):
+        self.metrics: Dict[str, Dict[str, Any]] = {}
+        self.failures = []
+
+    def record(self, name: str, value: float, unit: str, better: str = "lower"):
+        self.metrics[name] = {"value": round(value, 4), "unit": unit, "better": better}
+        print(f"  {name:<36} {value:10.3f} {unit}")
+
+def time_per_call(fn: Callable[[], Any], iterations: int, batches: int = 5) -> float:
+    """Median over batches of the mean call time, in milliseconds"""
+    per_batch = max(1, iterations // batches)
+    timings = []
+    for _ in range(batches):
+        started = time.perf_counter()
+        for _ in range(per_batch):
+            fn()
+        timings.append((time.perf_counter() - started) / per_batch)
+    return statistics.median(timings) * 1000
+
+def case_parser(case: Dict[str, Any]) -> Callable[[], Dict]:
+    """Offline equivalent of what the adapter does with this fixture in a browser"""
+    adapter = get_adapter(case["airline"])
+    with open(os.path.join(FIXTURES_DIR, case["file"])) as f:
+        raw = f.read()
+    if case["file"].endswith(".json"):
+        payload = json.loads(raw)
+        return lambda: adapter.parse_json(payload)
+    text = html_to_text(raw)
+    return lambda: parse_calendar_text(text, grammar=adapter.grammar)
+
+def run_parse(suite: Suite, iterations: int):
+    print("parse")
+    for case in load_corpus():
+        parse = case_parser(case)
+        calendar = parse()
+        for day, cabins in case["expected"].items():
+            if calendar.get(int(day)) != cabins:
+                suite.failures.append(
+                    f"{case['name']}: day {day} parsed as {calendar.get(int(day))}, expected {cabins}"
+                )
+
+        search = FlightSearch(origin="LHR", destination="BLR", month=case["month"], year=case["year"],
+                              airline=case["airline"])
+        suite.record(f"parse.{case['name']}", time_per_call(parse, iterations), "ms")
+
+        tracemalloc.start()
+        calendar_to_results(parse(), search)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        suite.record(f"memory.parse.{case['name']}", peak / 1024, "KiB")
+
+async def run_search(suite: Suite, searches: int, latency_ms: float):
+    from tracker import RewardSeatTracker
+
+    print(f"search (fixture latency {latency_ms:g}ms)")
+    with serve_fixtures(latency_ms=latency_ms) as base_url:
+        for fetch_mode in ("api", "dom"):
+            tracker = RewardSeatTracker(pool_settings={"size": 1}, base_urls={"virgin_atlantic": base_url},
+                                        fetch_mode=fetch_mode, politeness=unthrottled())
+            # Learn timeouts within the run only; never overwrite readiness_timings.json
+            tracker.timeouts = AdaptiveTimeouts(path=None)
+            await tracker.start_browser()
+            search = FlightSearch(origin="LHR", destination="BLR", month=10, year=2025)
+            try:
+                timings = []
+                for _ in range(searches):
+                    started = time.perf_counter()
+                    results = await tracker.fetch(search)
+                    timings.append(time.perf_counter() - started)
+                if not results:
+                    suite.failures.append(f"search.{fetch_mode}: no results from the fixture server")
+                suite.record(f"search.{fetch_mode}.first", timings[0] * 1000, "ms")
+                suite.record(f"search.{fetch_mode}.median", statistics.median(timings) * 1000, "ms")
+
+                tracemalloc.start()
+                await tracker.fetch(search)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                suite.record(f"memory.search.{fetch_mode}", peak / 1024, "KiB")
+            finally:
+                await tracker.close_browser()
+
+async def run_browser(suite: Suite, runs: int):
+    from browser_factory import start_browser
+
+    print("browser")
+    with serve_fixtures() as base_url:
+        url = f"{base_url}/reward-flight-finder/results/month?origin=LHR&destination=BLR&month=10&year=2025"
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            session = await start_browser("scraper")
+            page = await session.new_page()
+            await page.goto(url, wait_until="domcontentloaded")
+            timings.append(time.perf_counter() - started)
+            await session.close()
+    suite.record("browser.cold_start", statistics.median(timings) * 1000, "ms")
+
+def compare(suite: Suite, baselines: Dict[str, Any], default_tolerance: float) -> int:
+    """Print the comparison table and return the number of regressions"""
+    regressions = 0
+    print("\nagainst baseline")
+    for name, metric in suite.metrics.items():
+        base = baselines.get(name)
+        if base is None:
+            print(f"  {name:<36} no baseline")
+            continue
+        tolerance = base.get("tolerance", default_tolerance)
+        change = (metric["value"] - base["value"]) / base["value"] if base["value"] else 0.0
+        worse = change > tolerance if base["better"] == "lower" else change < -tolerance
+        regressions += worse
+        print(f"  {name:<36} {base['value']:10.3f} -> {metric['value']:10.3f} {metric['unit']:<4} "
+              f"{change:+7.1%}{'  REGRESSION' if worse else ''}")
+    return regressions
+
+def load_baselines(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+async def browser_available() -> Optional[str]:
+    """None if Chromium launches, otherwise why not"""
+    try:
+        from playwright.async_api import async_playwright
+
+        async with async_playwright() as playwright:
+            browser = await playwright.chromium.launch(headless=True)
+            await browser.close()
+        return None
+    except Exception as e:
+        return str(e).splitlines()[0]
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", default="parse,search,browser", help="comma-separated groups to run")
+    parser.add_argument("--iterations", type=int, default=200, help="parse calls per corpus case")
+    parser.add_argument("--searches", type=int, default=10, help="searches per fetch mode")
+    parser.add_argument("--runs", type=int, default=3, help="browser cold starts")
+    parser.add_argument("--latency-ms", type=float, default=50, help="fixture server delay per response")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed relative regression for metrics without their own")
+    parser.add_argument("--baseline", default=BASELINES_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="store this run's metrics as the baseline")
+    args = parser.parse_args()
+    groups = set(args.only.split(","))
+
+    suite = Suite()
+    if "parse" in groups:
+        run_parse(suite, args.iterations)
+    if groups & {"search", "browser"}:
+        reason = await browser_available()
+        if reason:
+            print(f"search/browser skipped, Chromium not available: {reason}")
+        else:
+            if "search" in groups:
+                await run_search(suite, args.searches, args.latency_ms)
+            if "browser" in groups:
+                await run_browser(suite, args.runs)
+
+    stored = load_baselines(args.baseline)
+    baselines = stored.get("metrics", {})
+    if args.update_baseline:
+        for name, metric in suite.metrics.items():
+            # Keep hand-tuned tolerances when refreshing values
+            tolerance = baselines.get(name, {}).get("tolerance")
+            baselines[name] = {**metric, **({"tolerance": tolerance} if tolerance is not None else {})}
+        with open(args.baseline, "w") as f:
+            json.dump({"latency_ms": args.latency_ms, "metrics": baselines}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline written to {args.baseline}")
+        regressions = 0
+    else:
+        if stored.get("latency_ms") not in (None, args.latency_ms):
+            print(f"\nNote: baseline was recorded with --latency-ms {stored['latency_ms']:g}")
+        regressions = compare(suite, baselines, args.tolerance)
+
+    for failure in suite.failures:
+        print(f"FAIL {failure}")
+    if suite.failures or regressions:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Shared browser launch profiles: headless by default, resource blocking, warm reuse
+"""
+
+import argparse
+import asyncio
+import copy
+import os
+from typing import Any, Dict, List, Optional
+
+from playwright.async_api import async_playwright
+
+from availability_api import ANALYTICS_HOSTS_RE
+from config import load_config
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_PROFILES: Dict[str, Dict[str, Any]] = {
+    # Servers and the scheduler: no display, only what the calendar needs
+    "scraper": {
+        "headless": True,
+        "block_resource_types": ["image", "font", "media"],
+        "block_analytics": True,
+        "user_data_dir": None,
+        "viewport": {"width": 1280, "height": 800},
+        "java_script_enabled": True,
+        "args": ["--disable-dev-shm-usage", "--disable-gpu"],
+    },
+    # Same, but cookies (and so the consent choice) survive between runs
+    "persistent": {
+        "headless": True,
+        "block_resource_types": ["image", "font", "media"],
+        "block_analytics": True,
+        "user_data_dir": "browser_profile",
+        "viewport": {"width": 1280, "height": 800},
+        "java_script_enabled": True,
+        "args": ["--disable-dev-shm-usage", "--disable-gpu"],
+    },
+    # Watching the browser by hand
+    "debug": {
+        "headless": False,
+        "block_resource_types": [],
+        "block_analytics": False,
+        "user_data_dir": None,
+        "viewport": None,
+        "java_script_enabled": True,
+        "args": [],
+    },
+}
+
+def resolve_profile(name: Optional[str] = None, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Built-in profile merged with any overrides under browser.profiles in config.json"""
+    settings = (config if config is not None else load_config()).get("browser", {})
+    name = name or settings.get("profile", "scraper")
+    profiles = copy.deepcopy(DEFAULT_PROFILES)
+    for profile_name, overrides in settings.get("profiles", {}).items():
+        profiles.setdefault(profile_name, copy.deepcopy(DEFAULT_PROFILES["scraper"])).update(overrides)
+    if name not in profiles:
+        raise ValueError(f"Unknown browser profile {name!r}; choose from {', '.join(sorted(profiles))}")
+    return profiles[name]
+
+def context_options(profile: Dict[str, Any]) -> Dict[str, Any]:
+    options = {"java_script_enabled": profile["java_script_enabled"]}
+    if profile.get("viewport"):
+        options["viewport"] = profile["viewport"]
+    else:
+        options["no_viewport"] = True
+    return options
+
+async def apply_blocking(context, profile: Dict[str, Any]):
+    """Abort blocked resource types and analytics for every page in the context"""
+    blocked_types = set(profile.get("block_resource_types") or [])
+    block_analytics = profile.get("block_analytics", False)
+    if not blocked_types and not block_analytics:
+        return
+
+    async def handle(route):
+        request = route.request
+        if request.resource_type in blocked_types or (block_analytics and ANALYTICS_HOSTS_RE.search(request.url)):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await context.route("**/*", handle)
+
+class SharedContext:
+    """Hands out pages from a persistent context as if it were a fresh one"""
+
+    def __init__(self, context):
+        self.context = context
+        self.request = context.request
+        self._pages: List[Any] = []
+
+    async def new_page(self):
+        page = await self.context.new_page()
+        self._pages.append(page)
+        return page
+
+    async def close(self):
+        # Closing the real context would end the persistent session
+        for page in self._pages:
+            if not page.is_closed():
+                await page.close()
+        self._pages.clear()
+
+class BrowserSession:
+    """A launched, persistent or CDP-connected browser behind one interface"""
+
+    def __init__(self, playwright, profile: Dict[str, Any], browser=None, persistent_context=None):
+        self.playwright = playwright
+        self.profile = profile
+        self.browser = browser
+        self.persistent_context = persistent_context
+
+    async def new_context(self):
+        if self.persistent_context is not None:
+            return SharedContext(self.persistent_context)
+        context = await self.browser.new_context(**context_options(self.profile))
+        await apply_blocking(context, self.profile)
+        return context
+
+    async def new_page(self):
+        context = await self.new_context()
+        return await context.new_page()
+
+    def is_connected(self) -> bool:
+        if self.persistent_context is not None:
+            return self.persistent_context.browser is None or self.persistent_context.browser.is_connected()
+        return self.browser.is_connected()
+
+    async def close(self):
+        """Close what we launched; for a CDP connection this only disconnects"""
+        if self.persistent_context is not None:
+            await self.persistent_context.close()
+        elif self.browser is not None:
+            await self.browser.close()
+        await self.playwright.stop()
+
+async def start_browser(profile_name: Optional[str] = None, config: Optional[Dict[str, Any]] = None,
+                        cdp_endpoint: Optional[str] = None) -> BrowserSession:
+    """Launch or attach to a browser for the given profile
+
+    With a CDP endpoint (argument or browser.cdp_endpoint) an already
+    running browser is reused, so no process start is paid per run.
+    """
+    config = config if config is not None else load_config()
+    profile = resolve_profile(profile_name, config)
+    cdp_endpoint = cdp_endpoint or config.get("browser", {}).get("cdp_endpoint")
+    playwright = await async_playwright().start()
+
+    try:
+        if cdp_endpoint:
+            browser = await playwright.chromium.connect_over_cdp(cdp_endpoint)
+            return BrowserSession(playwright, profile, browser=browser)
+
+        if profile.get("user_data_dir"):
+            user_data_dir = profile["user_data_dir"]
+            if not os.path.isabs(user_data_dir):
+                user_data_dir = os.path.join(BASE_DIR, user_data_dir)
+            context = await playwright.chromium.launch_persistent_context(
+                user_data_dir,
+                headless=profile["headless"],
+                args=profile.get("args", []),
+                **context_options(profile),
+            )
+            await apply_blocking(context, profile)
+            return BrowserSession(playwright, profile, persistent_context=context)
+
+        browser = await playwright.chromium.launch(headless=profile["headless"], args=profile.get("args", []))
+        return BrowserSession(playwright, profile, browser=browser)
+    except Exception:
+        await playwright.stop()
+        raise
+
+async def serve(port: int, profile_name: Optional[str]):
+    """Keep one browser running for other processes to attach to over CDP"""
+    profile = resolve_profile(profile_name)
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(
+            headless=profile["headless"],
+            args=profile.get("args", []) + [f"--remote-debugging-port={port}"],
+        )
+        print(f"Browser listening for CDP connections on http://127.0.0.1:{port} (Ctrl+C to stop)")
+        print(f'Set "cdp_endpoint": "http://127.0.0.1:{port}" under "browser" in config.json to reuse it')
+        try:
+            while browser.is_connected():
+                await asyncio.sleep(1)
+        finally:
+            await browser.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a long-lived browser for warm reuse")
+    parser.add_argument("--port", type=int, default=9222)
+    parser.add_argument("--profile", default=None)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.port, args.profile))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Bounded pool of browser contexts so concurrent searches get their own page
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class PoolExhausted(Exception):
+    """Raised when every context is checked out and the wait queue is full"""
+
+class PooledPage:
+    """One browser context with its page and navigation count"""
+
+    def __init__(self, context, page):
+        self.context = context
+        self.page = page
+        self.navigations = 0
+        self.broken = False
+
+class BrowserPool:
+    def __init__(self, browser, size: int = 4, max_waiters: int = 16,
+                 max_navigations: int = 50, acquire_timeout: float = 30.0,
+                 page_setup: Optional[Callable[[Any], Awaitable[None]]] = None):
+        self.browser = browser
+        self.size = size
+        self.max_waiters = max_waiters
+        self.max_navigations = max_navigations
+        self.acquire_timeout = acquire_timeout
+        self.page_setup = page_setup
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._slots: List[PooledPage] = []
+        self._waiters = 0
+        self._closed = False
+        self.recycled = 0
+        self.rejected = 0
+
+    async def start(self):
+        """Open all contexts up front so the first requests don't pay for it"""
+        for _ in range(self.size):
+            slot = await self._new_slot()
+            self._slots.append(slot)
+            self._idle.put_nowait(slot)
+
+    async def close(self):
+        """Close every context, including ones still checked out"""
+        self._closed = True
+        for slot in self._slots:
+            await self._close_slot(slot)
+        self._slots.clear()
+
+    @asynccontextmanager
+    async def page(self):
+        """Check out a page for the duration of the block"""
+        slot = await self._checkout()
+        try:
+            yield slot.page
+        except Exception:
+            slot.broken = True
+            raise
+        finally:
+            await self._return(slot)
+
+    def stats(self) -> Dict[str, Any]:
+        """Current occupancy, for health endpoints and benchmarks"""
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize(),
+            "in_use": self.size - self._idle.qsize(),
+            "waiting": self._waiters,
+            "recycled": self.recycled,
+            "rejected": self.rejected,
+        }
+
+    async def _checkout(self) -> PooledPage:
+        if self._closed:
+            raise PoolExhausted("Browser pool is closed")
+        # Waiters beyond the idle contexts are the ones actually queued
+        if self._waiters - self._idle.qsize() >= self.max_waiters:
+            self.rejected += 1
+            raise PoolExhausted(f"All {self.size} browser contexts busy and {self._waiters} requests queued")
+
+        self._waiters += 1
+        try:
+            slot = await asyncio.wait_for(self._idle.get(), timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise PoolExhausted(f"Timed out after {self.acquire_timeout}s waiting for a browser context")
+        finally:
+            self._waiters -= 1
+
+        if not await self._is_healthy(slot):
+            try:
+                slot = await self._recycle(slot)
+            except Exception:
+                slot.broken = True
+                self._idle.put_nowait(slot)
+                raise
+        return slot
+
+    async def _return(self, slot: PooledPage):
+        if self._closed:
+            await self._close_slot(slot)
+            return
+        if slot.broken or slot.navigations >= self.max_navigations:
+            try:
+                slot = await self._recycle(slot)
+            except Exception as e:
+                # Leave it marked broken; the next checkout retries the recycle
+                logger.error(f"Failed to recycle browser context: {e}")
+                slot.broken = True
+        self._idle.put_nowait(slot)
+
+    async def _is_healthy(self, slot: PooledPage) -> bool:
+        if slot.broken or slot.page.is_closed():
+            return False
+        try:
+            await asyncio.wait_for(slot.page.evaluate("1"), timeout=5)
+            return True
+        except Exception as e:
+            logger.warning(f"Browser context failed health check: {e}")
+            return False
+
+    async def _recycle(self, slot: PooledPage) -> PooledPage:
+        """Swap a worn-out or broken context for a fresh one"""
+        await self._close_slot(slot)
+        fresh = await self._new_slot()
+        self._slots[self._slots.index(slot)] = fresh
+        self.recycled += 1
+        return fresh
+
+    async def _new_slot(self) -> PooledPage:
+        context = await self.browser.new_context()
+        page = await context.new_page()
+        slot = PooledPage(context, page)
+
+        def count_navigation(frame):
+            if frame == page.main_frame:
+                slot.navigations += 1
+
+        page.on("framenavigated", count_navigation)
+        if self.page_setup:
+            await self.page_setup(page)
+        return slot
+
+    async def _close_slot(self, slot: Optional[PooledPage]):
+        if slot is None:
+            return
+        try:
+            await slot.context.close()
+        except Exception as e:
+            logger.debug(f"Ignoring error closing browser context: {e}")
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Single-pass parser for the reward flight finder month calendar
+"""
+
+import re
+from datetime import date
+from typing import Dict, Iterable, Optional, Pattern, Tuple
+
+# day of month -> cabin code -> points (None when the cabin is shown but has no seats)
+Calendar = Dict[int, Dict[str, Optional[int]]]
+
+CABIN_CODES = {
+    "economy": "economy",
+    "premium": "premium",
+    "premium economy": "premium",
+    "upper class": "upper_class",
+}
+
+CALENDAR_DAY_SELECTOR = "[data-date], .calendar-day"
+
+def token_pattern(cabin_names: Iterable[str], units: Iterable[str] = ("pts", "points")) -> Pattern:
+    """Day header, cabin label or price, as one alternation so text is scanned once left to right"""
+    # Longest first so 'Premium Economy' wins over 'Premium'
+    cabins = "|".join(
+        r"\s+".join(re.escape(word) for word in name.split())
+        for name in sorted(cabin_names, key=len, reverse=True)
+    )
+    unit = "|".join(re.escape(u) for u in units)
+    return re.compile(rf"""
+    \b(?:Mon|Tue|Wed|Thu|Fri|Sat|Sun)(?:day|sday|nesday|rsday|urday)?\s+(?P<day>\d{{1,2}})\b
+  | \b(?P<cabin>{cabins})\b
+  | (?P<points>\d{{1,3}}(?:,\d{{3}})+|\d+(?:\.\d+)?\s*[kK]|\d+)\s*(?:{unit})\b
+""", re.IGNORECASE | re.VERBOSE)
+
+class CalendarGrammar:
+    """The cabin labels and points unit one airline's calendar text uses"""
+
+    def __init__(self, cabin_codes: Dict[str, str], units: Tuple[str, ...] = ("pts", "points")):
+        self.cabin_codes = cabin_codes
+        self.units = units
+        self.token_re = token_pattern(cabin_codes, units)
+
+DEFAULT_GRAMMAR = CalendarGrammar(CABIN_CODES)
+TOKEN_RE = DEFAULT_GRAMMAR.token_re
+
+# Collects each calendar cell in one round-trip instead of two per element
+EXTRACT_CALENDAR_JS = """
+(selector) => {
+    const cells = document.querySelectorAll(selector);
+    if (!cells.length) {
+        return {cells: [], text: document.body ? document.body.innerText : ""};
+    }
+    return {
+        cells: Array.from(cells, el => ({date: el.getAttribute("data-date"), text: el.innerText})),
+        text: null,
+    };
+}
+"""
+
+def parse_points(raw: str) -> int:
+    """Turn '47,500' or '47.5k' into 47500"""
+    raw = raw.strip().lower().replace(",", "")
+    if raw.endswith("k"):
+        return int(round(float(raw[:-1].strip()) * 1000))
+    return int(raw)
+
+def cabin_code(name: str, cabin_codes: Dict[str, str] = CABIN_CODES) -> str:
+    """Normalise a cabin label such as 'Upper  Class' to 'upper_class'"""
+    return cabin_codes[" ".join(name.lower().split())]
+
+def parse_calendar_text(text: str, day: Optional[int] = None, grammar: CalendarGrammar = DEFAULT_GRAMMAR) -> Calendar:
+    """Parse calendar text into day -> cabin -> points in a single scan
+
+    Pass day when the text belongs to one known calendar cell; otherwise
+    days are taken from 'Sun 19' style headers in the text.
+    """
+    calendar: Calendar = {}
+    current_day = day
+    current_cabin = None
+
+    for match in grammar.token_re.finditer(text):
+        if match.group("day") is not None:
+            if day is None:
+                current_day = int(match.group("day"))
+                current_cabin = None
+        elif match.group("cabin") is not None:
+            if current_day is None:
+                continue
+            current_cabin = cabin_code(match.group("cabin"), grammar.cabin_codes)
+            calendar.setdefault(current_day, {}).setdefault(current_cabin, None)
+        elif current_day is not None and current_cabin is not None:
+            cabins = calendar[current_day]
+            if cabins[current_cabin] is None:
+                cabins[current_cabin] = parse_points(match.group("points"))
+            # Only the first price after a cabin label belongs to it
+            current_cabin = None
+
+    return calendar
+
+def day_from_attribute(value: Optional[str]) -> Optional[int]:
+    """Day of month from a data-date attribute like '2025-10-19'"""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value[:10]).day
+    except ValueError:
+        return None
+
+def parse_calendar_cells(extracted: Dict, grammar: CalendarGrammar = DEFAULT_GRAMMAR) -> Calendar:
+    """Parse the payload returned by EXTRACT_CALENDAR_JS"""
+    if not extracted["cells"]:
+        return parse_calendar_text(extracted["text"] or "", grammar=grammar)
+
+    calendar: Calendar = {}
+    for cell in extracted["cells"]:
+        parsed = parse_calendar_text(cell["text"] or "", day=day_from_attribute(cell["date"]), grammar=grammar)
+        for day, cabins in parsed.items():
+            merged = calendar.setdefault(day, {})
+            for cabin, points in cabins.items():
+                if merged.get(cabin) is None:
+                    merged[cabin] = points
+    return calendar
+
+async def extract_calendar(page, selector: str = CALENDAR_DAY_SELECTOR,
+                           grammar: CalendarGrammar = DEFAULT_GRAMMAR) -> Calendar:
+    """Read the whole month from the page with a single evaluate call"""
+    extracted = await page.evaluate(EXTRACT_CALENDAR_JS, selector)
+    return parse_calendar_cells(extracted, grammar)
+
+def format_points(points: Optional[int]) -> str:
+    """Display points the way the alerts always have, e.g. '47k pts'"""
+    if points is None:
+        return "Not found"
+    return f"{points // 1000}k pts"
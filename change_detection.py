@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Compare a new month snapshot with the stored one and emit availability changes
+"""
+
+import os
+from dataclasses import dataclass
+from enum import Enum
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    # Annotations only: notifiers import this module and shouldn't pay for pydantic models
+    from models import FlightResult, FlightSearch
+
+# Written by each check, read by the notifiers; empty means nothing changed
+CHANGES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "availability_changes.txt")
+
+# (travel_date, cabin) -> points, None when the cabin has no seats
+Snapshot = Dict[Tuple[str, str], Optional[int]]
+
+class ChangeType(str, Enum):
+    SEAT_APPEARED = "seat_appeared"
+    SEAT_DISAPPEARED = "seat_disappeared"
+    POINTS_DROPPED = "points_dropped"
+    POINTS_ROSE = "points_rose"
+
+@dataclass
+class AvailabilityChange:
+    kind: ChangeType
+    airline: str
+    origin: str
+    destination: str
+    travel_date: str
+    cabin: str
+    old_points: Optional[int]
+    new_points: Optional[int]
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "AvailabilityChange":
+        """A change back from the store's change log"""
+        return cls(kind=ChangeType(row["kind"]), airline=row["airline"], origin=row["origin"],
+                   destination=row["destination"], travel_date=row["travel_date"], cabin=row["cabin"],
+                   old_points=row["old_points"], new_points=row["new_points"])
+
+    def describe(self) -> str:
+        route = f"{self.origin}→{self.destination} {self.travel_date} {self.cabin.replace('_', ' ').title()}"
+        if self.kind == ChangeType.SEAT_APPEARED:
+            return f"{route}: seats available at {self.new_points:,} pts"
+        if self.kind == ChangeType.SEAT_DISAPPEARED:
+            return f"{route}: no longer available (was {self.old_points:,} pts)"
+        direction = "down" if self.kind == ChangeType.POINTS_DROPPED else "up"
+        return f"{route}: {direction} to {self.new_points:,} pts (was {self.old_points:,} pts)"
+
+@dataclass
+class Thresholds:
+    """Per-route filters deciding which changes are worth a notification"""
+    cabins: Optional[List[str]] = None
+    max_points: Optional[int] = None
+    min_points_change: int = 0
+    notify_points_rose: bool = False
+
+    @classmethod
+    def from_config(cls, settings: Dict[str, Any]) -> "Thresholds":
+        return cls(**{key: value for key, value in settings.items() if key in cls.__dataclass_fields__})
+
+    def allows(self, change: AvailabilityChange) -> bool:
+        if self.cabins is not None and change.cabin not in self.cabins:
+            return False
+        if change.kind == ChangeType.POINTS_ROSE and not self.notify_points_rose:
+            return False
+        if change.kind in (ChangeType.POINTS_DROPPED, ChangeType.POINTS_ROSE):
+            if abs(change.new_points - change.old_points) < self.min_points_change:
+                return False
+        if self.max_points is not None and change.new_points is not None:
+            # A drop that still leaves the price above the ceiling isn't interesting
+            if change.kind != ChangeType.POINTS_ROSE and change.new_points > self.max_points:
+                return False
+        return True
+
+def route_thresholds(config: Dict[str, Any], origin: str, destination: str) -> Thresholds:
+    """Thresholds from the matching config.json route, or no filtering"""
+    for route in config.get("routes", []):
+        if route.get("origin") == origin and route.get("destination") == destination:
+            return Thresholds.from_config(route.get("alert_thresholds", {}))
+    return Thresholds()
+
+def snapshot_from_results(results: Iterable["FlightResult"]) -> Snapshot:
+    return {(result.date, result.booking_class): result.points for result in results}
+
+def snapshot_from_rows(rows: Iterable[Dict[str, Any]]) -> Snapshot:
+    return {(row["travel_date"], row["cabin"]): row["points"] for row in rows}
+
+def diff_snapshots(search: "FlightSearch", old: Snapshot, new: Snapshot,
+                   thresholds: Optional[Thresholds] = None) -> List[AvailabilityChange]:
+    """Changes between two snapshots of the same route and month
+
+    An empty old snapshot is a first scrape and produces no events.
+    Dates missing from the new snapshot are treated as not scraped
+    rather than as seats disappearing.
+    """
+    if not old:
+        return []
+
+    thresholds = thresholds or Thresholds()
+    changes = []
+    for key, new_points in new.items():
+        if key not in old:
+            if new_points is None:
+                continue
+            kind = ChangeType.SEAT_APPEARED
+        else:
+            old_points = old[key]
+            if old_points == new_points:
+                continue
+            if old_points is None:
+                kind = ChangeType.SEAT_APPEARED
+            elif new_points is None:
+                kind = ChangeType.SEAT_DISAPPEARED
+            elif new_points < old_points:
+                kind = ChangeType.POINTS_DROPPED
+            else:
+                kind = ChangeType.POINTS_ROSE
+
+        travel_date, cabin = key
+        change = AvailabilityChange(
+            kind=kind,
+            airline=search.airline,
+            origin=search.origin,
+            destination=search.destination,
+            travel_date=travel_date,
+            cabin=cabin,
+            old_points=old.get(key),
+            new_points=new_points,
+        )
+        if thresholds.allows(change):
+            changes.append(change)
+
+    changes.sort(key=lambda change: (change.travel_date, change.cabin))
+    return changes
+
+def month_bounds(search: "FlightSearch") -> Tuple[str, str]:
+    return f"{search.year}-{search.month:02d}-01", f"{search.year}-{search.month:02d}-31"
+
+def detect_changes(store, search: "FlightSearch", results: List["FlightResult"],
+                   thresholds: Optional[Thresholds] = None) -> List[AvailabilityChange]:
+    """Diff results against the stored latest snapshot, then save them
+
+    Only the month's latest rows are read, so the cost follows the size
+    of the month rather than how much history has been stored. Every
+    change goes to the store's change log; thresholds only filter what
+    is returned.
+    """
+    start, end = month_bounds(search)
+    previous = snapshot_from_rows(
+        store.latest_snapshot(search.origin, search.destination, start, end, airline=search.airline)
+    )
+    changes = diff_snapshots(search, previous, snapshot_from_results(results))
+    store.save_results(search, results)
+    store.record_changes(changes)
+    if thresholds is None:
+        return changes
+    return [change for change in changes if thresholds.allows(change)]
+
+def format_changes(changes: List[AvailabilityChange]) -> str:
+    return "\n".join(change.describe() for change in changes)
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Reward seat tracker command line: search, watch, notify, schedule, serve and bench
+
+Subcommands import what they use when they run, so `--help` and notify
+never load Playwright, FastAPI or the pydantic models.
+"""
+
+import argparse
+import os
+import sys
+from typing import List, Optional, Tuple
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Summary of the last search, used by notify when no changes were recorded
+RESULTS_PATH = os.path.join(BASE_DIR, "extracted_points.txt")
+
+def parse_month(value: str) -> Tuple[int, int]:
+    try:
+        year, month = (int(part) for part in value.split("-"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{value!r} is not YYYY-MM")
+    if not 1 <= month <= 12:
+        raise argparse.ArgumentTypeError(f"month {month} is not between 1 and 12")
+    return year, month
+
+def parse_days(value: str) -> List[int]:
+    try:
+        return [int(day) for day in value.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{value!r} is not a comma-separated list of days")
+
+def cmd_search(args) -> int:
+    import asyncio
+    import json
+
+    from calendar_parser import format_points
+    from change_detection import CHANGES_PATH, detect_changes, format_changes, route_thresholds
+    from config import load_config
+    from metrics import span, trace_run
+    from models import FlightSearch
+    from politeness import Politeness
+    from storage import DB_PATH, AvailabilityStore
+    from tracker import RewardSeatTracker
+
+    config = load_config()
+    year, month = args.month
+    search = FlightSearch(origin=args.origin, destination=args.destination, month=month, year=year,
+                          airline=args.airline)
+
+    async def fetch():
+        tracker = RewardSeatTracker(
+            pool_settings={**config.get("browser_pool", {}), "size": 1},
+            fetch_mode=args.fetch_mode or config.get("scraping", {}).get("fetch_mode", "api"),
+            browser_profile=args.profile,
+            politeness=Politeness.from_config(config),
+        )
+        await tracker.start_browser()
+        try:
+            return await tracker.fetch(search)
+        finally:
+            await tracker.close_browser()
+
+    with trace_run("search", args.trace or config.get("metrics", {}).get("trace_dir")):
+        results = asyncio.run(fetch())
+        if args.save:
+            # Keep every scrape for price history and work out what changed since the last one
+            with span("persist", search.airline):
+                store = AvailabilityStore(config.get("storage", {}).get("path", DB_PATH))
+                thresholds = route_thresholds(config, search.origin, search.destination)
+                changes = detect_changes(store, search, results, thresholds)
+                store.close()
+            with open(CHANGES_PATH, "w") as f:
+                f.write(format_changes(changes))
+            print(f"{len(changes)} availability changes since the last check", file=sys.stderr)
+
+    shown = [
+        result for result in results
+        if (args.cabin is None or result.booking_class == args.cabin)
+        and (args.days is None or int(result.date[-2:]) in args.days)
+    ]
+    if args.json:
+        print(json.dumps([result.model_dump(mode="json") for result in shown], indent=2))
+    else:
+        for result in shown:
+            print(f"{result.date}  {result.booking_class:<12} {format_points(result.points)}")
+    with open(RESULTS_PATH, "w") as f:
+        f.write(", ".join(f"{result.date} {result.booking_class}: {format_points(result.points)}" for result in shown))
+    return 0
+
+def cmd_watch(args) -> int:
+    from pydantic import ValidationError
+
+    from config import load_config
+    from models import WatchSpec
+    from watches import WatchRegistry, watches_path
+
+    config = load_config()
+    registry = WatchRegistry(watches_path(config))
+    try:
+        registry.sync_config(config)
+        if args.action == "add":
+            try:
+                spec = WatchSpec(origin=args.origin, destination=args.destination, start_date=args.start,
+                                 end_date=args.end, cabin=args.cabin, max_points=args.max_points,
+                                 airline=args.airline, recipients=args.notify)
+            except ValidationError as e:
+                for error in e.errors():
+                    field = ".".join(str(part) for part in error["loc"])
+                    print(f"Invalid watch: {field + ': ' if field else ''}{error['msg']}", file=sys.stderr)
+                return 1
+            watch = registry.add(spec)
+            print(f"Watch {watch.id} registered")
+        elif args.action == "remove":
+            if not registry.remove(args.id):
+                print(f"Watch {args.id} not found", file=sys.stderr)
+                return 1
+            print(f"Watch {args.id} removed")
+        else:
+            # A bare `watch` lists everything
+            for watch in registry.list(getattr(args, "origin", None), getattr(args, "destination", None)):
+                cabin = watch.cabin or "any cabin"
+                ceiling = f" <= {watch.max_points:,} pts" if watch.max_points is not None else ""
+                print(f"{watch.id:6d}  {watch.origin}-{watch.destination} {watch.start}..{watch.end} "
+                      f"{cabin}{ceiling}  -> {', '.join(watch.recipients)}")
+    finally:
+        registry.close()
+    return 0
+
+def pending_message() -> str:
+    """The last check's changes, or failing that the last search summary"""
+    from change_detection import CHANGES_PATH
+
+    for path in (CHANGES_PATH, RESULTS_PATH):
+        if os.path.exists(path):
+            with open(path) as f:
+                text = f.read().strip()
+            if text:
+                return text
+    return ""
+
+def cmd_notify(args) -> int:
+    import asyncio
+
+    message = args.message or pending_message()
+    if not message:
+        print("Nothing to send: no changes recorded and no search results saved")
+        return 0
+
+    if args.channel == "desktop":
+        from send_free_sms import send_notification
+
+        return 0 if args.dry_run or send_notification(message) else 1
+    if args.channel == "carrier":
+        from send_free_sms import send_via_carrier_gateway
+
+        if not args.to or not args.carrier:
+            print("--channel carrier needs --to and --carrier", file=sys.stderr)
+            return 2
+        if args.dry_run:
+            print(f"Would text {', '.join(args.to)} via {args.carrier}: {message}")
+            return 0
+        return 0 if all(send_via_carrier_gateway(phone, message, args.carrier) for phone in args.to) else 1
+
+    from config import load_config
+    from notify_dispatcher import NotificationDispatcher, build_channel, channels_from_config
+
+    config = load_config()
+    if args.channel:
+        try:
+            channels = [build_channel(config, args.channel, args.to)]
+        except (ImportError, ValueError) as e:
+            print(f"Can't send via {args.channel}: {e}", file=sys.stderr)
+            return 1
+    else:
+        channels = channels_from_config(config)
+    deliveries = [(channel, recipient, args.subject, message)
+                  for channel in channels for recipient in channel.recipients]
+    if not deliveries:
+        print("No recipients: enable a channel under notifications in config.json or pass --channel and --to")
+        return 1
+    if args.dry_run:
+        for channel, recipient, _, _ in deliveries:
+            print(f"Would send via {channel.name} to {recipient}")
+        print(f"{args.subject}\n{message}")
+        return 0
+
+    async def deliver():
+        dispatcher = NotificationDispatcher(channels, **config.get("notifications", {}).get("dispatch", {}))
+        try:
+            return await dispatcher.deliver(deliveries)
+        finally:
+            await dispatcher.close()
+
+    outcome = asyncio.run(deliver())
+    print(f"Sent {outcome['sent']}, failed {outcome['failed']}")
+    return 0 if not outcome["failed"] else 1
+
+def cmd_schedule(args) -> int:
+    import asyncio
+
+    from scheduler import main as run_scheduler
+
+    try:
+        asyncio.run(run_scheduler(once=args.once))
+    except KeyboardInterrupt:
+        print("\nScheduler stopped")
+    return 0
+
+def cmd_serve(args) -> int:
+    import uvicorn
+
+    uvicorn.run("main:app", host=args.host, port=args.port, reload=args.reload, app_dir=BASE_DIR)
+    return 0
+
+def benchmark_names() -> List[str]:
+    directory = os.path.join(BASE_DIR, "benchmarks")
+    return sorted(name[:-3] for name in os.listdir(directory)
+                  if name.endswith(".py") and (name.startswith("bench_") or name == "suite.py"))
+
+def cmd_bench(args) -> int:
+    import runpy
+
+    names = benchmark_names()
+    if not args.name:
+        print("\n".join(names))
+        return 0
+    name = args.name if args.name in names else f"bench_{args.name}"
+    if name not in names:
+        print(f"No benchmark {args.name!r}; choose from {', '.join(names)}", file=sys.stderr)
+        return 2
+    sys.argv = [f"benchmarks/{name}.py", *args.args]
+    runpy.run_module(f"benchmarks.{name}", run_name="__main__", alter_sys=True)
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="cli.py", description="Track reward seat availability")
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND", required=True)
+
+    search = commands.add_parser("search", help="scrape one route and month now")
+    search.add_argument("origin")
+    search.add_argument("destination")
+    search.add_argument("month", type=parse_month, metavar="YYYY-MM")
+    search.add_argument("--airline", default="virgin_atlantic")
+    search.add_argument("--cabin", default=None, help="only show this cabin, e.g. upper_class")
+    search.add_argument("--days", type=parse_days, default=None, metavar="19,20", help="only show these days")
+    search.add_argument("--fetch-mode", choices=("api", "dom"), default=None)
+    search.add_argument("--profile", default=None,
+                        help="browser profile from browser_factory (default: browser.profile in config.json)")
+    search.add_argument("--no-save", dest="save", action="store_false",
+                        help="don't store the results or record changes")
+    search.add_argument("--trace", default=None, metavar="DIR",
+                        help="write a JSON trace of per-stage timings to this directory")
+    search.add_argument("--json", action="store_true", help="print results as JSON")
+    search.set_defaults(handler=cmd_search)
+
+    watch = commands.add_parser("watch", help="list, add or remove watches")
+    actions = watch.add_subparsers(dest="action", metavar="ACTION")
+    listing = actions.add_parser("list", help="show watches (the default)")
+    listing.add_argument("--origin", default=None)
+    listing.add_argument("--destination", default=None)
+    add = actions.add_parser("add", help="watch a route between two travel dates")
+    add.add_argument("origin")
+    add.add_argument("destination")
+    add.add_argument("start", metavar="START", help="first travel date, YYYY-MM-DD")
+    add.add_argument("end", metavar="END", help="last travel date, YYYY-MM-DD")
+    add.add_argument("--cabin", default=None)
+    add.add_argument("--max-points", type=int, default=None)
+    add.add_argument("--airline", default=None)
+    add.add_argument("--notify", action="append", required=True, metavar="CHANNEL:ADDRESS",
+                     help="recipient, e.g. email:me@example.com (repeatable)")
+    remove = actions.add_parser("remove", help="delete a watch")
+    remove.add_argument("id", type=int)
+    watch.set_defaults(handler=cmd_watch)
+
+    notify = commands.add_parser("notify", help="send the last changes (or --message) now")
+    notify.add_argument("--channel", choices=("email", "sms", "webhook", "imessage", "carrier", "desktop"),
+                        default=None, help="one channel instead of every enabled one in config.json")
+    notify.add_argument("--to", action="append", default=None, metavar="ADDRESS",
+                        help="recipient for --channel instead of the configured ones (repeatable)")
+    notify.add_argument("--carrier", default=None, help="gateway for --channel carrier, e.g. att or verizon")
+    notify.add_argument("--message", default=None, help="text to send instead of the last changes")
+    notify.add_argument("--subject", default="Reward seat update")
+    notify.add_argument("--dry-run", action="store_true", help="show what would be sent without sending")
+    notify.set_defaults(handler=cmd_notify)
+
+    schedule = commands.add_parser("schedule", help="run checks on the configured schedule")
+    schedule.add_argument("--once", action="store_true", help="run a single check, deliver alerts and exit")
+    schedule.set_defaults(handler=cmd_schedule)
+
+    serve = commands.add_parser("serve", help="run the API")
+    serve.add_argument("--host", default="0.0.0.0")
+    serve.add_argument("--port", type=int, default=8000)
+    serve.add_argument("--reload", action="store_true")
+    serve.set_defaults(handler=cmd_serve)
+
+    bench = commands.add_parser("bench", help="run a benchmark, or list them")
+    bench.add_argument("name", nargs="?", help="e.g. watches or bench_watches; omit to list")
+    bench.add_argument("args", nargs=argparse.REMAINDER, help="passed to the benchmark")
+    bench.set_defaults(handler=cmd_bench)
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+Load tracker settings from config.json
+"""
+
+import json
+import os
+from typing import Any, Dict
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json")
+
+def load_config(path: str = CONFIG_PATH) -> Dict[str, Any]:
+    """Read config.json, returning an empty config if the file is missing"""
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
@@ -3,114 +3,84 @@
 Extract Upper Class points for specific dates from Virgin Atlantic
 """
 
+import argparse
 import asyncio
-import re
-from playwright.async_api import async_playwright
+import json
 
-async def extract_upper_class_points():
+from airlines import get_adapter
+from browser_factory import start_browser
+from calendar_parser import format_points
+from change_detection import CHANGES_PATH, detect_changes, format_changes, route_thresholds
+from config import load_config
+from metrics import span, trace_run
+from models import FlightSearch, calendar_to_results
+from readiness import AdaptiveTimeouts, inspection_hold
+from storage import AvailabilityStore
+
+async def scrape_calendar(page, adapter, search, timeouts):
+    """Fallback: render the month page and read the calendar from the DOM"""
+    await page.goto(adapter.month_url(search), wait_until="domcontentloaded")
+    
+    # Handle cookie consent
+    if await adapter.dismiss_consent(page):
+        print("Clicked 'Reject All' button")
+    else:
+        print("No cookie consent dialog found")
+    
+    # Wait until the calendar cells stop changing rather than a fixed sleep
+    await adapter.wait_until_ready(page, timeouts)
+    
+    print("Extracting Upper Class points...")
+    
+    # Read every calendar day in one round-trip and parse it in one pass
+    return await adapter.extract_dom(page)
+
+async def extract_upper_class_points(inspect_seconds=0, profile=None):
     """Extract Upper Class points for Oct 19 and Oct 20"""
-    url = "https://www.virginatlantic.com/reward-flight-finder/results/month?origin=LHR&destination=BLR&month=10&year=2025"
+    search = FlightSearch(origin="LHR", destination="BLR", month=10, year=2025)
+    adapter = get_adapter(search.airline)
+    url = adapter.month_url(search)
     
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=False)
-        page = await browser.new_page()
+    # Images, fonts and analytics are blocked by the browser profile
+    session = await start_browser(profile)
+    try:
+        page = await session.new_page()
+        timeouts = AdaptiveTimeouts()
         
         print(f"Navigating to: {url}")
-        await page.goto(url, wait_until="domcontentloaded")
-        
-        # Handle cookie consent
         try:
-            reject_button = await page.wait_for_selector('button:has-text("Reject All")', timeout=5000)
-            if reject_button:
-                await reject_button.click()
-                print("Clicked 'Reject All' button")
-                await page.wait_for_timeout(2000)
-        except:
-            print("No cookie consent dialog found")
-        
-        # Wait for page to load and try multiple approaches
-        await page.wait_for_load_state("networkidle")
-        await page.wait_for_timeout(5000)  # Wait 5 seconds for content to load
-        
-        print("Extracting Upper Class points...")
-        
-        # Get all page text content
-        page_text = await page.inner_text('body')
-        
-        # Also get HTML content for more detailed parsing
-        page_html = await page.content()
+            # Fast path: read the availability XHR and skip rendering
+            calendar = await adapter.fetch_json(page, search, timeouts)
+            print(f"Captured availability data from {adapter.api_url(search)}")
+        except Exception as e:
+            print(f"Availability API not captured ({e}), scraping the page instead")
+            calendar = await scrape_calendar(page, adapter, search, timeouts)
         
         # Save debug info
         with open('/Users/sahil/reward-seat-tracker/page_content.txt', 'w') as f:
-            f.write(page_text)
+            json.dump(calendar, f, indent=2)
         
-        print("Searching for Upper Class points...")
+        print(f"Parsed {len(calendar)} calendar days")
         
-        # Look for patterns in the text
-        oct_19_points = None
-        oct_20_points = None
+        # Keep every scrape for price history and work out what changed since the last one
+        with span("persist", search.airline):
+            store = AvailabilityStore()
+            thresholds = route_thresholds(load_config(), search.origin, search.destination)
+            changes = detect_changes(store, search, calendar_to_results(calendar, search), thresholds)
+            store.close()
+        print(f"{len(changes)} availability changes since the last check")
         
-        # More specific patterns that match the actual calendar structure
-        patterns = [
-            # Look for "Sun 19" or "Mon 20" followed by Upper Class pricing
-            r'(?:Sun|Mon|Tue|Wed|Thu|Fri|Sat)\s+19\s+.*?Upper\s+Class\s+(\d+(?:,\d{3})*)\s*pts',
-            r'(?:Sun|Mon|Tue|Wed|Thu|Fri|Sat)\s+20\s+.*?Upper\s+Class\s+(\d+(?:,\d{3})*)\s*pts',
-            # Alternative patterns with different spacing
-            r'19\s+Economy.*?Upper\s+Class\s+(\d+(?:,\d{3})*)\s*pts',
-            r'20\s+Economy.*?Upper\s+Class\s+(\d+(?:,\d{3})*)\s*pts',
-        ]
+        # Notifiers only send when this file has content
+        with span("notify", search.airline):
+            with open(CHANGES_PATH, 'w') as f:
+                f.write(format_changes(changes))
         
-        for i, pattern in enumerate(patterns):
-            matches = re.finditer(pattern, page_text, re.IGNORECASE | re.DOTALL)
-            for match in matches:
-                points = match.group(1).replace(',', '')
-                full_match = match.group(0)
-                
-                print(f"Pattern {i+1} found: {full_match.strip()}")
-                
-                if '19' in full_match and not oct_19_points:
-                    oct_19_points = points
-                    print(f"Set Oct 19 points: {points}")
-                elif '20' in full_match and not oct_20_points:
-                    oct_20_points = points
-                    print(f"Set Oct 20 points: {points}")
-        
-        # Try to find calendar elements or table structure
-        try:
-            print("Looking for calendar elements...")
-            calendar_elements = await page.query_selector_all('td, .day, .date, [data-date]')
-            
-            for element in calendar_elements:
-                element_text = await element.inner_text()
-                element_html = await element.inner_html()
-                
-                if '19' in element_text or '19' in element_html:
-                    print(f"Found element with 19: {element_text}")
-                    points_match = re.search(r'(\d+(?:,\d{3})*)\s*(?:k|K)?\s*(?:pts|points)', element_text, re.IGNORECASE)
-                    if points_match and not oct_19_points:
-                        oct_19_points = points_match.group(1).replace(',', '')
-                        
-                if '20' in element_text or '20' in element_html:
-                    print(f"Found element with 20: {element_text}")
-                    points_match = re.search(r'(\d+(?:,\d{3})*)\s*(?:k|K)?\s*(?:pts|points)', element_text, re.IGNORECASE)
-                    if points_match and not oct_20_points:
-                        oct_20_points = points_match.group(1).replace(',', '')
-                        
-        except Exception as e:
-            print(f"Error searching calendar elements: {e}")
+        oct_19_points = calendar.get(19, {}).get("upper_class")
+        oct_20_points = calendar.get(20, {}).get("upper_class")
         
         # Format results - convert raw points to k format
-        if oct_19_points:
-            oct_19_k = int(oct_19_points) // 1000
-            oct_19_display = f"{oct_19_k}k pts"
-        else:
-            oct_19_display = "Not found"
-            
-        if oct_20_points:
-            oct_20_k = int(oct_20_points) // 1000  
-            oct_20_display = f"{oct_20_k}k pts"
-        else:
-            oct_20_display = "Not found"
+        oct_19_display = format_points(oct_19_points)
+        oct_20_display = format_points(oct_20_points)
         
         result = f"Oct 19: {oct_19_display}, Oct 20: {oct_20_display}"
         
@@ -125,13 +95,26 @@ async def extract_upper_class_points():
         # Take screenshot for debugging
         await page.screenshot(path='/Users/sahil/reward-seat-tracker/final_screenshot.png')
         
-        print("Browser will stay open for 60 seconds for manual verification...")
-        await page.wait_for_timeout(60000)
+        timeouts.save()
+        print(f"Readiness waits: {', '.join(f'{k}={v:.0f}ms' for k, v in timeouts.run.items())}")
         
-        await browser.close()
+        await inspection_hold(page, inspect_seconds)
         
         return result
+    finally:
+        await session.close()
 
 if __name__ == "__main__":
-    result = asyncio.run(extract_upper_class_points())
-    print(f"Extracted: {result}")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Extract Upper Class points from Virgin Atlantic")
+    parser.add_argument("--inspect", type=float, default=0, metavar="SECONDS",
+                        help="keep the browser open this long for manual verification")
+    parser.add_argument("--profile", default=None,
+                        help="browser profile from browser_factory (default: browser.profile in config.json)")
+    parser.add_argument("--trace", default=load_config().get("metrics", {}).get("trace_dir"), metavar="DIR",
+                        help="write a JSON trace of per-stage timings to this directory")
+    args = parser.parse_args()
+    
+    with trace_run("extract_points", args.trace) as trace:
+        result = asyncio.run(extract_upper_class_points(inspect_seconds=args.inspect, profile=args.profile))
+    print(f"Extracted: {result}")
+    print(f"Stage timings: {', '.join(f'{stage}={ms:.0f}ms' for stage, ms in trace.totals().items())}")
\ No newline at end of file
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Live availability changes: one feed tails the change log and fans events out to subscribed connections
+"""
+
+import asyncio
+import json
+import logging
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from change_detection import AvailabilityChange
+from storage import AvailabilityStore
+
+logger = logging.getLogger(__name__)
+
+MONTH_RE = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+
+# Index key for subscribers that want every month of a route
+ALL_MONTHS = "*"
+
+SLOW_CONSUMER = "slow consumer"
+
+class SubscriptionClosed(Exception):
+    """The hub dropped the subscription; str() is the reason"""
+
+@dataclass(frozen=True)
+class Event:
+    id: int
+    origin: str
+    destination: str
+    month: str
+    cabin: str
+    # JSON encoded once by the feed and shared by every subscriber
+    payload: str
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "Event":
+        payload = json.dumps({"event": "change", **row, "message": AvailabilityChange.from_row(row).describe()})
+        return cls(row["id"], row["origin"], row["destination"], row["travel_date"][:7], row["cabin"], payload)
+
+class Subscription:
+    """One connection's routes, months and cabins, and its bounded buffer of undelivered events
+
+    An idle subscription is this object, an empty deque and its index
+    entries: there is no per-subscriber task or queue in the hub.
+    """
+
+    __slots__ = ("routes", "months", "cabins", "buffer", "buffer_size", "waiter", "closed", "last_id")
+
+    def __init__(self, routes: Iterable[Tuple[str, str]], months: Iterable[str] = (), cabins: Iterable[str] = (),
+                 buffer_size: int = 256):
+        self.routes = frozenset(routes)
+        self.months = frozenset(months)
+        self.cabins = frozenset(cabins)
+        self.buffer: deque = deque()
+        self.buffer_size = buffer_size
+        self.waiter: Optional[asyncio.Future] = None
+        self.closed: Optional[str] = None
+        # Last event id handed to the connection, for Last-Event-ID resumes
+        self.last_id = 0
+
+    def wants(self, event: Event) -> bool:
+        return ((event.origin, event.destination) in self.routes
+                and (not self.months or event.month in self.months)
+                and (not self.cabins or event.cabin in self.cabins))
+
+    def push(self, event: Event) -> bool:
+        """Buffer an event; False when the buffer is full"""
+        if len(self.buffer) >= self.buffer_size:
+            return False
+        self.buffer.append(event)
+        self._wake()
+        return True
+
+    def close(self, reason: str):
+        self.closed = reason
+        self.buffer.clear()
+        self._wake()
+
+    def _wake(self):
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    async def next_batch(self, timeout: Optional[float] = None) -> List[Event]:
+        """Everything buffered, waiting up to timeout for the first event; [] on timeout"""
+        if not self.buffer and self.closed is None:
+            self.waiter = asyncio.get_running_loop().create_future()
+            try:
+                await asyncio.wait_for(self.waiter, timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self.waiter = None
+        if self.closed is not None:
+            raise SubscriptionClosed(self.closed)
+        batch = list(self.buffer)
+        self.buffer.clear()
+        if batch:
+            self.last_id = batch[-1].id
+        return batch
+
+class ChangeHub:
+    """In-process fan-out from one producer to many subscriptions
+
+    Subscriptions are indexed by (origin, destination, month), so an event
+    costs only as much as the subscribers interested in its route and
+    month. A subscriber whose buffer is full when an event arrives is
+    evicted rather than allowed to hold events for everyone else; it can
+    reconnect with the last id it saw and replay from the change log.
+    """
+
+    def __init__(self, buffer_size: int = 256, max_subscriptions: int = 10000):
+        self.buffer_size = buffer_size
+        self.max_subscriptions = max_subscriptions
+        self.index: Dict[Tuple[str, str, str], Set[Subscription]] = {}
+        self.subscriptions = 0
+        self.last_id = 0
+        self.published = 0
+        self.delivered = 0
+        self.evicted = 0
+
+    @staticmethod
+    def _keys(subscription: Subscription) -> List[Tuple[str, str, str]]:
+        months = subscription.months or (ALL_MONTHS,)
+        return [(origin, destination, month) for origin, destination in subscription.routes for month in months]
+
+    def subscribe(self, routes: Iterable[Tuple[str, str]], months: Iterable[str] = (),
+                  cabins: Iterable[str] = ()) -> Subscription:
+        """Raises OverflowError when max_subscriptions are already open"""
+        if self.subscriptions >= self.max_subscriptions:
+            raise OverflowError(f"{self.subscriptions} live subscriptions already open")
+        subscription = Subscription(routes, months, cabins, self.buffer_size)
+        subscription.last_id = self.last_id
+        for key in self._keys(subscription):
+            self.index.setdefault(key, set()).add(subscription)
+        self.subscriptions += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription, reason: str = "unsubscribed"):
+        # An evicted subscription has already left the index
+        if subscription.closed is None:
+            self._remove(subscription)
+            subscription.close(reason)
+
+    def _remove(self, subscription: Subscription):
+        for key in self._keys(subscription):
+            subscribers = self.index.get(key)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.index[key]
+        self.subscriptions -= 1
+
+    def publish(self, events: Iterable[Event]) -> int:
+        """Buffer each event for the subscriptions that want it; returns deliveries"""
+        delivered = 0
+        slow: Set[Subscription] = set()
+        for event in events:
+            self.published += 1
+            self.last_id = event.id
+            for month in (event.month, ALL_MONTHS):
+                for subscription in self.index.get((event.origin, event.destination, month), ()):
+                    if subscription in slow or not subscription.wants(event):
+                        continue
+                    if subscription.push(event):
+                        delivered += 1
+                    else:
+                        slow.add(subscription)
+        for subscription in slow:
+            self._remove(subscription)
+            subscription.close(SLOW_CONSUMER)
+        self.evicted += len(slow)
+        self.delivered += delivered
+        return delivered
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "subscriptions": self.subscriptions,
+            "last_id": self.last_id,
+            "published": self.published,
+            "delivered": self.delivered,
+            "evicted": self.evicted,
+        }
+
+class ChangeFeed:
+    """The single producer: polls the change log on its own connection and publishes new rows
+
+    Any process writing through AvailabilityStore (scheduler, CLI, API,
+    workers) lands in the same table; PRAGMA data_version makes a poll
+    with nothing new a single cheap statement.
+    """
+
+    def __init__(self, path: str, hub: ChangeHub, poll_seconds: float = 0.5, batch_size: int = 64):
+        self.store = AvailabilityStore(path)
+        self.hub = hub
+        self.poll_seconds = poll_seconds
+        # Published a batch at a time with the loop yielded in between, so one
+        # check's burst of changes doesn't fill the buffers of readers keeping up
+        self.batch_size = max(1, min(batch_size, hub.buffer_size // 2))
+        self._version: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        # Subscribers only see changes from after the API started, or replays
+        self.hub.last_id = self.store.last_change_id()
+
+    async def poll(self) -> int:
+        """Publish changes logged since the last poll; returns how many"""
+        version = self.store.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._version:
+            return 0
+        self._version = version
+        published = 0
+        while True:
+            rows = self.store.changes_since(self.hub.last_id, limit=self.batch_size)
+            if not rows:
+                return published
+            self.hub.publish(Event.from_row(row) for row in rows)
+            published += len(rows)
+            await asyncio.sleep(0)
+
+    def replay(self, subscription: Subscription, after_id: int) -> List[Event]:
+        """Logged events after after_id that the subscription wants, up to what it has already been sent
+
+        At most one buffer's worth, the most recent, is returned.
+        """
+        replayed: deque = deque(maxlen=subscription.buffer_size)
+        until = subscription.last_id
+        while after_id < until:
+            rows = self.store.changes_since(after_id, until, 1000)
+            if not rows:
+                break
+            replayed.extend(event for event in map(Event.from_row, rows) if subscription.wants(event))
+            after_id = rows[-1]["id"]
+        return list(replayed)
+
+    async def run(self):
+        while True:
+            try:
+                await self.poll()
+            except Exception as e:
+                logger.error(f"Change feed poll failed: {e}")
+            await asyncio.sleep(self.poll_seconds)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.store.close()
+
+def parse_routes(routes: Iterable[str]) -> List[Tuple[str, str]]:
+    """"LHR-BLR" strings to (origin, destination); ValueError on anything else"""
+    parsed = []
+    for route in routes:
+        origin, _, destination = route.upper().partition("-")
+        if len(origin) != 3 or len(destination) != 3 or not (origin + destination).isalpha():
+            raise ValueError(f"route {route!r} is not ORIGIN-DESTINATION, e.g. LHR-BLR")
+        parsed.append((origin, destination))
+    if not parsed:
+        raise ValueError("subscribe to at least one route")
+    return parsed
+
+def parse_months(months: Iterable[str]) -> List[str]:
+    months = list(months)
+    for month in months:
+        if not MONTH_RE.match(month):
+            raise ValueError(f"month {month!r} is not YYYY-MM")
+    return list(months)
@@ -6,118 +6,330 @@ Main application entry point
 
 import asyncio
 import logging
-from datetime import datetime
-from typing import List, Dict, Any
+from datetime import date
+from typing import List, Dict, Any, Optional
 
-from playwright.async_api import async_playwright
-from fastapi import FastAPI, BackgroundTasks
-from pydantic import BaseModel
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, StreamingResponse
 import json
 
+from availability_matrix import AvailabilityMatrix, SharedMatrix, matrix_path, route_label
+from browser_pool import PoolExhausted
+from config import load_config
+from live import ChangeFeed, ChangeHub, Event, SubscriptionClosed, parse_months, parse_routes
+from metrics import REGISTRY
+from models import FlightResult, FlightSearch, RangeSearch, UnsupportedAirline, WatchSpec
+from notify_dispatcher import allowed_webhooks
+from orchestrator import Orchestrator
+from planner import unique_searches
+from politeness import Blocked, CircuitOpen, Politeness
+from result_cache import ResultCache, search_cache_key
+from storage import DB_PATH, AvailabilityStore
+from tasks import RemoteTracker, job_status, submit
+from tracker import RewardSeatTracker
+from watches import WatchRegistry, watches_path
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Reward Seat Tracker", version="1.0.0")
 
-class FlightSearch(BaseModel):
-    origin: str
-    destination: str
-    month: int
-    year: int
-    airline: str = "virgin_atlantic"
-
-class FlightResult(BaseModel):
-    date: str
-    availability: bool
-    price: str
-    booking_class: str
-    timestamp: datetime
-
-class RewardSeatTracker:
-    def __init__(self):
-        self.browser = None
-        self.page = None
-        
-    async def start_browser(self):
-        """Initialize Playwright browser"""
-        self.playwright = await async_playwright().start()
-        self.browser = await self.playwright.chromium.launch(headless=False)
-        self.page = await self.browser.new_page()
-        
-    async def close_browser(self):
-        """Close browser and cleanup"""
-        if self.page:
-            await self.page.close()
-        if self.browser:
-            await self.browser.close()
-        if hasattr(self, 'playwright'):
-            await self.playwright.stop()
-            
-    async def search_virgin_atlantic(self, search: FlightSearch) -> List[FlightResult]:
-        """Search Virgin Atlantic for reward seats"""
-        url = f"https://www.virginatlantic.com/reward-flight-finder/results/month?origin={search.origin}&destination={search.destination}&month={search.month}&year={search.year}"
-        
-        try:
-            await self.page.goto(url, wait_until="networkidle")
-            await self.page.wait_for_timeout(3000)
-            
-            # Wait for results to load
-            await self.page.wait_for_selector(".flight-result", timeout=10000)
-            
-            # Extract flight data
-            flights = await self.page.query_selector_all(".flight-result")
-            results = []
-            
-            for flight in flights:
-                date_elem = await flight.query_selector(".date")
-                price_elem = await flight.query_selector(".price")
-                availability_elem = await flight.query_selector(".availability")
-                
-                if date_elem and price_elem:
-                    date = await date_elem.inner_text()
-                    price = await price_elem.inner_text()
-                    availability = availability_elem is not None
-                    
-                    results.append(FlightResult(
-                        date=date.strip(),
-                        availability=availability,
-                        price=price.strip(),
-                        booking_class="economy",
-                        timestamp=datetime.now()
-                    ))
-                    
-            return results
-            
-        except Exception as e:
-            logger.error(f"Error searching Virgin Atlantic: {e}")
-            return []
-
 # Global tracker instance
-tracker = RewardSeatTracker()
+config = load_config()
+tracker = RewardSeatTracker(
+    pool_settings=config.get("browser_pool", {}),
+    fetch_mode=config.get("scraping", {}).get("fetch_mode", "api"),
+    store=AvailabilityStore(config.get("storage", {}).get("path", DB_PATH)),
+    politeness=Politeness.from_config(config),
+)
+# With workers enabled the scraping happens in Celery worker processes instead of this one
+workers_enabled = config.get("workers", {}).get("enabled", False)
+scraper = RemoteTracker.from_config(config, store=tracker.store) if workers_enabled else tracker
+
+# Live change events: one feed polls the change log, the hub fans out to /live connections
+live_settings = config.get("live", {})
+hub = ChangeHub(buffer_size=live_settings.get("buffer_size", 256),
+                max_subscriptions=live_settings.get("max_subscriptions", 10000))
+feed = ChangeFeed(config.get("storage", {}).get("path", DB_PATH), hub,
+                  poll_seconds=live_settings.get("poll_seconds", 0.5))
+HEARTBEAT_SECONDS = live_settings.get("heartbeat_seconds", 15)
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize browser on startup"""
-    await tracker.start_browser()
+    feed.start()
+    if not workers_enabled:
+        await tracker.start_browser()
     
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
+    await feed.stop()
     await tracker.close_browser()
 
+result_cache = ResultCache(**config.get("cache", {}))
+
 @app.post("/search", response_model=List[FlightResult])
-async def search_flights(search: FlightSearch):
+async def search_flights(search: FlightSearch, response: Response):
     """Search for reward seats"""
-    if search.airline == "virgin_atlantic":
-        return await tracker.search_virgin_atlantic(search)
-    else:
+    try:
+        results, age, status = await result_cache.get_or_fetch(
+            search_cache_key(search), lambda: scraper.fetch(search)
+        )
+    except PoolExhausted as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except (Blocked, CircuitOpen) as e:
+        # Throttled or blocked by the airline: not the same answer as "no seats"
+        retry_after = e.retry_in if isinstance(e, CircuitOpen) else e.retry_after or 60
+        raise HTTPException(status_code=503, detail=f"Airline unavailable: {e}",
+                            headers={"Retry-After": str(int(retry_after))})
+    except UnsupportedAirline:
         return []
+    except Exception as e:
+        # Failures aren't cached, so the next request scrapes again
+        logger.error(f"Error searching {search.airline}: {e}")
+        raise HTTPException(status_code=502, detail=f"Scrape failed: {type(e).__name__}")
+    
+    response.headers["Age"] = str(int(age))
+    response.headers["X-Cache"] = status
+    return results
+
+class CachedFetcher:
+    """Orchestrator fetches through the search cache, so /search/range shares scrapes with /search"""
+
+    async def fetch(self, search: FlightSearch) -> List[FlightResult]:
+        results, _, _ = await result_cache.get_or_fetch(search_cache_key(search), lambda: scraper.fetch(search))
+        return results
+
+@app.post("/search/range")
+async def search_range(search: RangeSearch, request: Request):
+    """Stream each month's results as it finishes: NDJSON, or SSE with Accept: text/event-stream"""
+    sse = "text/event-stream" in request.headers.get("accept", "")
+    orchestrator = Orchestrator.from_config(CachedFetcher(), config)
+
+    def encode(event: str, data: Dict[str, Any]) -> str:
+        if sse:
+            return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        return json.dumps({"event": event, **data}) + "\n"
+
+    async def events():
+        succeeded = failed = 0
+        # One month at a time: nothing is kept once it has been written out
+        async for job in orchestrator.stream(unique_searches(search.searches())):
+            if job.ok:
+                succeeded += 1
+            else:
+                failed += 1
+            yield encode("month", job.to_dict())
+        yield encode("done", {"succeeded": succeeded, "failed": failed})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/jobs", status_code=202)
+async def create_job(search: RangeSearch):
+    """Queue a range search on the worker pool; poll GET /jobs/{job_id} for months as they finish"""
+    if not workers_enabled:
+        raise HTTPException(status_code=503, detail="Worker pool disabled; set workers.enabled in config.json")
+    searches = list(unique_searches(search.searches()))
+    group = await asyncio.to_thread(submit, searches)
+    return {"job_id": group.id, "total": len(searches)}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Progress of a queued range search and the months finished so far"""
+    if not workers_enabled:
+        raise HTTPException(status_code=503, detail="Worker pool disabled; set workers.enabled in config.json")
+    status = await asyncio.to_thread(job_status, job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return status
+
+watches = WatchRegistry(watches_path(config))
+webhook_urls = allowed_webhooks(config)
+
+@app.post("/watches", status_code=201)
+async def create_watch(spec: WatchSpec):
+    """Register a watch; the scheduler matches it against every check's changes from its next run"""
+    for recipient in spec.recipients:
+        channel, _, address = recipient.partition(":")
+        # Anyone can call this, so webhooks are limited to urls the config already trusts
+        if channel == "webhook" and address not in webhook_urls:
+            raise HTTPException(status_code=422,
+                                detail=f"webhook {address} is not in notifications.webhook.allowed_urls")
+    return watches.add(spec).to_dict()
+
+@app.get("/watches")
+async def list_watches(origin: Optional[str] = None, destination: Optional[str] = None):
+    watches.refresh()
+    return [watch.to_dict() for watch in watches.list(origin, destination)]
+
+@app.delete("/watches/{watch_id}", status_code=204)
+async def delete_watch(watch_id: int):
+    if not watches.remove(watch_id):
+        raise HTTPException(status_code=404, detail=f"Unknown watch {watch_id}")
+
+matrix = SharedMatrix(matrix_path(config))
+
+def _matrix() -> AvailabilityMatrix:
+    current = matrix.get()
+    if current is None:
+        raise HTTPException(status_code=503, detail="Availability matrix not built yet; run a check first")
+    return current
+
+@app.get("/matrix/cheapest")
+async def matrix_cheapest(cabin: str = "upper_class", start: Optional[date] = None, end: Optional[date] = None):
+    """Cheapest bookable day per route and overall, from the shared availability matrix"""
+    current = _matrix()
+    per_route = current.cheapest_per_route(cabin, start, end)
+    return {
+        "cheapest": current.cheapest(cabin, start, end),
+        "routes": {route_label(route): {"date": day.isoformat(), "points": points}
+                   for route, (day, points) in sorted(per_route.items())},
+    }
+
+@app.get("/matrix/available")
+async def matrix_available(cabin: str = "upper_class", start: Optional[date] = None, end: Optional[date] = None,
+                           max_points: Optional[int] = None):
+    """Every bookable day at or under max_points across tracked routes"""
+    return _matrix().available(cabin, start, end, max_points)
+
+@app.get("/history")
+async def price_history(origin: str, destination: str, start: date, end: date, cabin: Optional[str] = None,
+                        airline: Optional[str] = None):
+    """Per travel date and cabin: points range, last price and when seats were first and last seen"""
+    if end < start:
+        raise HTTPException(status_code=422, detail="end is before start")
+    return tracker.store.price_history(origin, destination, start.isoformat(), end.isoformat(), cabin, airline)
+
+@app.get("/trends")
+async def price_trends(origin: str, destination: str, start: date, end: date, cabin: str = "upper_class",
+                       since: Optional[date] = None, airline: Optional[str] = None):
+    """Per day of observation: cheapest and dearest seats for travel between start and end"""
+    if end < start:
+        raise HTTPException(status_code=422, detail="end is before start")
+    return tracker.store.price_trend(origin, destination, cabin, start.isoformat(), end.isoformat(),
+                                     since.isoformat() if since else None, airline)
+
+def _subscribe(route: List[str], month: List[str], cabin: List[str]):
+    """Raises ValueError for a malformed subscription and OverflowError when the hub is full"""
+    return hub.subscribe(parse_routes(route), parse_months(month), cabin)
+
+def _sse(event: Event) -> str:
+    return f"id: {event.id}\nevent: change\ndata: {event.payload}\n\n"
+
+@app.get("/live")
+async def live_events(route: List[str] = Query(...), month: List[str] = Query([]), cabin: List[str] = Query([]),
+                      last_event_id: Optional[int] = Header(None)):
+    """Server-sent availability changes for routes (LHR-BLR), optionally only some months (YYYY-MM) and cabins
+
+    Reconnecting with Last-Event-ID replays what was logged in between.
+    """
+    try:
+        subscription = _subscribe(route, month, cabin)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except OverflowError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    replayed = feed.replay(subscription, last_event_id) if last_event_id is not None else []
+
+    async def events():
+        try:
+            yield f"retry: 5000\n: subscribed at {subscription.last_id}\n\n"
+            if replayed:
+                yield "".join(_sse(event) for event in replayed)
+            while True:
+                try:
+                    batch = await subscription.next_batch(HEARTBEAT_SECONDS)
+                except SubscriptionClosed as e:
+                    yield f"event: closed\ndata: {json.dumps({'reason': str(e), 'last_id': subscription.last_id})}\n\n"
+                    return
+                yield "".join(_sse(event) for event in batch) if batch else ": keepalive\n\n"
+        finally:
+            hub.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.websocket("/live/ws")
+async def live_websocket(websocket: WebSocket, route: List[str] = Query(...), month: List[str] = Query([]),
+                         cabin: List[str] = Query([]), last_event_id: Optional[int] = None):
+    """The /live stream over a WebSocket: one JSON message per change"""
+    try:
+        subscription = _subscribe(route, month, cabin)
+    except (ValueError, OverflowError) as e:
+        await websocket.close(code=1008 if isinstance(e, ValueError) else 1013, reason=str(e))
+        return
+    await websocket.accept()
+
+    async def until_disconnect():
+        # Clients have nothing to say after subscribing; this only notices them leave
+        try:
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        finally:
+            hub.unsubscribe(subscription, "disconnected")
+
+    reader = asyncio.create_task(until_disconnect())
+    try:
+        for event in feed.replay(subscription, last_event_id) if last_event_id is not None else []:
+            await websocket.send_text(event.payload)
+        while True:
+            try:
+                batch = await subscription.next_batch(HEARTBEAT_SECONDS)
+            except SubscriptionClosed as e:
+                if str(e) != "disconnected":
+                    await websocket.send_json({"event": "closed", "reason": str(e), "last_id": subscription.last_id})
+                    await websocket.close(code=1013, reason=str(e))
+                return
+            if not batch:
+                await websocket.send_json({"event": "keepalive"})
+            for event in batch:
+                await websocket.send_text(event.payload)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        reader.cancel()
+        hub.unsubscribe(subscription)
+
+@app.get("/live/stats")
+async def live_stats():
+    """Open subscriptions and published, delivered and evicted counts"""
+    return hub.stats()
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit, miss and coalescing counters for the search cache"""
+    return result_cache.stats()
+
+REGISTRY.gauge_callback("search_cache", "Search cache counters and size", "stat", lambda: result_cache.stats())
+REGISTRY.gauge_callback("host_rate", "Current allowed requests per second per airline host", "host",
+                        lambda: {host: stats["rate"] for host, stats in tracker.politeness.stats().items()})
+REGISTRY.gauge_callback("host_circuit_open", "1 while requests to the host are suspended", "host",
+                        lambda: {host: int(stats["circuit"] == "open")
+                                 for host, stats in tracker.politeness.stats().items()})
+REGISTRY.gauge_callback("live", "Live change subscriptions and delivery counters", "stat", lambda: hub.stats())
+REGISTRY.gauge_callback("browser_pool", "Browser page pool state", "stat",
+                        lambda: tracker.pool.stats() if tracker.pool else {})
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Per-stage scrape timings and cache/pool state in Prometheus text format"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/")
 async def root():
     """Health check endpoint"""
-    return {"message": "Reward Seat Tracker API", "status": "running"}
+    status = {"message": "Reward Seat Tracker API", "status": "running"}
+    if tracker.pool:
+        status["browser_pool"] = tracker.pool.stats()
+    status["hosts"] = tracker.politeness.stats()
+    status["workers"] = "celery" if workers_enabled else "local"
+    return status
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Per-stage timing spans, Prometheus-style histograms and optional JSON traces
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _label_text(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts..., +Inf count], sum
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Dict[str, Any]]:
+        with self._lock:
+            return {key: {"counts": list(series[0]), "sum": series[1]} for key, series in self._series.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series["counts"]):
+                cumulative += count
+                le = '"+Inf"' if bound == float("inf") else f'"{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, key, 'le=' + le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {series['sum']:.6f}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {cumulative}")
+        return lines
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(f"{self.name}{_label_text(self.labels, key)} {_number(value)}" for key, value in items)
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Any] = []
+        # name -> (help, callback returning {label value: number})
+        self.gauges: Dict[str, Tuple[str, str, Callable[[], Dict[str, float]]]] = {}
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def gauge_callback(self, name: str, help: str, label: str, fn: Callable[[], Dict[str, float]]):
+        """A gauge read at scrape time, e.g. pool or cache stats, one series per dict key"""
+        self.gauges[name] = (help, label, fn)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for name, (help, label, fn) in self.gauges.items():
+            try:
+                values = fn()
+            except Exception:
+                continue
+            lines.extend([f"# HELP {name} {help}", f"# TYPE {name} gauge"])
+            for key, value in sorted(values.items()):
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f"{name}{_label_text((label,), (key,))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "scrape_stage_seconds", "Time spent in each scrape stage", labels=("stage", "airline")
+))
+STAGE_ERRORS = REGISTRY.register(Counter(
+    "scrape_stage_errors_total", "Scrape stages that raised", labels=("stage", "airline")
+))
+
+class Trace:
+    """Every span recorded while the trace is active, in start order"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+
+    def add(self, stage: str, started: float, duration: float, labels: Dict[str, str], error: Optional[str]):
+        self.spans.append({
+            "stage": stage,
+            "start_ms": round((started - self._started) * 1000, 3),
+            "duration_ms": round(duration * 1000, 3),
+            **labels,
+            **({"error": error} if error else {}),
+        })
+
+    def totals(self) -> Dict[str, float]:
+        """Milliseconds per stage, summed over the trace"""
+        totals: Dict[str, float] = {}
+        for span in self.spans:
+            totals[span["stage"]] = round(totals.get(span["stage"], 0.0) + span["duration_ms"], 3)
+        return totals
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round((time.perf_counter() - self._started) * 1000, 3),
+            "totals_ms": self.totals(),
+            "spans": sorted(self.spans, key=lambda span: span["start_ms"]),
+        }
+
+    def dump(self, directory: str) -> str:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.name}-{self.started_at.strftime('%Y%m%d-%H%M%S-%f')}.json")
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        return path
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("current_trace", default=None)
+
+@contextmanager
+def span(stage: str, airline: str = "") -> Iterator[None]:
+    """Time a stage into scrape_stage_seconds and the active trace, if any"""
+    started = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        STAGE_ERRORS.inc(stage=stage, airline=airline)
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        STAGE_SECONDS.observe(duration, stage=stage, airline=airline)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(stage, started, duration, {"airline": airline} if airline else {}, error)
+
+@contextmanager
+def trace_run(name: str, directory: Optional[str] = None) -> Iterator[Trace]:
+    """Collect the spans of one run (tasks started inside inherit it); dump to directory if given"""
+    trace = Trace(name)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        if directory:
+            trace.dump(directory)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Search and result models shared by the API, scripts and storage
+"""
+
+from datetime import date, datetime
+from typing import Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel, model_validator
+
+from calendar_parser import Calendar
+from notify_dispatcher import check_recipient
+
+class UnsupportedAirline(Exception):
+    """Raised when a search names an airline without a scraper"""
+
+class FlightSearch(BaseModel):
+    origin: str
+    destination: str
+    month: int
+    year: int
+    airline: str = "virgin_atlantic"
+
+class Route(BaseModel):
+    origin: str
+    destination: str
+
+class RangeSearch(BaseModel):
+    """Several routes over an inclusive span of months"""
+    routes: List[Route]
+    start_month: int
+    start_year: int
+    end_month: int
+    end_year: int
+    airlines: List[str] = ["virgin_atlantic"]
+
+    @model_validator(mode="after")
+    def check_span(self) -> "RangeSearch":
+        if not self.routes:
+            raise ValueError("routes must not be empty")
+        for month in (self.start_month, self.end_month):
+            if not 1 <= month <= 12:
+                raise ValueError(f"month {month} is not between 1 and 12")
+        if (self.end_year, self.end_month) < (self.start_year, self.start_month):
+            raise ValueError("end month is before start month")
+        return self
+
+    def months(self) -> Iterator[Tuple[int, int]]:
+        year, month = self.start_year, self.start_month
+        while (year, month) <= (self.end_year, self.end_month):
+            yield year, month
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    def searches(self) -> Iterator[FlightSearch]:
+        """One FlightSearch per month, route and airline, generated lazily, earliest month first"""
+        for year, month in self.months():
+            for route in self.routes:
+                for airline in self.airlines:
+                    yield FlightSearch(origin=route.origin, destination=route.destination,
+                                       month=month, year=year, airline=airline)
+
+class WatchSpec(BaseModel):
+    """A standing alert: seats on a route between two travel dates, optionally capped in points"""
+    origin: str
+    destination: str
+    start_date: date
+    end_date: date
+    cabin: Optional[str] = None
+    max_points: Optional[int] = None
+    airline: Optional[str] = None
+    # "channel:address", e.g. "email:me@example.com" or "imessage:+447700900123"
+    recipients: List[str]
+
+    @model_validator(mode="after")
+    def check_watch(self) -> "WatchSpec":
+        if self.end_date < self.start_date:
+            raise ValueError("end_date is before start_date")
+        if (self.end_date - self.start_date).days > 366:
+            raise ValueError("a watch can span at most a year of travel dates")
+        if not self.recipients:
+            raise ValueError("recipients must not be empty")
+        for recipient in self.recipients:
+            channel, _, address = recipient.partition(":")
+            if not channel or not address:
+                raise ValueError(f"recipient {recipient!r} is not channel:address")
+            try:
+                check_recipient(channel, address)
+            except ValueError as e:
+                raise ValueError(f"recipient {recipient!r}: {e}")
+        return self
+
+class FlightResult(BaseModel):
+    date: str
+    availability: bool
+    price: str
+    booking_class: str
+    timestamp: datetime
+    points: Optional[int] = None
+
+def calendar_to_results(calendar: Calendar, search: FlightSearch) -> List[FlightResult]:
+    """One FlightResult per day and cabin of a parsed month"""
+    observed = datetime.now()
+    results = []
+    for day in sorted(calendar):
+        for cabin, points in calendar[day].items():
+            results.append(FlightResult(
+                date=f"{search.year}-{search.month:02d}-{day:02d}",
+                availability=points is not None,
+                price=f"{points:,} pts" if points is not None else "",
+                booking_class=cabin,
+                timestamp=observed,
+                points=points
+            ))
+    return results
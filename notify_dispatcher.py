@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Deliver availability alerts over pooled, long-lived channel connections
+"""
+
+import asyncio
+import logging
+import os
+import re
+import smtplib
+from datetime import datetime
+from email.mime.text import MIMEText
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from change_detection import AvailabilityChange, format_changes
+
+logger = logging.getLogger(__name__)
+
+class DeliveryFailed(Exception):
+    """Raised by a channel when a message could not be delivered"""
+
+class SmtpChannel:
+    """Keeps up to pool_size logged-in SMTP connections open between messages"""
+    name = "email"
+
+    def __init__(self, host: str, port: int, sender: str, recipients: List[str],
+                 username: Optional[str] = None, password: Optional[str] = None,
+                 use_tls: bool = True, pool_size: int = 2, timeout: float = 30):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipients = recipients
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.pool_size = pool_size
+        self.timeout = timeout
+        # A slot per connection that may be open; a broken connection gives its slot back
+        self._slots = asyncio.Semaphore(pool_size)
+        self._idle: List[smtplib.SMTP] = []
+        self._opened = 0
+        self._connections: List[smtplib.SMTP] = []
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            server.starttls()
+        if self.username and self.password:
+            server.login(self.username, self.password)
+        return server
+
+    async def _open(self) -> smtplib.SMTP:
+        server = await asyncio.to_thread(self._connect)
+        self._connections.append(server)
+        self._opened += 1
+        return server
+
+    def _discard(self, server: smtplib.SMTP):
+        """Drop a connection in an unknown state rather than hand it to the next message"""
+        self._connections.remove(server)
+        self._opened -= 1
+        try:
+            server.close()
+        except Exception:
+            pass
+
+    async def _checkout(self) -> smtplib.SMTP:
+        await self._slots.acquire()
+        if self._idle:
+            return self._idle.pop()
+        try:
+            return await self._open()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _send_on(self, server: smtplib.SMTP, recipient: str, subject: str, body: str, key: Optional[str]):
+        message = MIMEText(body, "plain")
+        message["From"] = self.sender
+        message["To"] = recipient
+        message["Subject"] = subject
+        if key:
+            # Mail clients collapse redelivered copies with the same Message-ID
+            message["Message-ID"] = f"<{key}@reward-seat-tracker>"
+        server.sendmail(self.sender, [recipient], message.as_string())
+
+    async def send(self, recipient: str, subject: str, body: str, key: Optional[str] = None):
+        server = await self._checkout()
+        try:
+            try:
+                await asyncio.to_thread(self._send_on, server, recipient, subject, body, key)
+            except smtplib.SMTPServerDisconnected:
+                # Idle connections get dropped by the server; reconnect once
+                self._discard(server)
+                server = None
+                server = await self._open()
+                await asyncio.to_thread(self._send_on, server, recipient, subject, body, key)
+        except BaseException:
+            if server is not None:
+                self._discard(server)
+            raise
+        else:
+            self._idle.append(server)
+        finally:
+            self._slots.release()
+
+    async def close(self):
+        for server in self._connections:
+            try:
+                await asyncio.to_thread(server.quit)
+            except Exception:
+                pass
+        self._connections.clear()
+        self._opened = 0
+        self._idle.clear()
+
+class TwilioChannel:
+    """One Twilio client (and its HTTP session) for every SMS"""
+    name = "sms"
+
+    def __init__(self, account_sid: str, auth_token: str, from_number: str, recipients: List[str]):
+        from twilio.rest import Client
+
+        self.client = Client(account_sid, auth_token)
+        self.from_number = from_number
+        self.recipients = recipients
+
+    async def send(self, recipient: str, subject: str, body: str, key: Optional[str] = None):
+        await asyncio.to_thread(
+            self.client.messages.create, body=f"{subject}\n{body}", from_=self.from_number, to=recipient
+        )
+
+    async def close(self):
+        pass
+
+class WebhookChannel:
+    """Posts JSON through one pooled requests session, only to its own url and the allowed ones"""
+    name = "webhook"
+
+    def __init__(self, url: str, pool_size: int = 10, timeout: float = 10, allowed_urls: Optional[List[str]] = None):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.recipients = [url]
+        self.allowed_urls = {url, *(allowed_urls or [])}
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    async def send(self, recipient: str, subject: str, body: str, key: Optional[str] = None):
+        if recipient not in self.allowed_urls:
+            # Watches name their own recipients; never post to a url the config doesn't list
+            raise DeliveryFailed(f"Webhook {recipient} is not in notifications.webhook.allowed_urls")
+        headers = {"Idempotency-Key": key} if key else {}
+        response = await asyncio.to_thread(
+            self.session.post, recipient, json={"subject": subject, "text": body}, headers=headers,
+            timeout=self.timeout,
+        )
+        if response.status_code >= 400:
+            raise DeliveryFailed(f"Webhook returned {response.status_code}")
+
+    async def close(self):
+        self.session.close()
+
+class IMessageChannel:
+    """macOS Messages via send_imessage.py"""
+    name = "imessage"
+
+    def __init__(self, recipients: List[str]):
+        self.recipients = recipients
+
+    async def send(self, recipient: str, subject: str, body: str, key: Optional[str] = None):
+        from send_imessage import send_via_imessage
+
+        if not await asyncio.to_thread(send_via_imessage, recipient, f"{subject}\n{body}"):
+            raise DeliveryFailed(f"iMessage to {recipient} failed")
+
+    async def close(self):
+        pass
+
+# Channel names in config.json under notifications, in the order they are built
+CHANNELS = ("email", "sms", "webhook", "imessage")
+
+EMAIL_RE = re.compile(r"[A-Za-z0-9.!#$%&'*+/=?^_`{|}~-]+"
+                      r"@[A-Za-z0-9](?:[A-Za-z0-9-]*[A-Za-z0-9])?(?:\.[A-Za-z0-9](?:[A-Za-z0-9-]*[A-Za-z0-9])?)+")
+# E.164: a plus, a country code and at most 15 digits in all
+PHONE_RE = re.compile(r"\+[1-9][0-9]{6,14}")
+
+def check_recipient(channel: str, address: str) -> None:
+    """Raise ValueError unless address is well formed for the channel
+
+    Addresses end up in SMTP envelopes, Twilio calls, AppleScript and
+    HTTP requests, so anything that isn't plainly an address is refused.
+    """
+    if channel not in CHANNELS:
+        raise ValueError(f"channel must be one of {', '.join(CHANNELS)}")
+    if channel == "email" and not EMAIL_RE.fullmatch(address):
+        raise ValueError(f"{address!r} is not an email address")
+    if channel in ("sms", "imessage") and not PHONE_RE.fullmatch(address):
+        raise ValueError(f"{address!r} is not an E.164 phone number, e.g. +447700900123")
+    if channel == "webhook":
+        url = urlparse(address)
+        if url.scheme not in ("http", "https") or not url.hostname:
+            raise ValueError(f"{address!r} is not an http(s) url")
+
+def allowed_webhooks(config: Dict[str, Any]) -> Set[str]:
+    """Urls a webhook may post to: notifications.webhook.url and allowed_urls"""
+    settings = config.get("notifications", {}).get("webhook", {})
+    return {url for url in [settings.get("url"), *settings.get("allowed_urls", [])] if url}
+
+def build_channel(config: Dict[str, Any], name: str, recipients: Optional[List[str]] = None):
+    """One channel from its notifications settings, sending to recipients instead of the configured ones if given
+
+    Raises ValueError for an unknown channel or missing credentials, and
+    ImportError when the channel's client library isn't installed.
+    """
+    settings = config.get("notifications", {}).get(name, {})
+    if name == "email":
+        username = settings.get("username") or os.getenv("SENDER_EMAIL")
+        password = settings.get("password") or os.getenv("SENDER_PASSWORD")
+        return SmtpChannel(
+            settings.get("smtp_server", "smtp.gmail.com"),
+            settings.get("smtp_port", 587),
+            sender=settings.get("sender") or username,
+            recipients=recipients or settings.get("to_addresses", []),
+            username=username,
+            password=password,
+            use_tls=settings.get("use_tls", True),
+            pool_size=settings.get("pool_size", 2),
+        )
+    if name == "sms":
+        credentials = [os.getenv(var) for var in ("TWILIO_ACCOUNT_SID", "TWILIO_AUTH_TOKEN", "TWILIO_PHONE_NUMBER")]
+        if not all(credentials):
+            raise ValueError("set TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN and TWILIO_PHONE_NUMBER")
+        return TwilioChannel(*credentials, recipients=recipients or settings.get("to_numbers", []))
+    if name == "webhook":
+        url = recipients[0] if recipients else settings.get("url")
+        if not url:
+            raise ValueError("no webhook url")
+        return WebhookChannel(url, allowed_urls=sorted(allowed_webhooks(config)))
+    if name == "imessage":
+        return IMessageChannel(recipients or settings.get("recipients", []))
+    raise ValueError(f"unknown channel {name!r}")
+
+def channels_from_config(config: Dict[str, Any]) -> List[Any]:
+    """Build a channel for every enabled entry under notifications in config.json
+
+    Channels without default recipients are kept: watches name their own.
+    """
+    notifications = config.get("notifications", {})
+    channels: List[Any] = []
+    for name in CHANNELS:
+        settings = notifications.get(name, {})
+        if not settings.get("enabled"):
+            continue
+        try:
+            channel = build_channel(config, name)
+        except (ImportError, ValueError) as e:
+            logger.warning(f"{name} notifications disabled: {e}")
+            continue
+        channels.append(channel)
+    return channels
+
+class NotificationDispatcher:
+    def __init__(self, channels: List[Any], concurrency: int = 8, max_retries: int = 3,
+                 backoff_seconds: float = 1.0):
+        self.channels = channels
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.pending: List[AvailabilityChange] = []
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "NotificationDispatcher":
+        settings = config.get("notifications", {}).get("dispatch", {})
+        return cls(channels_from_config(config), **settings)
+
+    def enqueue(self, changes: List[AvailabilityChange]):
+        """Queue changes; flush() sends them as one digest per recipient"""
+        self.pending.extend(changes)
+
+    async def flush(self) -> Dict[str, int]:
+        changes, self.pending = self.pending, []
+        if not changes:
+            return {"sent": 0, "failed": 0}
+        subject, body = self.digest(changes)
+        return await self.deliver([
+            (channel, recipient, subject, body)
+            for channel in self.channels
+            for recipient in channel.recipients
+        ])
+
+    def outbox_messages(self, changes: List[AvailabilityChange], batch_id: str) -> List[Dict[str, str]]:
+        """The digest for every (channel, recipient), ready for Outbox.enqueue"""
+        from outbox import idempotency_key
+
+        if not changes:
+            return []
+        subject, body = self.digest(changes)
+        return [
+            {
+                "idempotency_key": idempotency_key(batch_id, channel.name, recipient),
+                "channel": channel.name,
+                "recipient": recipient,
+                "subject": subject,
+                "body": body,
+            }
+            for channel in self.channels
+            for recipient in channel.recipients
+        ]
+
+    def watch_messages(self, matched: Dict[str, List[AvailabilityChange]], batch_id: str) -> List[Dict[str, str]]:
+        """One digest per watch recipient ("channel:address") covering the changes their watches matched"""
+        from outbox import idempotency_key
+
+        messages = []
+        for recipient, changes in sorted(matched.items()):
+            channel, _, address = recipient.partition(":")
+            subject, body = self.digest(changes)
+            messages.append({
+                # Kept apart from the route digest's key in case the same address gets both
+                "idempotency_key": idempotency_key(f"{batch_id}|watch", channel, address),
+                "channel": channel,
+                "recipient": address,
+                "subject": subject,
+                "body": body,
+            })
+        return messages
+
+    @staticmethod
+    def digest(changes: List[AvailabilityChange]) -> Tuple[str, str]:
+        routes = sorted({f"{change.origin}→{change.destination}" for change in changes})
+        subject = f"Reward seat changes: {len(changes)} update{'s' if len(changes) != 1 else ''} ({', '.join(routes)})"
+        body = f"{format_changes(changes)}\n\nChecked {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+        return subject, body
+
+    async def deliver(self, deliveries: List[Tuple[Any, str, str, str]]) -> Dict[str, int]:
+        """Send (channel, recipient, subject, body) tuples concurrently with retries"""
+        outcomes = await asyncio.gather(*(self._deliver_one(*delivery) for delivery in deliveries))
+        return {"sent": sum(outcomes), "failed": len(outcomes) - sum(outcomes)}
+
+    async def _deliver_one(self, channel, recipient: str, subject: str, body: str) -> bool:
+        async with self.semaphore:
+            for attempt in range(1, self.max_retries + 1):
+                try:
+                    await channel.send(recipient, subject, body)
+                    return True
+                except Exception as e:
+                    logger.warning(f"{channel.name} to {recipient} failed (attempt {attempt}): {e}")
+                    if attempt < self.max_retries:
+                        await asyncio.sleep(self.backoff_seconds * 2 ** (attempt - 1))
+        return False
+
+    async def close(self):
+        for channel in self.channels:
+            await channel.close()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Fan out every route, month and airline in config.json over one shared browser
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+from config import load_config
+from models import FlightResult, FlightSearch, UnsupportedAirline
+from politeness import Blocked, CircuitOpen, Politeness
+from refresh import month_key
+from storage import DB_PATH, AvailabilityStore
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class JobResult:
+    search: FlightSearch
+    results: List[FlightResult] = field(default_factory=list)
+    error: Optional[str] = None
+    attempts: int = 0
+    duration: float = 0.0
+    content_hash: Optional[str] = None
+    # Fetched, but identical to the content we already had: nothing was parsed or stored
+    unchanged: bool = False
+    # Refused by the site or its circuit was open, as opposed to any other error
+    blocked: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def status(self) -> str:
+        """ok, empty (the site answered with no seats), blocked or error"""
+        if self.blocked:
+            return "blocked"
+        if self.error:
+            return "error"
+        return "ok" if self.results or self.unchanged else "empty"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "search": self.search.model_dump(),
+            "status": self.status,
+            "results": [result.model_dump(mode="json") for result in self.results],
+            "error": self.error,
+            "attempts": self.attempts,
+            "duration": round(self.duration, 3),
+            "unchanged": self.unchanged,
+        }
+
+@dataclass
+class SweepResult:
+    started_at: datetime
+    duration: float
+    jobs: List[JobResult]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "started_at": self.started_at.isoformat(),
+            "duration": round(self.duration, 3),
+            "succeeded": sum(1 for job in self.jobs if job.ok),
+            "failed": sum(1 for job in self.jobs if not job.ok),
+            "blocked": sum(1 for job in self.jobs if job.blocked),
+            "jobs": [job.to_dict() for job in self.jobs],
+        }
+
+def expand_jobs(config: Dict[str, Any]) -> List[FlightSearch]:
+    """One search per (route, month, airline) declared in config.json"""
+    jobs = []
+    for route in config.get("routes", []):
+        for month in route.get("months", []):
+            for airline in route.get("airlines", ["virgin_atlantic"]):
+                jobs.append(FlightSearch(
+                    origin=route["origin"],
+                    destination=route["destination"],
+                    month=month,
+                    year=route["year"],
+                    airline=airline,
+                ))
+    return jobs
+
+class Orchestrator:
+    def __init__(self, tracker, concurrency: int = 4, max_retries: int = 3,
+                 timeout_seconds: float = 30, known_hashes: Optional[Dict[tuple, str]] = None):
+        self.tracker = tracker
+        self.concurrency = concurrency
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.max_retries = max_retries
+        self.timeout_seconds = timeout_seconds
+        # month_key -> last content hash; when set, jobs fetch incrementally through tracker.fetch_month
+        self.known_hashes = known_hashes
+
+    @classmethod
+    def from_config(cls, tracker, config: Dict[str, Any],
+                    known_hashes: Optional[Dict[tuple, str]] = None) -> "Orchestrator":
+        tracking = config.get("tracking", {})
+        return cls(
+            tracker,
+            concurrency=tracking.get("concurrency", config.get("browser_pool", {}).get("size", 4)),
+            max_retries=tracking.get("max_retries", 3),
+            timeout_seconds=tracking.get("timeout_seconds", 30),
+            known_hashes=known_hashes,
+        )
+
+    async def run(self, jobs: List[FlightSearch]) -> SweepResult:
+        """Run all jobs concurrently and collect one structured batch"""
+        started_at = datetime.now()
+        started = time.perf_counter()
+        results = await asyncio.gather(*(self.run_job(job) for job in jobs))
+        return SweepResult(started_at=started_at, duration=time.perf_counter() - started, jobs=list(results))
+
+    async def stream(self, jobs: Iterable[FlightSearch]) -> AsyncIterator[JobResult]:
+        """Yield each job as soon as it finishes
+
+        Jobs are pulled from the iterable only as slots free up, so at most
+        `concurrency` searches and their results are held at once however
+        many jobs there are.
+        """
+        jobs = iter(jobs)
+        pending = set()
+        try:
+            while True:
+                while len(pending) < self.concurrency:
+                    search = next(jobs, None)
+                    if search is None:
+                        break
+                    pending.add(asyncio.ensure_future(self.run_job(search)))
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            # The consumer went away (client disconnected): stop scraping for it
+            for task in pending:
+                task.cancel()
+
+    async def run_job(self, search: FlightSearch) -> JobResult:
+        job = JobResult(search=search)
+        started = time.perf_counter()
+
+        # Pacing per airline host happens in the tracker (politeness.py)
+        async with self.semaphore:
+            for attempt in range(1, self.max_retries + 1):
+                job.attempts = attempt
+                try:
+                    if self.known_hashes is None:
+                        job.results = await asyncio.wait_for(self.tracker.fetch(search), timeout=self.timeout_seconds)
+                    else:
+                        fetched = await asyncio.wait_for(
+                            self.tracker.fetch_month(search, self.known_hashes.get(month_key(search))),
+                            timeout=self.timeout_seconds,
+                        )
+                        job.results = fetched.results or []
+                        job.content_hash = fetched.content_hash
+                        job.unchanged = fetched.unchanged
+                    job.error = None
+                    break
+                except Exception as e:
+                    job.error = f"{type(e).__name__}: {e}"
+                    # Retrying a refusal or an open circuit would only hit the site harder
+                    job.blocked = isinstance(e, (Blocked, CircuitOpen))
+                    if isinstance(e, UnsupportedAirline) or job.blocked:
+                        break
+                    logger.warning(f"{search.airline} {search.origin}-{search.destination} "
+                                   f"{search.year}-{search.month:02d} attempt {attempt} failed: {job.error}")
+                    if attempt < self.max_retries:
+                        await asyncio.sleep(2 ** (attempt - 1))
+
+        job.duration = time.perf_counter() - started
+        return job
+
+async def run_sweep(config: Optional[Dict[str, Any]] = None) -> SweepResult:
+    """Start a tracker, sweep everything in config.json and shut it down again"""
+    from tracker import RewardSeatTracker
+
+    config = config or load_config()
+    tracker = RewardSeatTracker(
+        pool_settings=config.get("browser_pool", {}),
+        fetch_mode=config.get("scraping", {}).get("fetch_mode", "api"),
+        store=AvailabilityStore(config.get("storage", {}).get("path", DB_PATH)),
+        politeness=Politeness.from_config(config),
+    )
+    await tracker.start_browser()
+    try:
+        return await Orchestrator.from_config(tracker, config).run(expand_jobs(config))
+    finally:
+        await tracker.close_browser()
+
+if __name__ == "__main__":
+    sweep = asyncio.run(run_sweep())
+    for job in sweep.jobs:
+        search = job.search
+        status = f"{len(job.results)} results" if job.ok else f"{job.status}: {job.error}"
+        print(f"{search.airline:<16} {search.origin}-{search.destination} {search.year}-{search.month:02d} "
+              f"{job.duration:6.2f}s x{job.attempts}  {status}")
+    print(f"Swept {len(sweep.jobs)} jobs in {sweep.duration:.1f}s")
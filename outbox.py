@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Durable SQLite outbox between change detection and notification delivery
+"""
+
+import argparse
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from config import load_config
+from metrics import span
+from storage import BASE_DIR, DB_PATH
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    channel TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    available_at REAL NOT NULL,
+    delivered_at REAL
+);
+
+-- Claiming scans only what is due, oldest first
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, available_at);
+"""
+
+@dataclass
+class OutboxMessage:
+    id: int
+    idempotency_key: str
+    channel: str
+    recipient: str
+    subject: str
+    body: str
+    attempts: int
+    created_at: float
+
+def idempotency_key(batch_id: str, channel: str, recipient: str) -> str:
+    """Stable per (batch, channel, recipient) so re-enqueueing a batch is a no-op"""
+    return hashlib.sha256(f"{batch_id}|{channel}|{recipient}".encode()).hexdigest()[:32]
+
+class Outbox:
+    """Messages are pending, in_flight (leased to a worker), delivered or dead"""
+
+    def __init__(self, path: str = DB_PATH):
+        if path != ":memory:" and not os.path.isabs(path):
+            path = os.path.join(BASE_DIR, path)
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def enqueue(self, messages: List[Dict[str, str]]) -> int:
+        """Insert {idempotency_key, channel, recipient, subject, body} dicts; returns how many were new"""
+        now = time.time()
+        rows = [
+            (m["idempotency_key"], m["channel"], m["recipient"], m["subject"], m["body"], now, now)
+            for m in messages
+        ]
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                """
+                INSERT OR IGNORE INTO outbox
+                    (idempotency_key, channel, recipient, subject, body, created_at, available_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+            return self.conn.total_changes - before
+
+    def claim(self, limit: int = 50, lease_seconds: float = 120) -> List[OutboxMessage]:
+        """Lease due messages to the caller
+
+        A message whose lease runs out without being marked delivered or
+        failed (the worker crashed mid-send) becomes due again, which is
+        what makes delivery at-least-once.
+        """
+        now = time.time()
+        with self.conn:
+            # Take the write lock before reading, so two workers can't lease the same rows
+            self.conn.execute("BEGIN IMMEDIATE")
+            rows = self.conn.execute(
+                """
+                SELECT id, idempotency_key, channel, recipient, subject, body, attempts, created_at
+                FROM outbox
+                WHERE status IN ('pending', 'in_flight') AND available_at <= ?
+                ORDER BY available_at
+                LIMIT ?
+                """,
+                (now, limit),
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE outbox SET status = 'in_flight', available_at = ? WHERE id = ?",
+                [(now + lease_seconds, row["id"]) for row in rows],
+            )
+        return [OutboxMessage(**dict(row)) for row in rows]
+
+    def mark_delivered(self, message_id: int):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE outbox SET status = 'delivered', attempts = attempts + 1, delivered_at = ?, "
+                "last_error = NULL WHERE id = ?",
+                (time.time(), message_id),
+            )
+
+    def mark_failed(self, message_id: int, error: str, retry_in: Optional[float]):
+        """Schedule a retry after retry_in seconds, or dead-letter the message when it is None"""
+        with self.conn:
+            if retry_in is None:
+                self.conn.execute(
+                    "UPDATE outbox SET status = 'dead', attempts = attempts + 1, last_error = ? WHERE id = ?",
+                    (error, message_id),
+                )
+            else:
+                self.conn.execute(
+                    "UPDATE outbox SET status = 'pending', attempts = attempts + 1, last_error = ?, "
+                    "available_at = ? WHERE id = ?",
+                    (error, time.time() + retry_in, message_id),
+                )
+
+    def requeue_dead(self) -> int:
+        """Give every dead-lettered message a fresh set of attempts"""
+        with self.conn:
+            cursor = self.conn.execute(
+                "UPDATE outbox SET status = 'pending', attempts = 0, available_at = ? WHERE status = 'dead'",
+                (time.time(),),
+            )
+        return cursor.rowcount
+
+    def dead_letters(self) -> List[Dict[str, Any]]:
+        return [
+            dict(row) for row in self.conn.execute(
+                "SELECT id, channel, recipient, subject, attempts, last_error, created_at "
+                "FROM outbox WHERE status = 'dead' ORDER BY created_at"
+            )
+        ]
+
+    def purge_delivered(self, older_than_seconds: float) -> int:
+        with self.conn:
+            cursor = self.conn.execute(
+                "DELETE FROM outbox WHERE status = 'delivered' AND delivered_at < ?",
+                (time.time() - older_than_seconds,),
+            )
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth per status, age of the oldest undelivered message and recent delivery lag"""
+        now = time.time()
+        counts = {status: 0 for status in ("pending", "in_flight", "delivered", "dead")}
+        for row in self.conn.execute("SELECT status, COUNT(*) AS n FROM outbox GROUP BY status"):
+            counts[row["status"]] = row["n"]
+        oldest = self.conn.execute(
+            "SELECT MIN(created_at) FROM outbox WHERE status IN ('pending', 'in_flight')"
+        ).fetchone()[0]
+        lag = self.conn.execute(
+            "SELECT AVG(delivered_at - created_at), MAX(delivered_at - created_at) FROM outbox "
+            "WHERE status = 'delivered' AND delivered_at >= ?",
+            (now - 3600,),
+        ).fetchone()
+        return {
+            **counts,
+            "depth": counts["pending"] + counts["in_flight"],
+            "oldest_pending_seconds": round(now - oldest, 3) if oldest else 0.0,
+            "delivery_lag_mean_seconds": round(lag[0], 3) if lag[0] is not None else None,
+            "delivery_lag_max_seconds": round(lag[1], 3) if lag[1] is not None else None,
+        }
+
+class OutboxWorker:
+    """Drains the outbox through the dispatcher's channels, independently of scraping"""
+
+    def __init__(self, outbox: Outbox, channels: List[Any], concurrency: int = 8, max_attempts: int = 5,
+                 backoff_seconds: float = 30, lease_seconds: float = 120, poll_seconds: float = 5,
+                 batch_size: int = 50, keep_delivered_seconds: float = 7 * 86400,
+                 purge_interval_seconds: float = 3600):
+        self.outbox = outbox
+        self.channels = {channel.name: channel for channel in channels}
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        # Delivered rows are kept this long for idempotency and lag stats, then purged
+        self.keep_delivered_seconds = keep_delivered_seconds
+        self.purge_interval_seconds = purge_interval_seconds
+        self._purged_at = 0.0
+        self._wake = asyncio.Event()
+
+    @classmethod
+    def from_config(cls, outbox: Outbox, channels: List[Any], config: Dict[str, Any]) -> "OutboxWorker":
+        settings = dict(config.get("outbox", {}))
+        settings.pop("path", None)
+        return cls(outbox, channels, **settings)
+
+    def wake(self):
+        """Start draining now instead of at the next poll"""
+        self._wake.set()
+
+    async def drain(self) -> Dict[str, int]:
+        """Deliver everything currently due; returns delivered, retried and dead counts"""
+        totals = {"delivered": 0, "retried": 0, "dead": 0}
+        while True:
+            batch = self.outbox.claim(self.batch_size, self.lease_seconds)
+            if not batch:
+                return totals
+            for outcome in await asyncio.gather(*(self._deliver(message) for message in batch)):
+                totals[outcome] += 1
+
+    def purge(self) -> int:
+        """Delete delivered rows past keep_delivered_seconds, at most once per purge_interval_seconds"""
+        now = time.monotonic()
+        if now - self._purged_at < self.purge_interval_seconds:
+            return 0
+        self._purged_at = now
+        return self.outbox.purge_delivered(self.keep_delivered_seconds)
+
+    async def run_forever(self):
+        while True:
+            try:
+                await self.drain()
+                self.purge()
+            except Exception as e:
+                logger.error(f"Outbox drain failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def _deliver(self, message: OutboxMessage) -> str:
+        channel = self.channels.get(message.channel)
+        if channel is None:
+            self.outbox.mark_failed(message.id, f"channel {message.channel!r} is not configured", None)
+            return "dead"
+
+        async with self.semaphore:
+            try:
+                # Give up well inside the lease so no other worker re-claims a message still being sent
+                with span(f"deliver.{message.channel}"):
+                    await asyncio.wait_for(
+                        channel.send(message.recipient, message.subject, message.body, key=message.idempotency_key),
+                        timeout=self.lease_seconds / 2,
+                    )
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                attempt = message.attempts + 1
+                if attempt >= self.max_attempts:
+                    logger.error(f"{message.channel} to {message.recipient} dead-lettered after {attempt} attempts: {error}")
+                    self.outbox.mark_failed(message.id, error, None)
+                    return "dead"
+                logger.warning(f"{message.channel} to {message.recipient} failed (attempt {attempt}): {error}")
+                self.outbox.mark_failed(message.id, error, self.backoff_seconds * 2 ** (attempt - 1))
+                return "retried"
+
+        self.outbox.mark_delivered(message.id)
+        return "delivered"
+
+def outbox_path(config: Dict[str, Any]) -> str:
+    """outbox.path, defaulting to the availability database"""
+    return config.get("outbox", {}).get("path") or config.get("storage", {}).get("path", DB_PATH)
+
+async def main(args):
+    from notify_dispatcher import channels_from_config
+
+    config = load_config()
+    outbox = Outbox(outbox_path(config))
+    try:
+        if args.retry_dead:
+            print(f"Requeued {outbox.requeue_dead()} dead-lettered messages")
+        if args.drain:
+            channels = channels_from_config(config)
+            worker = OutboxWorker.from_config(outbox, channels, config)
+            print(f"Drained: {await worker.drain()}")
+            for channel in channels:
+                await channel.close()
+        for letter in outbox.dead_letters():
+            print(f"dead #{letter['id']} {letter['channel']} → {letter['recipient']} "
+                  f"x{letter['attempts']}: {letter['last_error']}")
+        print(outbox.stats())
+    finally:
+        outbox.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect and drain the notification outbox")
+    parser.add_argument("--drain", action="store_true", help="deliver everything that is due now")
+    parser.add_argument("--retry-dead", action="store_true", help="move dead-lettered messages back to pending")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Fetch planner: collapse config routes, watches and ad-hoc searches into one fetch per (airline, route, month)
+"""
+
+import argparse
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import load_config
+from models import FlightSearch
+from orchestrator import expand_jobs
+from refresh import MonthKey, month_key
+
+# What a watch with no airline is checked on when its route isn't in config.json
+DEFAULT_AIRLINES = [FlightSearch.model_fields["airline"].default]
+
+def watch_months(start: date, end: date) -> Iterator[Tuple[int, int]]:
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+def unique_searches(searches: Iterable[FlightSearch]) -> Iterator[FlightSearch]:
+    """Drop repeats of a month already yielded, lazily, so a streamed range stays streamed"""
+    seen = set()
+    for search in searches:
+        key = month_key(search)
+        if key not in seen:
+            seen.add(key)
+            yield search
+
+@dataclass
+class FetchPlan:
+    """The distinct month fetches for a cycle and who asked for each"""
+    searches: List[FlightSearch]
+    # month_key -> consumers, e.g. "route:LHR-BLR", "watch:12", "adhoc:request"
+    consumers: Dict[MonthKey, List[str]]
+
+    @property
+    def requests(self) -> int:
+        return sum(len(consumers) for consumers in self.consumers.values())
+
+    @property
+    def dedup_ratio(self) -> float:
+        """Consumer requests per fetch; 1.0 means nothing was shared"""
+        return self.requests / len(self.searches) if self.searches else 1.0
+
+    def consumers_of(self, search: FlightSearch) -> List[str]:
+        return self.consumers.get(month_key(search), [])
+
+    def wanted_by(self, search: FlightSearch, kind: str) -> bool:
+        """Whether any consumer of this kind ("route", "watch", "adhoc") asked for the month"""
+        return any(consumer.startswith(f"{kind}:") for consumer in self.consumers_of(search))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"requests": self.requests, "fetches": len(self.searches), "dedup_ratio": round(self.dedup_ratio, 2)}
+
+class FetchPlanner:
+    """Collects (search, consumer) requests; plan() keeps one search per month key
+
+    Browser navigations per cycle are then bounded by the distinct
+    (airline, route, month) combinations, however many consumers there are.
+    """
+
+    def __init__(self, route_airlines: Optional[Dict[Tuple[str, str], List[str]]] = None,
+                 today: Optional[date] = None):
+        self.route_airlines = route_airlines or {}
+        self.today = today or date.today()
+        self.searches: Dict[MonthKey, FlightSearch] = {}
+        self.consumers: Dict[MonthKey, List[str]] = {}
+
+    def add(self, search: FlightSearch, consumer: str):
+        key = month_key(search)
+        if key not in self.searches:
+            self.searches[key] = search
+            self.consumers[key] = []
+        if consumer not in self.consumers[key]:
+            self.consumers[key].append(consumer)
+
+    def add_searches(self, searches: Iterable[FlightSearch], consumer: str):
+        for search in searches:
+            self.add(search, consumer)
+
+    def add_config(self, config: Dict[str, Any]):
+        """Every route, month and airline declared under routes in config.json"""
+        for search in expand_jobs(config):
+            self.add(search, f"route:{search.origin}-{search.destination}")
+
+    def add_watches(self, watches: Iterable[Any]):
+        """Each month a watch's window touches, skipping months already in the past"""
+        for watch in watches:
+            if watch.end < self.today:
+                continue
+            start = max(watch.start, self.today)
+            airlines = ([watch.airline] if watch.airline else
+                        self.route_airlines.get((watch.origin, watch.destination), DEFAULT_AIRLINES))
+            for year, month in watch_months(start, watch.end):
+                for airline in airlines:
+                    self.add(FlightSearch(origin=watch.origin, destination=watch.destination,
+                                          month=month, year=year, airline=airline), f"watch:{watch.id}")
+
+    def plan(self) -> FetchPlan:
+        return FetchPlan(searches=list(self.searches.values()),
+                         consumers={key: list(consumers) for key, consumers in self.consumers.items()})
+
+def route_airlines(config: Dict[str, Any]) -> Dict[Tuple[str, str], List[str]]:
+    return {
+        (route["origin"], route["destination"]): route.get("airlines", DEFAULT_AIRLINES)
+        for route in config.get("routes", [])
+    }
+
+def plan_cycle(config: Dict[str, Any], watches: Iterable[Any] = (), adhoc: Iterable[FlightSearch] = (),
+               today: Optional[date] = None) -> FetchPlan:
+    """The deduplicated fetches for one check: config routes, then watches, then ad-hoc searches"""
+    planner = FetchPlanner(route_airlines(config), today)
+    planner.add_config(config)
+    planner.add_watches(watches)
+    planner.add_searches(adhoc, "adhoc:request")
+    return planner.plan()
+
+if __name__ == "__main__":
+    from watches import WatchRegistry, watches_path
+
+    parser = argparse.ArgumentParser(description="Show the month fetches the next check would plan")
+    parser.add_argument("--search", nargs=3, action="append", default=[], metavar=("ORIGIN", "DESTINATION", "YYYY-MM"),
+                        help="add an ad-hoc month to the plan (repeatable)")
+    parser.add_argument("--airline", default=DEFAULT_AIRLINES[0], help="airline for --search")
+    args = parser.parse_args()
+
+    config = load_config()
+    registry = WatchRegistry(watches_path(config))
+    registry.sync_config(config)
+    adhoc = [
+        FlightSearch(origin=origin, destination=destination, year=int(month[:4]), month=int(month[5:7]),
+                     airline=args.airline)
+        for origin, destination, month in args.search
+    ]
+    plan = plan_cycle(config, registry.list(), adhoc)
+    registry.close()
+    for search in plan.searches:
+        consumers = plan.consumers_of(search)
+        print(f"{search.airline:<16} {search.origin}-{search.destination} {search.year}-{search.month:02d}  "
+              f"{len(consumers)} consumer{'s' if len(consumers) != 1 else ''}: {', '.join(consumers)}")
+    stats = plan.stats()
+    print(f"{stats['requests']} requests -> {stats['fetches']} fetches (dedup ratio {stats['dedup_ratio']:.2f})")
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Per-host politeness: AIMD token bucket, circuit breaker, and telling "blocked" apart from "no seats"
+"""
+
+import asyncio
+import logging
+import re
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Statuses a site uses to throttle or turn away a scraper
+BLOCKED_STATUSES = {403, 429, 503}
+
+# Interstitials served with a 200 instead of the calendar
+CHALLENGE_RE = re.compile(
+    r"access denied|are you a robot|verify you are human|captcha|unusual traffic|request unsuccessful|"
+    r"too many requests|pardon our interruption",
+    re.IGNORECASE,
+)
+
+class Blocked(Exception):
+    """The site refused the request (throttled, forbidden or a bot challenge); not the same as no seats"""
+
+    def __init__(self, message: str, status: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+class CircuitOpen(Exception):
+    """Requests to a host are suspended after repeated failures"""
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"{host} circuit open, retrying in {retry_in:.0f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header, given as seconds or an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def check_blocked(response, url: str = "") -> None:
+    """Raise Blocked if a Playwright response is a throttling or forbidden status"""
+    if response is not None and response.status in BLOCKED_STATUSES:
+        retry_after = parse_retry_after(response.headers.get("retry-after"))
+        raise Blocked(f"{url or response.url} answered {response.status}", response.status, retry_after)
+
+def check_challenge(text: Optional[str], url: str = "") -> None:
+    """Raise Blocked if page text is a bot challenge rather than a calendar"""
+    match = CHALLENGE_RE.search(text or "")
+    if match:
+        raise Blocked(f"{url or 'page'} served a challenge ({match.group(0)!r})")
+
+def _is_timeout(error: Exception) -> bool:
+    # Playwright's TimeoutError isn't a subclass of the builtin one
+    return isinstance(error, TimeoutError) or type(error).__name__ == "TimeoutError"
+
+class TokenBucket:
+    """Up to `burst` requests back to back, refilled at `rate` per second; a rate of 0 means no limit"""
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        if self.rate <= 0 and time.monotonic() >= self._paused_until:
+            return
+        # The lock queues callers in order, so a waiting request can't be overtaken
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                if self.rate <= 0:
+                    # Unlimited once the pause is over
+                    return
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Hand out nothing for `seconds`, e.g. to honour Retry-After"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+class CircuitBreaker:
+    """closed -> open after failure_threshold consecutive failures -> half_open probe after a cooldown
+
+    Each time a probe fails the cooldown doubles, up to max_cooldown_seconds.
+    Failures of requests let in before the circuit opened don't count again.
+    """
+
+    def __init__(self, failure_threshold: int = 3, cooldown_seconds: float = 60,
+                 max_cooldown_seconds: float = 1800):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown_seconds
+        self.max_cooldown = max_cooldown_seconds
+        self.cooldown = cooldown_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_at: Optional[float] = None
+        self.opens = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "open" if time.monotonic() - self.opened_at < self.cooldown else "half_open"
+
+    def check(self, host: str) -> bool:
+        """Raise CircuitOpen unless a request may go out now; True if it goes out as the half-open probe"""
+        now = time.monotonic()
+        if self.opened_at is None:
+            return False
+        if now - self.opened_at < self.cooldown:
+            raise CircuitOpen(host, self.opened_at + self.cooldown - now)
+        # One probe at a time; a probe that never reported back frees up after another cooldown
+        if self._probe_at is not None and now - self._probe_at < self.cooldown:
+            raise CircuitOpen(host, self._probe_at + self.cooldown - now)
+        self._probe_at = now
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probe_at = None
+        self.cooldown = self.base_cooldown
+
+    def release_probe(self):
+        """The probe ended without an answer either way; let the next request probe instead"""
+        self._probe_at = None
+
+    def record_failure(self, retry_after: Optional[float] = None, probe: bool = False):
+        self.failures += 1
+        if self.opened_at is not None:
+            if not probe:
+                # Already in flight when the circuit opened; the open circuit accounts for it
+                return
+            # The half-open probe failed: back off harder
+            self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+        elif self.failures < self.failure_threshold:
+            return
+        self.cooldown = max(self.cooldown, retry_after or 0)
+        self.opened_at = time.monotonic()
+        self._probe_at = None
+        self.opens += 1
+
+class HostPolicy:
+    """Token bucket whose rate is tuned AIMD-style by outcomes, guarded by a circuit breaker
+
+    Fast successes add `increase` requests/second up to max_rate; slow
+    responses, timeouts and blocks multiply the rate by `decrease` down
+    to min_rate. Blocks and errors count towards opening the circuit,
+    and a Retry-After pauses the bucket for at least that long. A
+    cancelled request (a caller's timeout or shutdown) says nothing
+    about the host and counts for neither.
+    """
+
+    def __init__(self, host: str, rate: float, burst: float = 1.0, min_rate: float = 0.05,
+                 max_rate: Optional[float] = None, increase: float = 0.05, decrease: float = 0.5,
+                 slow_seconds: float = 8.0, failure_threshold: int = 3, cooldown_seconds: float = 60,
+                 max_cooldown_seconds: float = 1800):
+        self.host = host
+        self.min_rate = min_rate
+        self.max_rate = max_rate if max_rate is not None else rate * 2
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_seconds = slow_seconds
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(failure_threshold, cooldown_seconds, max_cooldown_seconds)
+        self.counts = {"ok": 0, "slow": 0, "blocked": 0, "error": 0, "rejected": 0}
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+    def _set_rate(self, rate: float):
+        if self.bucket.rate <= 0:
+            return
+        self.bucket.rate = min(self.max_rate, max(self.min_rate, rate))
+
+    async def acquire(self) -> bool:
+        """Wait for a token; raises CircuitOpen while the host is suspended
+
+        Returns True if the request is the half-open probe, to be passed on to request().
+        """
+        try:
+            probe = self.breaker.check(self.host)
+            await self.bucket.acquire()
+            # The circuit may have opened while this request waited for a token
+            if self.breaker.state == "open":
+                self.breaker.check(self.host)
+            return probe
+        except CircuitOpen:
+            self.counts["rejected"] += 1
+            raise
+
+    @contextmanager
+    def request(self, probe: bool = False) -> Iterator[None]:
+        """Time one request to the host and feed its outcome back into the rate and the breaker"""
+        started = time.monotonic()
+        try:
+            yield
+        except Blocked as e:
+            self.counts["blocked"] += 1
+            self._set_rate(self.rate * self.decrease)
+            if e.retry_after:
+                self.bucket.pause(e.retry_after)
+            self.breaker.record_failure(e.retry_after, probe)
+            logger.warning(f"{self.host} blocked us ({e}); rate now {self.rate:.2f}/s, "
+                           f"circuit {self.breaker.state}")
+            raise
+        except asyncio.CancelledError:
+            if probe:
+                self.breaker.release_probe()
+            raise
+        except Exception as e:
+            # Tarpitting looks like timeouts: slow down as well as counting a failure
+            if _is_timeout(e):
+                self._set_rate(self.rate * self.decrease)
+            self.counts["error"] += 1
+            self.breaker.record_failure(probe=probe)
+            raise
+        latency = time.monotonic() - started
+        self.breaker.record_success()
+        if latency > self.slow_seconds:
+            self.counts["slow"] += 1
+            self._set_rate(self.rate * self.decrease)
+        else:
+            self.counts["ok"] += 1
+            self._set_rate(self.rate + self.increase)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate": round(self.rate, 3),
+            "circuit": self.breaker.state,
+            "circuit_opens": self.breaker.opens,
+            **self.counts,
+        }
+
+class Politeness:
+    """One HostPolicy per airline host, created on first use"""
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None,
+                 airline_rates: Optional[Dict[str, float]] = None):
+        self.settings = settings or {}
+        # Starting rates; each adapter's rate_limit unless tracking.airline_rate_limits overrides it
+        self.airline_rates = airline_rates or {}
+        self.hosts: Dict[str, HostPolicy] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "Politeness":
+        return cls(config.get("politeness", {}), config.get("tracking", {}).get("airline_rate_limits", {}))
+
+    def for_host(self, host: str, airline: str, default_rate: float) -> HostPolicy:
+        if host not in self.hosts:
+            rate = self.airline_rates.get(airline, default_rate)
+            self.hosts[host] = HostPolicy(host, rate, **self.settings)
+        return self.hosts[host]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {host: policy.stats() for host, policy in self.hosts.items()}
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Event-driven page readiness waits with timeouts learned from past runs
+"""
+
+import json
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from calendar_parser import CALENDAR_DAY_SELECTOR
+
+TIMINGS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "readiness_timings.json")
+
+COOKIE_REJECT_SELECTORS = [
+    'button:has-text("Reject All")',
+    'button:has-text("Reject all")',
+    'button:has-text("Decline All")',
+    '[data-testid="reject-all"]',
+    '.reject-all',
+    '#reject-all',
+]
+
+class ReadinessTimeout(Exception):
+    """Raised when a readiness signal doesn't arrive in time"""
+
+# Resolves once the selector count is non-zero and unchanged for stableMs
+SELECTOR_STABLE_JS = """
+([selector, stableMs, timeoutMs]) => new Promise(resolve => {
+    const started = performance.now();
+    let last = -1;
+    let since = started;
+    const check = () => {
+        const count = document.querySelectorAll(selector).length;
+        const now = performance.now();
+        if (count !== last) {
+            last = count;
+            since = now;
+        } else if (count > 0 && now - since >= stableMs) {
+            return resolve({count, ready: true});
+        }
+        if (now - started >= timeoutMs) {
+            return resolve({count, ready: false});
+        }
+        setTimeout(check, 50);
+    };
+    check();
+})
+"""
+
+# Resolves once no DOM mutation has happened for quietMs
+DOM_QUIET_JS = """
+([quietMs, timeoutMs]) => new Promise(resolve => {
+    let timer;
+    let deadline;
+    const observer = new MutationObserver(() => {
+        clearTimeout(timer);
+        timer = setTimeout(() => done(true), quietMs);
+    });
+    const done = (ready) => {
+        observer.disconnect();
+        clearTimeout(timer);
+        clearTimeout(deadline);
+        resolve(ready);
+    };
+    observer.observe(document.documentElement, {
+        childList: true, subtree: true, attributes: true, characterData: true,
+    });
+    timer = setTimeout(() => done(true), quietMs);
+    deadline = setTimeout(() => done(false), timeoutMs);
+})
+"""
+
+async def wait_for_selector_count_stable(page, selector: str, stable_ms: float = 300,
+                                         timeout: float = 15000) -> int:
+    """Wait until selector matches something and the match count stops changing"""
+    state = await page.evaluate(SELECTOR_STABLE_JS, [selector, stable_ms, timeout])
+    if not state["ready"]:
+        raise ReadinessTimeout(f"{selector} count not stable within {timeout:.0f}ms (last count {state['count']})")
+    return state["count"]
+
+async def wait_for_dom_quiescence(page, quiet_ms: float = 250, timeout: float = 15000):
+    """Wait for a window of quiet_ms with no DOM mutations"""
+    if not await page.evaluate(DOM_QUIET_JS, [quiet_ms, timeout]):
+        raise ReadinessTimeout(f"DOM still changing after {timeout:.0f}ms")
+
+async def dismiss_cookie_consent(page, timeout: float = 3000,
+                                 selectors: List[str] = COOKIE_REJECT_SELECTORS) -> bool:
+    """Click the first cookie 'reject' button found and wait for it to go away"""
+    selector = ", ".join(selectors)
+    try:
+        button = await page.wait_for_selector(selector, timeout=timeout)
+    except Exception:
+        return False
+    await button.click()
+    try:
+        # The dialog closing is the signal, not a fixed sleep
+        await button.wait_for_element_state("hidden", timeout=timeout)
+    except Exception:
+        pass
+    return True
+
+async def wait_for_calendar_ready(page, timeouts: "AdaptiveTimeouts", selector: str = CALENDAR_DAY_SELECTOR) -> int:
+    """Calendar cells present and stable, then a short quiet window for late prices"""
+    count = await timeouts.wait(
+        "calendar_cells",
+        lambda timeout: wait_for_selector_count_stable(page, selector, timeout=timeout),
+    )
+    await timeouts.wait("calendar_quiet", lambda timeout: wait_for_dom_quiescence(page, timeout=timeout))
+    return count
+
+async def inspection_hold(page, seconds: float):
+    """Keep the browser open for manual inspection; only when asked for"""
+    if seconds > 0:
+        print(f"Browser will stay open for {seconds:.0f} seconds for manual inspection...")
+        await page.wait_for_timeout(seconds * 1000)
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+class AdaptiveTimeouts:
+    """Per-signal timeouts derived from how long each signal took in past runs"""
+
+    def __init__(self, path: Optional[str] = TIMINGS_PATH, default_ms: float = 15000,
+                 min_ms: float = 2000, max_ms: float = 60000, history: int = 50):
+        self.path = path
+        self.default_ms = default_ms
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+        self.history = history
+        self.samples: Dict[str, List[float]] = {}
+        self.run: Dict[str, float] = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self.samples = json.load(f)
+            except (OSError, ValueError):
+                self.samples = {}
+
+    def timeout_for(self, signal: str) -> float:
+        """Twice the observed p95, clamped; the default until there's enough history"""
+        samples = self.samples.get(signal, [])
+        if len(samples) < 5:
+            return self.default_ms
+        return max(self.min_ms, min(self.max_ms, _percentile(samples, 95) * 2))
+
+    def record(self, signal: str, elapsed_ms: float):
+        samples = self.samples.setdefault(signal, [])
+        samples.append(round(elapsed_ms, 1))
+        del samples[:-self.history]
+        self.run[signal] = self.run.get(signal, 0) + elapsed_ms
+
+    async def wait(self, signal: str, wait: Callable[[float], Awaitable[Any]]) -> Any:
+        """Run a readiness wait with this signal's timeout and record how long it took"""
+        started = time.perf_counter()
+        result = await wait(self.timeout_for(signal))
+        self.record(signal, (time.perf_counter() - started) * 1000)
+        return result
+
+    def save(self):
+        if not self.path:
+            return
+        with open(self.path, "w") as f:
+            json.dump(self.samples, f, indent=2)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {
+            signal: {
+                "count": len(samples),
+                "p50_ms": _percentile(samples, 50),
+                "p95_ms": _percentile(samples, 95),
+                "timeout_ms": self.timeout_for(signal),
+            }
+            for signal, samples in self.samples.items() if samples
+        }
+
+if __name__ == "__main__":
+    # Show recorded wait timings so savings can be compared run to run
+    for signal, stats in AdaptiveTimeouts().summary().items():
+        print(f"{signal:<16} n={stats['count']:<3} p50={stats['p50_ms']:8.1f}ms "
+              f"p95={stats['p95_ms']:8.1f}ms timeout={stats['timeout_ms']:8.1f}ms")
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Incremental month refresh: content hashes per month and cabin, and how often each month is re-checked
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import load_config
+from models import FlightResult, FlightSearch
+from storage import BASE_DIR, DB_PATH
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS month_refresh (
+    airline TEXT NOT NULL,
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    payload_hash TEXT,
+    cabin_hashes TEXT NOT NULL DEFAULT '{}',
+    checks INTEGER NOT NULL DEFAULT 0,
+    changes INTEGER NOT NULL DEFAULT 0,
+    change_rate REAL NOT NULL DEFAULT 1.0,
+    checked_at TEXT,
+    changed_at TEXT,
+    PRIMARY KEY (airline, origin, destination, year, month)
+) WITHOUT ROWID;
+"""
+
+UPSERT_STATE = """
+INSERT INTO month_refresh (airline, origin, destination, year, month, payload_hash, cabin_hashes,
+                           checks, changes, change_rate, checked_at, changed_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (airline, origin, destination, year, month) DO UPDATE SET
+    payload_hash = excluded.payload_hash,
+    cabin_hashes = excluded.cabin_hashes,
+    checks = excluded.checks,
+    changes = excluded.changes,
+    change_rate = excluded.change_rate,
+    checked_at = excluded.checked_at,
+    changed_at = excluded.changed_at
+"""
+
+# (airline, origin, destination, year, month)
+MonthKey = Tuple[str, str, str, int, int]
+
+def month_key(search: FlightSearch) -> MonthKey:
+    return (search.airline, search.origin, search.destination, search.year, search.month)
+
+def content_hash(payload: Any) -> str:
+    """Digest of a JSON-serialisable payload that doesn't depend on key order"""
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(encoded.encode(), digest_size=16).hexdigest()
+
+def cabin_hashes(results: Iterable[FlightResult]) -> Dict[str, str]:
+    """One digest per cabin over its (travel date, points) pairs"""
+    by_cabin: Dict[str, List[Tuple[str, Optional[int]]]] = {}
+    for result in results:
+        by_cabin.setdefault(result.booking_class, []).append((result.date, result.points))
+    return {cabin: content_hash(sorted(rows)) for cabin, rows in by_cabin.items()}
+
+@dataclass
+class MonthFetch:
+    """One fetched month; results is None when its content matched the hash we already had"""
+    results: Optional[List[FlightResult]]
+    content_hash: Optional[str] = None
+
+    @property
+    def unchanged(self) -> bool:
+        return self.results is None
+
+@dataclass
+class MonthState:
+    payload_hash: Optional[str] = None
+    cabin_hashes: Dict[str, str] = field(default_factory=dict)
+    checks: int = 0
+    changes: int = 0
+    # Smoothed fraction of recent checks that found a change; new months start hot
+    change_rate: float = 1.0
+    checked_at: Optional[datetime] = None
+    changed_at: Optional[datetime] = None
+
+class RefreshState:
+    """Last content hashes and change history per (airline, route, month)"""
+
+    def __init__(self, path: str = DB_PATH):
+        if path != ":memory:" and not os.path.isabs(path):
+            path = os.path.join(BASE_DIR, path)
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def states(self) -> Dict[MonthKey, MonthState]:
+        """Every tracked month, loaded in one query"""
+        states = {}
+        for row in self.conn.execute("SELECT * FROM month_refresh"):
+            states[(row["airline"], row["origin"], row["destination"], row["year"], row["month"])] = MonthState(
+                payload_hash=row["payload_hash"],
+                cabin_hashes=json.loads(row["cabin_hashes"]),
+                checks=row["checks"],
+                changes=row["changes"],
+                change_rate=row["change_rate"],
+                checked_at=datetime.fromisoformat(row["checked_at"]) if row["checked_at"] else None,
+                changed_at=datetime.fromisoformat(row["changed_at"]) if row["changed_at"] else None,
+            )
+        return states
+
+    def save(self, updates: Dict[MonthKey, MonthState]):
+        """Write the states of one sweep in a single transaction"""
+        rows = [
+            (
+                *key,
+                state.payload_hash,
+                json.dumps(state.cabin_hashes, sort_keys=True),
+                state.checks,
+                state.changes,
+                state.change_rate,
+                state.checked_at.isoformat() if state.checked_at else None,
+                state.changed_at.isoformat() if state.changed_at else None,
+            )
+            for key, state in updates.items()
+        ]
+        with self.conn:
+            self.conn.executemany(UPSERT_STATE, rows)
+
+class RefreshPolicy:
+    """Decides which months are due: hot, near-term months often, quiet far-off ones rarely
+
+    A month's interval is min_interval_hours, stretched by horizon_weight
+    for every month it lies ahead and divided by its smoothed change rate,
+    capped at max_interval_hours. Months never checked are always due.
+    """
+
+    def __init__(self, enabled: bool = True, min_interval_hours: float = 6, max_interval_hours: float = 72,
+                 horizon_weight: float = 0.5, min_change_rate: float = 0.05, smoothing: float = 0.3):
+        self.enabled = enabled
+        self.min_interval_hours = min_interval_hours
+        self.max_interval_hours = max_interval_hours
+        self.horizon_weight = horizon_weight
+        self.min_change_rate = min_change_rate
+        self.smoothing = smoothing
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "RefreshPolicy":
+        return cls(**config.get("refresh", {}))
+
+    def interval(self, search: FlightSearch, state: MonthState, now: datetime) -> timedelta:
+        months_ahead = max(0, (search.year - now.year) * 12 + search.month - now.month)
+        hours = (self.min_interval_hours * (1 + self.horizon_weight * months_ahead)
+                 / max(state.change_rate, self.min_change_rate))
+        return timedelta(hours=min(hours, self.max_interval_hours))
+
+    def is_due(self, search: FlightSearch, state: Optional[MonthState], now: datetime) -> bool:
+        if not self.enabled or state is None or state.checked_at is None:
+            return True
+        return now - state.checked_at >= self.interval(search, state, now)
+
+    def plan(self, searches: Iterable[FlightSearch], states: Dict[MonthKey, MonthState],
+             now: datetime) -> Tuple[List[FlightSearch], List[FlightSearch]]:
+        """Split searches into (due, not yet due)"""
+        due, waiting = [], []
+        for search in searches:
+            (due if self.is_due(search, states.get(month_key(search)), now) else waiting).append(search)
+        return due, waiting
+
+    def observe(self, state: Optional[MonthState], changed: bool, now: datetime) -> MonthState:
+        """The month's state after a check that did or didn't find new content"""
+        state = state or MonthState()
+        rate = state.change_rate + self.smoothing * (float(changed) - state.change_rate)
+        return MonthState(
+            payload_hash=state.payload_hash,
+            cabin_hashes=dict(state.cabin_hashes),
+            checks=state.checks + 1,
+            changes=state.changes + int(changed),
+            change_rate=round(rate, 4),
+            checked_at=now,
+            changed_at=now if changed else state.changed_at,
+        )
+
+def refresh_path(config: Dict[str, Any]) -> str:
+    """Refresh state lives next to the availability history"""
+    return config.get("storage", {}).get("path", DB_PATH)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show each month's change rate and when it is next due")
+    parser.add_argument("--reset", action="store_true", help="forget all hashes so the next check refreshes everything")
+    args = parser.parse_args()
+
+    config = load_config()
+    state = RefreshState(refresh_path(config))
+    if args.reset:
+        with state.conn:
+            state.conn.execute("DELETE FROM month_refresh")
+        print("Refresh state cleared")
+    else:
+        policy = RefreshPolicy.from_config(config)
+        now = datetime.now()
+        for key, month in sorted(state.states().items()):
+            airline, origin, destination, year, month_number = key
+            search = FlightSearch(origin=origin, destination=destination, month=month_number, year=year,
+                                  airline=airline)
+            due = month.checked_at + policy.interval(search, month, now) if month.checked_at else now
+            print(f"{airline:<16} {origin}-{destination} {year}-{month_number:02d}  "
+                  f"{month.changes}/{month.checks} changed  rate {month.change_rate:.2f}  "
+                  f"next {'now' if due <= now else due.strftime('%Y-%m-%d %H:%M')}")
+    state.close()
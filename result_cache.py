@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+In-memory search result cache with TTL, LRU bound, request coalescing and stale-while-revalidate
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+logger = logging.getLogger(__name__)
+
+class CacheEntry:
+    def __init__(self, value: Any):
+        self.value = value
+        self.stored_at = time.monotonic()
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.stored_at
+
+class ResultCache:
+    def __init__(self, ttl_seconds: float = 300, stale_seconds: float = 600, max_entries: int = 512):
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.counters = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "stale_served": 0,
+            "refresh_errors": 0,
+            "evictions": 0,
+        }
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Tuple[Any, float, str]:
+        """Return (value, age in seconds, status) where status is hit, stale, coalesced or miss
+
+        Concurrent callers for the same key share one in-flight fetch. An
+        entry past its TTL but within the stale window is returned at once
+        while a single background fetch refreshes it.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            if entry.age < self.ttl_seconds:
+                self.counters["hits"] += 1
+                return entry.value, entry.age, "hit"
+            if entry.age < self.ttl_seconds + self.stale_seconds:
+                self.counters["stale_served"] += 1
+                if key not in self._in_flight:
+                    task = self._start_fetch(key, fetch)
+                    task.add_done_callback(self._log_refresh_error)
+                return entry.value, entry.age, "stale"
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.counters["coalesced"] += 1
+            return await asyncio.shield(task), 0.0, "coalesced"
+
+        self.counters["misses"] += 1
+        return await asyncio.shield(self._start_fetch(key, fetch)), 0.0, "miss"
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "entries": len(self._entries), "in_flight": len(self._in_flight)}
+
+    def _start_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        async def run():
+            try:
+                value = await fetch()
+                self._store(key, value)
+                return value
+            finally:
+                self._in_flight.pop(key, None)
+
+        task = asyncio.ensure_future(run())
+        self._in_flight[key] = task
+        return task
+
+    def _store(self, key: Hashable, value: Any):
+        self._entries[key] = CacheEntry(value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def _log_refresh_error(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            self.counters["refresh_errors"] += 1
+            logger.warning(f"Background cache refresh failed, keeping stale entry: {task.exception()}")
+
+def search_cache_key(search) -> Tuple:
+    return (search.airline, search.origin.upper(), search.destination.upper(), search.year, search.month)
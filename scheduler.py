@@ -1,67 +1,348 @@
-import schedule
-import time
-import subprocess
+#!/usr/bin/env python3
+"""
+In-process async scheduler: one warm browser, checks on a daily or interval trigger
+"""
+
+import argparse
+import asyncio
+import json
 import os
-from datetime import datetime
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
 
-def run_flight_check():
-    """Run the complete flight check and send results"""
-    print(f"\n=== Running flight check at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===")
-    
-    try:
-        # Run the extraction script
-        result = subprocess.run(
-            ["python", "extract_points.py"], 
-            capture_output=True, 
-            text=True,
-            cwd="/Users/sahil/reward-seat-tracker"
+from availability_matrix import matrix_path, rebuild
+from change_detection import AvailabilityChange, Thresholds, detect_changes, month_bounds, route_thresholds
+from config import load_config
+from models import FlightSearch
+from metrics import span, trace_run
+from notify_dispatcher import NotificationDispatcher
+from orchestrator import Orchestrator
+from outbox import Outbox, OutboxWorker, outbox_path
+from planner import FetchPlan, plan_cycle
+from politeness import Politeness
+from refresh import RefreshPolicy, RefreshState, cabin_hashes, month_key, refresh_path
+from storage import DB_PATH, AvailabilityStore
+from watches import AlertState, WatchRegistry, watches_path
+
+RUNS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scheduler_runs.jsonl")
+
+# The route digests' place in the store's change log
+DIGEST_CURSOR = "route_digest"
+
+class DailyTrigger:
+    """Fires at fixed HH:MM times every day"""
+
+    def __init__(self, times: List[str]):
+        self.times = sorted(tuple(int(part) for part in t.split(":")) for t in times)
+
+    def next_run(self, after: datetime) -> datetime:
+        for hour, minute in self.times:
+            candidate = after.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if candidate > after:
+                return candidate
+        hour, minute = self.times[0]
+        return (after + timedelta(days=1)).replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+    def describe(self) -> str:
+        return "daily at " + ", ".join(f"{h:02d}:{m:02d}" for h, m in self.times)
+
+class IntervalTrigger:
+    """Fires every N minutes"""
+
+    def __init__(self, minutes: float):
+        self.minutes = minutes
+
+    def next_run(self, after: datetime) -> datetime:
+        return after + timedelta(minutes=self.minutes)
+
+    def describe(self) -> str:
+        return f"every {self.minutes:g} minutes"
+
+def trigger_from_config(config: Dict[str, Any]):
+    """Daily times from schedule.daily_at, otherwise tracking.interval_minutes"""
+    daily_at = config.get("schedule", {}).get("daily_at")
+    if daily_at:
+        return DailyTrigger(daily_at)
+    return IntervalTrigger(config.get("tracking", {}).get("interval_minutes", 60))
+
+class FlightCheck:
+    """One check: sweep the months that are due, diff what changed against the store, queue alerts for delivery"""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.tracker = None
+        self.store = AvailabilityStore(config.get("storage", {}).get("path", DB_PATH))
+        self.dispatcher = NotificationDispatcher.from_config(config)
+        self.outbox = Outbox(outbox_path(config))
+        self.worker = OutboxWorker.from_config(self.outbox, self.dispatcher.channels, config)
+        self.refresh = RefreshState(refresh_path(config))
+        # Outlives browser restarts so a throttled host stays throttled
+        self.politeness = Politeness.from_config(config)
+        self.policy = RefreshPolicy.from_config(config)
+        self.watches = WatchRegistry(watches_path(config))
+        self.watches.sync_config(config)
+        # Digests start from now rather than replaying whatever the log already holds
+        if self.store.change_cursor(DIGEST_CURSOR) is None:
+            self.store.set_change_cursor(DIGEST_CURSOR, self.store.last_change_id())
+
+    async def ensure_browser(self) -> float:
+        """Start the browser once and only restart it if it died; returns seconds spent starting"""
+        if self.tracker and self.tracker.browser and self.tracker.browser.is_connected():
+            return 0.0
+        if self.config.get("workers", {}).get("enabled"):
+            # Worker processes keep their own browsers warm
+            if self.tracker is None:
+                from tasks import RemoteTracker
+
+                self.tracker = RemoteTracker.from_config(self.config)
+            return 0.0
+        from tracker import RewardSeatTracker
+
+        started = time.perf_counter()
+        if self.tracker:
+            await self.tracker.close_browser()
+        # No store on the tracker: detect_changes saves after diffing
+        self.tracker = RewardSeatTracker(
+            pool_settings=self.config.get("browser_pool", {}),
+            fetch_mode=self.config.get("scraping", {}).get("fetch_mode", "api"),
+            politeness=self.politeness,
         )
-        
-        if result.returncode == 0:
-            print("✓ Flight data extracted successfully")
-            
-            # Send iMessage with results
-            result = subprocess.run(
-                ["python", "send_imessage.py", "4129616513"],
-                capture_output=True,
-                text=True,
-                cwd="/Users/sahil/reward-seat-tracker"
-            )
-            
-            if result.returncode == 0:
-                print("✓ iMessage sent successfully")
-            else:
-                print(f"✗ iMessage failed: {result.stderr}")
-                
+        await self.tracker.start_browser()
+        return time.perf_counter() - started
+
+    async def __call__(self) -> Dict[str, Any]:
+        with trace_run("flight_check", self.config.get("metrics", {}).get("trace_dir")) as trace:
+            record = await self.check()
+        record["stage_ms"] = trace.totals()
+        return record
+
+    async def check(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        now = now or datetime.now()
+        browser_start = await self.ensure_browser()
+        states = self.refresh.states()
+        # Picks up watches added through the API or CLI since the last check
+        self.watches.refresh()
+        # One fetch per (airline, route, month), however many routes and watches want it
+        plan = plan_cycle(self.config, self.watches.list(), today=now.date())
+        due, waiting = self.policy.plan(plan.searches, states, now)
+        known_hashes = {key: state.payload_hash for key, state in states.items() if state.payload_hash}
+        orchestrator = Orchestrator.from_config(self.tracker, self.config,
+                                                known_hashes=known_hashes if self.policy.enabled else None)
+        sweep = await orchestrator.run(due)
+
+        # Months fetched this check, changed or not: watches are matched against what they now hold
+        fetched = []
+        updates = {}
+        unchanged = rows_written = 0
+        for job in sweep.jobs:
+            if not job.ok:
+                print(f"✗ {job.status} {job.search.origin}-{job.search.destination} {job.search.year}-{job.search.month:02d} "
+                      f"{job.search.airline}: {job.error}")
+                continue
+            key = month_key(job.search)
+            fetched.append(job.search)
+            if job.unchanged:
+                unchanged += 1
+                updates[key] = self.policy.observe(states.get(key), changed=False, now=now)
+                # Still an observation as far as price history is concerned
+                self.store.touch_rollups(job.search, now.isoformat())
+                continue
+
+            # Only cabins whose content moved are diffed and written
+            previous = states[key].cabin_hashes if self.policy.enabled and key in states else {}
+            hashes = cabin_hashes(job.results)
+            changed_cabins = {cabin for cabin, digest in hashes.items() if previous.get(cabin) != digest}
+            results = [result for result in job.results if result.booking_class in changed_cabins]
+            if results:
+                # Logged for the digest below along with what API scrapes and workers found
+                with span("persist", job.search.airline):
+                    detect_changes(self.store, job.search, results)
+                rows_written += len(results)
+            unchanged_cabins = [cabin for cabin in hashes if cabin not in changed_cabins]
+            if unchanged_cabins:
+                self.store.touch_rollups(job.search, now.isoformat(), unchanged_cabins)
+            state = self.policy.observe(states.get(key), changed=bool(changed_cabins), now=now)
+            state.payload_hash = job.content_hash
+            state.cabin_hashes = hashes
+            updates[key] = state
+        if self.policy.enabled:
+            self.refresh.save(updates)
+        # Readers (the API) pick the new file up on their next query
+        if rows_written or not os.path.exists(matrix_path(self.config)):
+            with span("matrix"):
+                rebuild(self.config, self.store)
+
+        # One digest per recipient covering every route that changed. Delivery
+        # happens in the outbox worker, so a slow notifier never holds up a check
+        with span("notify"):
+            changes, cursor = self.route_changes(plan)
+            watched, seen = self.match_watches(plan, fetched)
+            batch_id = sweep.started_at.isoformat()
+            queued = self.outbox.enqueue(self.dispatcher.outbox_messages(changes, batch_id)
+                                         + self.dispatcher.watch_messages(watched, batch_id))
+            # Only once the alerts are durable, so a crash in between re-sends rather than drops them
+            self.watches.remember(seen)
+            self.store.set_change_cursor(DIGEST_CURSOR, cursor)
+        if queued:
+            self.worker.wake()
         else:
-            print(f"✗ Flight extraction failed: {result.stderr}")
-            
-    except Exception as e:
-        print(f"✗ Error during flight check: {e}")
-
-def main():
-    """Schedule flight checks twice daily"""
-    print("Starting reward seat tracker scheduler...")
-    print("Scheduled checks: 9:00 AM and 8:00 PM daily")
-    print("Press Ctrl+C to stop")
-    
-    # Schedule the checks
-    schedule.every().day.at("09:00").do(run_flight_check)
-    schedule.every().day.at("20:00").do(run_flight_check)
-    
-    # Show next run times
-    print(f"\nNext runs:")
-    for job in schedule.jobs:
-        print(f"  {job.next_run}")
-    
-    # Keep the script running
-    try:
+            print("✓ No availability changes, skipping notification")
+        outbox = self.outbox.stats()
+
+        return {
+            "jobs": len(sweep.jobs),
+            "plan": plan.stats(),
+            "not_due": len(waiting),
+            "unchanged": unchanged,
+            "rows_written": rows_written,
+            "failed_jobs": sum(1 for job in sweep.jobs if not job.ok),
+            "blocked_jobs": sum(1 for job in sweep.jobs if job.blocked),
+            "empty_jobs": sum(1 for job in sweep.jobs if job.status == "empty"),
+            "hosts": self.politeness.stats(),
+            "changes": len(changes),
+            "watches": len(self.watches),
+            "watch_recipients": len(watched),
+            "queued": queued,
+            "outbox_depth": outbox["depth"],
+            "outbox_dead": outbox["dead"],
+            "outbox_oldest_pending_seconds": outbox["oldest_pending_seconds"],
+            "browser_start_seconds": round(browser_start, 3),
+            "sweep_seconds": round(sweep.duration, 3),
+        }
+
+    def route_changes(self, plan: FetchPlan) -> Tuple[List[AvailabilityChange], int]:
+        """Changes logged since the last digest on months the config routes want, and the id read up to
+
+        Read from the change log rather than this check's diffs: an API
+        /search or a worker may have seen a change first and moved the
+        stored snapshot on, and this check's diff would then find nothing.
+        """
+        cursor = self.store.change_cursor(DIGEST_CURSOR)
+        thresholds: Dict[Tuple[str, str], Thresholds] = {}
+        changes = []
         while True:
-            schedule.run_pending()
-            time.sleep(60)  # Check every minute
-            
-    except KeyboardInterrupt:
-        print("\n\nScheduler stopped by user")
+            rows = self.store.changes_since(cursor)
+            if not rows:
+                return changes, cursor
+            cursor = rows[-1]["id"]
+            for row in rows:
+                change = AvailabilityChange.from_row(row)
+                month = FlightSearch(origin=change.origin, destination=change.destination, airline=change.airline,
+                                     year=int(change.travel_date[:4]), month=int(change.travel_date[5:7]))
+                # Months fetched only for watches stay out of the config routes' digest
+                if not plan.wanted_by(month, "route"):
+                    continue
+                route = (change.origin, change.destination)
+                if route not in thresholds:
+                    thresholds[route] = route_thresholds(self.config, *route)
+                if thresholds[route].allows(change):
+                    changes.append(change)
+
+    def match_watches(self, plan: FetchPlan, searches: List[Any]) -> Tuple[Dict[str, List[Any]], AlertState]:
+        """Every watch against the current rows of the months just fetched
+
+        A new watch on seats that are already there fires on the next
+        check, as does one whose month was fetched for the first time.
+        """
+        watched: Dict[str, List[Any]] = {}
+        seen: AlertState = {}
+        for search in searches:
+            if not plan.wanted_by(search, "watch"):
+                continue
+            start, end = month_bounds(search)
+            rows = self.store.latest_snapshot(search.origin, search.destination, start, end, airline=search.airline)
+            matched, updates = self.watches.match(rows)
+            for recipient, seats in matched.items():
+                watched.setdefault(recipient, []).extend(seats)
+            seen.update(updates)
+        return watched, seen
+
+    async def close(self):
+        if self.tracker:
+            await self.tracker.close_browser()
+        await self.dispatcher.close()
+        self.outbox.close()
+        self.refresh.close()
+        self.watches.close()
+        self.store.close()
+
+class AsyncScheduler:
+    def __init__(self, trigger, job, jitter_seconds: float = 0, runs_path: Optional[str] = RUNS_PATH):
+        self.trigger = trigger
+        self.job = job
+        self.jitter_seconds = jitter_seconds
+        self.runs_path = runs_path
+        self.durations: List[float] = []
+        self._running = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> Optional[Dict[str, Any]]:
+        """Run the job unless the previous run is still going"""
+        if self._running.locked():
+            print("Previous check still running, skipping this one")
+            return None
+
+        async with self._running:
+            print(f"\n=== Running flight check at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===")
+            started = time.perf_counter()
+            record: Dict[str, Any] = {"started_at": datetime.now().isoformat()}
+            try:
+                record.update(await self.job())
+            except Exception as e:
+                record["error"] = f"{type(e).__name__}: {e}"
+                print(f"✗ Error during flight check: {e}")
+            record["duration_seconds"] = round(time.perf_counter() - started, 3)
+            self.durations.append(record["duration_seconds"])
+            self._record(record)
+            print(f"Check took {record['duration_seconds']:.1f}s "
+                  f"(mean {sum(self.durations) / len(self.durations):.1f}s over {len(self.durations)} runs)")
+            return record
+
+    async def run_forever(self):
+        while True:
+            next_run = self.trigger.next_run(datetime.now())
+            next_run += timedelta(seconds=random.uniform(0, self.jitter_seconds))
+            print(f"Next run: {next_run.strftime('%Y-%m-%d %H:%M:%S')}")
+            await asyncio.sleep(max(0.0, (next_run - datetime.now()).total_seconds()))
+            # Not awaited so a long run never delays the next trigger; run_once skips overlaps
+            self._task = asyncio.create_task(self.run_once())
+
+    def _record(self, record: Dict[str, Any]):
+        if not self.runs_path:
+            return
+        with open(self.runs_path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+async def main(once: bool = False):
+    config = load_config()
+    trigger = trigger_from_config(config)
+    check = FlightCheck(config)
+    scheduler = AsyncScheduler(trigger, check, config.get("schedule", {}).get("jitter_seconds", 0))
+
+    try:
+        if once:
+            await scheduler.run_once()
+            print(f"Outbox: {await check.worker.drain()}")
+            return
+        print("Starting reward seat tracker scheduler...")
+        print(f"Scheduled checks: {trigger.describe()}")
+        print("Press Ctrl+C to stop")
+        delivery = asyncio.create_task(check.worker.run_forever())
+        try:
+            await scheduler.run_forever()
+        finally:
+            delivery.cancel()
+    finally:
+        await check.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run reward seat checks on a schedule")
+    parser.add_argument("--once", action="store_true", help="run a single check now and exit")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main(once=args.once))
+    except KeyboardInterrupt:
+        print("\n\nScheduler stopped by user")
@@ -58,14 +58,9 @@ Generated by Reward Seat Tracker
         return False
 
 if __name__ == "__main__":
-    # Read extracted results
-    try:
-        with open("extracted_points.txt", "r") as f:
-            results = f.read().strip()
-        
-        # Replace with your email
-        recipient = input("Enter recipient email: ")
-        send_results_email(results, recipient)
-        
-    except FileNotFoundError:
-        print("No results file found. Run extract_points.py first.")
\ No newline at end of file
+    # Kept for old habits: python send_email.py --to me@example.com
+    import sys
+
+    from cli import main
+
+    sys.exit(main(["notify", "--channel", "email", *sys.argv[1:]]))
@@ -1,18 +1,21 @@
 import subprocess
 import sys
 
+# The number and text arrive as arguments, never spliced into the script source
+IMESSAGE_SCRIPT = '''
+on run argv
+    tell application "Messages"
+        set targetService to 1st service whose service type = iMessage
+        set targetBuddy to buddy (item 1 of argv) of targetService
+        send (item 2 of argv) to targetBuddy
+    end tell
+end run
+'''
+
 def send_via_imessage(phone_number, message):
     """Send SMS via iMessage (macOS only) - completely free"""
     try:
-        script = f'''
-        tell application "Messages"
-            set targetService to 1st service whose service type = iMessage
-            set targetBuddy to buddy "{phone_number}" of targetService
-            send "{message}" to targetBuddy
-        end tell
-        '''
-        
-        subprocess.run(["osascript", "-e", script], check=True)
+        subprocess.run(["osascript", "-e", IMESSAGE_SCRIPT, str(phone_number), message], check=True)
         print(f"iMessage sent to {phone_number}")
         return True
         
@@ -21,21 +24,8 @@ def send_via_imessage(phone_number, message):
         return False
 
 if __name__ == "__main__":
-    # Read results
-    try:
-        with open("extracted_points.txt", "r") as f:
-            results = f.read().strip()
-        
-        # Get phone number from command line or prompt
-        if len(sys.argv) > 1:
-            phone = sys.argv[1]
-        else:
-            phone = input("Enter your phone number or email: ")
-        
-        message = f"Virgin Atlantic LHR→BLR: {results}"
-        send_via_imessage(phone, message)
-        
-    except FileNotFoundError:
-        print("No results found. Run extract_points.py first.")
-    except KeyboardInterrupt:
-        print("\nCancelled")
\ No newline at end of file
+    # Kept for old habits: python send_imessage.py +14129616513
+    from cli import main
+
+    recipients = [arg for arg in sys.argv[1:] if not arg.startswith("-")]
+    sys.exit(main(["notify", "--channel", "imessage", *(f"--to={phone}" for phone in recipients)]))
@@ -38,60 +38,16 @@ def send_sms_twilio(results_text, phone_number):
         print(f"Error sending SMS: {e}")
         return False
 
-def send_sms_simple(results_text, phone_number):
-    """Simple SMS using system mail command (macOS/Linux)"""
-    try:
-        import subprocess
-        
-        # Format message
-        message = f"Virgin Atlantic: {results_text}"
-        
-        # Use carrier email-to-SMS gateway
-        carriers = {
-            "verizon": "vtext.com",
-            "att": "txt.att.net", 
-            "tmobile": "tmomail.net",
-            "sprint": "messaging.sprintpcs.com"
-        }
-        
-        print("Available carriers:")
-        for i, carrier in enumerate(carriers.keys(), 1):
-            print(f"{i}. {carrier}")
-        
-        choice = input("Select carrier (1-4): ")
-        carrier_names = list(carriers.keys())
-        
-        if choice.isdigit() and 1 <= int(choice) <= len(carrier_names):
-            carrier = carrier_names[int(choice)-1]
-            email_address = f"{phone_number}@{carriers[carrier]}"
-            
-            # Send via system mail
-            subprocess.run([
-                "mail", "-s", "Flight Alert", email_address
-            ], input=message, text=True)
-            
-            print(f"SMS sent to {phone_number} via {carrier}")
-            return True
-        else:
-            print("Invalid carrier selection")
-            return False
-            
-    except Exception as e:
-        print(f"Error sending SMS: {e}")
-        return False
+def send_sms_simple(results_text, phone_number, carrier):
+    """Simple SMS through the carrier's email gateway (macOS/Linux mail command)"""
+    from send_free_sms import send_via_carrier_gateway
+
+    return send_via_carrier_gateway(phone_number, f"Virgin Atlantic: {results_text}", carrier)
 
 if __name__ == "__main__":
-    # Read extracted results
-    try:
-        with open("extracted_points.txt", "r") as f:
-            results = f.read().strip()
-        
-        phone = input("Enter phone number (10 digits): ")
-        
-        # Try Twilio first, fallback to simple method
-        if not send_sms_twilio(results, f"+1{phone}"):
-            print("\nTrying alternative SMS method...")
-            send_sms_simple(results, phone)
-        
-    except FileNotFoundError:
-        print("No results file found. Run extract_points.py first.")
\ No newline at end of file
+    # Kept for old habits: python send_sms.py --to +15551234567
+    import sys
+
+    from cli import main
+
+    sys.exit(main(["notify", "--channel", "sms", *sys.argv[1:]]))
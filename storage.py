@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+SQLite store for every scraped availability observation
+"""
+
+import os
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from models import FlightResult, FlightSearch
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(BASE_DIR, "availability.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS observations (
+    id INTEGER PRIMARY KEY,
+    airline TEXT NOT NULL,
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    travel_date TEXT NOT NULL,
+    cabin TEXT NOT NULL,
+    points INTEGER,
+    available INTEGER NOT NULL,
+    observed_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_observations_route_date
+    ON observations (origin, destination, travel_date, cabin, observed_at);
+
+-- One row per route/date/cabin, upserted on every write so the latest
+-- snapshot never has to be found by scanning history
+CREATE TABLE IF NOT EXISTS latest_observations (
+    airline TEXT NOT NULL,
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    travel_date TEXT NOT NULL,
+    cabin TEXT NOT NULL,
+    points INTEGER,
+    available INTEGER NOT NULL,
+    observed_at TEXT NOT NULL,
+    PRIMARY KEY (origin, destination, travel_date, cabin, airline)
+) WITHOUT ROWID;
+
+-- Price history rollups, maintained row by row as observations are written so
+-- history and trend queries never aggregate the raw table. Points are those
+-- of observations with seats; first/last_available_at bound when seats were seen
+CREATE TABLE IF NOT EXISTS price_rollups (
+    airline TEXT NOT NULL,
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    travel_date TEXT NOT NULL,
+    cabin TEXT NOT NULL,
+    observations INTEGER NOT NULL,
+    min_points INTEGER,
+    max_points INTEGER,
+    last_points INTEGER,
+    first_observed_at TEXT NOT NULL,
+    last_observed_at TEXT NOT NULL,
+    first_available_at TEXT,
+    last_available_at TEXT,
+    PRIMARY KEY (origin, destination, travel_date, cabin, airline)
+) WITHOUT ROWID;
+
+-- The same per calendar day the observations were made on, for trends
+CREATE TABLE IF NOT EXISTS daily_rollups (
+    airline TEXT NOT NULL,
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    travel_date TEXT NOT NULL,
+    cabin TEXT NOT NULL,
+    observed_on TEXT NOT NULL,
+    observations INTEGER NOT NULL,
+    available_observations INTEGER NOT NULL,
+    min_points INTEGER,
+    max_points INTEGER,
+    last_points INTEGER,
+    last_observed_at TEXT NOT NULL,
+    PRIMARY KEY (origin, destination, cabin, observed_on, travel_date, airline)
+) WITHOUT ROWID;
+
+-- Every availability change any process detected, in order; the API tails it
+-- to push live events, and clients resume from an id after reconnecting
+CREATE TABLE IF NOT EXISTS change_events (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    airline TEXT NOT NULL,
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    travel_date TEXT NOT NULL,
+    cabin TEXT NOT NULL,
+    old_points INTEGER,
+    new_points INTEGER,
+    observed_at TEXT NOT NULL
+);
+
+-- How far each consumer of the change log (e.g. the scheduler's digests) has read
+CREATE TABLE IF NOT EXISTS change_cursors (
+    name TEXT PRIMARY KEY,
+    change_id INTEGER NOT NULL
+);
+"""
+
+INSERT_OBSERVATION = """
+INSERT INTO observations (airline, origin, destination, travel_date, cabin, points, available, observed_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+UPSERT_LATEST = """
+INSERT INTO latest_observations (airline, origin, destination, travel_date, cabin, points, available, observed_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (origin, destination, travel_date, cabin, airline) DO UPDATE SET
+    points = excluded.points,
+    available = excluded.available,
+    observed_at = excluded.observed_at
+WHERE excluded.observed_at >= latest_observations.observed_at
+"""
+
+# SQLite's two-argument MIN/MAX return NULL if either side is NULL, hence the COALESCEs
+UPSERT_ROLLUP = """
+INSERT INTO price_rollups (airline, origin, destination, travel_date, cabin, observations, min_points, max_points,
+                           last_points, first_observed_at, last_observed_at, first_available_at, last_available_at)
+VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (origin, destination, travel_date, cabin, airline) DO UPDATE SET
+    observations = observations + 1,
+    min_points = COALESCE(MIN(min_points, excluded.min_points), min_points, excluded.min_points),
+    max_points = COALESCE(MAX(max_points, excluded.max_points), max_points, excluded.max_points),
+    last_points = CASE WHEN excluded.last_observed_at >= last_observed_at THEN excluded.last_points
+                       ELSE last_points END,
+    first_observed_at = MIN(first_observed_at, excluded.first_observed_at),
+    last_observed_at = MAX(last_observed_at, excluded.last_observed_at),
+    first_available_at = COALESCE(MIN(first_available_at, excluded.first_available_at),
+                                  first_available_at, excluded.first_available_at),
+    last_available_at = COALESCE(MAX(last_available_at, excluded.last_available_at),
+                                 last_available_at, excluded.last_available_at)
+"""
+
+UPSERT_DAILY = """
+INSERT INTO daily_rollups (airline, origin, destination, travel_date, cabin, observed_on, observations,
+                           available_observations, min_points, max_points, last_points, last_observed_at)
+VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?, ?, ?, ?)
+ON CONFLICT (origin, destination, cabin, observed_on, travel_date, airline) DO UPDATE SET
+    observations = observations + 1,
+    available_observations = available_observations + excluded.available_observations,
+    min_points = COALESCE(MIN(min_points, excluded.min_points), min_points, excluded.min_points),
+    max_points = COALESCE(MAX(max_points, excluded.max_points), max_points, excluded.max_points),
+    last_points = CASE WHEN excluded.last_observed_at >= last_observed_at THEN excluded.last_points
+                       ELSE last_points END,
+    last_observed_at = MAX(last_observed_at, excluded.last_observed_at)
+"""
+
+INSERT_CHANGE = """
+INSERT INTO change_events (kind, airline, origin, destination, travel_date, cabin, old_points, new_points, observed_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Change events kept for replay; older ones are pruned as new ones arrive
+CHANGE_LOG_ROWS = 100000
+
+def rollup_params(rows: List[tuple]) -> Tuple[List[tuple], List[tuple]]:
+    """UPSERT_ROLLUP and UPSERT_DAILY parameters for observation rows"""
+    rollups, daily = [], []
+    for airline, origin, destination, travel_date, cabin, points, available, observed_at in rows:
+        seats = points if available else None
+        seen = observed_at if available else None
+        rollups.append((airline, origin, destination, travel_date, cabin, seats, seats, seats,
+                        observed_at, observed_at, seen, seen))
+        daily.append((airline, origin, destination, travel_date, cabin, observed_at[:10], int(bool(available)),
+                      seats, seats, seats, observed_at))
+    return rollups, daily
+
+class AvailabilityStore:
+    def __init__(self, path: str = DB_PATH):
+        # Relative paths in config.json are relative to the project, not the cwd
+        if path != ":memory:" and not os.path.isabs(path):
+            path = os.path.join(BASE_DIR, path)
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        # Databases from before the rollups existed get them built once from history
+        if (self.conn.execute("SELECT 1 FROM price_rollups LIMIT 1").fetchone() is None
+                and self.conn.execute("SELECT 1 FROM observations LIMIT 1").fetchone() is not None):
+            self.rebuild_rollups()
+
+    def close(self):
+        self.conn.close()
+
+    def save_results(self, search: FlightSearch, results: List[FlightResult]) -> int:
+        """Write one scrape's results in a single transaction"""
+        rows = [
+            (
+                search.airline,
+                search.origin,
+                search.destination,
+                result.date,
+                result.booking_class,
+                result.points,
+                int(result.availability),
+                result.timestamp.isoformat(),
+            )
+            for result in results
+        ]
+        return self.save_rows(rows)
+
+    def save_rows(self, rows: List[tuple]) -> int:
+        """Batched insert of (airline, origin, destination, travel_date, cabin, points, available, observed_at)"""
+        if not rows:
+            return 0
+        rollups, daily = rollup_params(rows)
+        with self.conn:
+            self.conn.executemany(INSERT_OBSERVATION, rows)
+            self.conn.executemany(UPSERT_LATEST, rows)
+            self.conn.executemany(UPSERT_ROLLUP, rollups)
+            self.conn.executemany(UPSERT_DAILY, daily)
+        return len(rows)
+
+    def rebuild_rollups(self, batch_size: int = 10000) -> int:
+        """Recompute the rollups from every stored observation through the same upserts as save_rows"""
+        cursor = self.conn.execute("""
+            SELECT airline, origin, destination, travel_date, cabin, points, available, observed_at
+            FROM observations ORDER BY id
+        """)
+        replayed = 0
+        with self.conn:
+            self.conn.execute("DELETE FROM price_rollups")
+            self.conn.execute("DELETE FROM daily_rollups")
+            while True:
+                rows = [tuple(row) for row in cursor.fetchmany(batch_size)]
+                if not rows:
+                    break
+                rollups, daily = rollup_params(rows)
+                self.conn.executemany(UPSERT_ROLLUP, rollups)
+                self.conn.executemany(UPSERT_DAILY, daily)
+                replayed += len(rows)
+        return replayed
+
+    def touch_rollups(self, search: FlightSearch, observed_at: str, cabins: Optional[List[str]] = None) -> int:
+        """Count a fetch that found the month (or these cabins) unchanged
+
+        Nothing new goes into observations, but the rollups see the stored
+        latest rows observed again at observed_at, so counts, last-seen
+        times and the daily trend keep moving between changes.
+        """
+        start, end = f"{search.year}-{search.month:02d}-01", f"{search.year}-{search.month:02d}-31"
+        rows = [
+            (row["airline"], row["origin"], row["destination"], row["travel_date"], row["cabin"], row["points"],
+             row["available"], observed_at)
+            for row in self.latest_snapshot(search.origin, search.destination, start, end, airline=search.airline)
+            if cabins is None or row["cabin"] in cabins
+        ]
+        if not rows:
+            return 0
+        rollups, daily = rollup_params(rows)
+        with self.conn:
+            self.conn.executemany(UPSERT_ROLLUP, rollups)
+            self.conn.executemany(UPSERT_DAILY, daily)
+        return len(rows)
+
+    def record_changes(self, changes: List[Any], observed_at: Optional[str] = None) -> int:
+        """Append AvailabilityChanges to the change log"""
+        if not changes:
+            return 0
+        observed_at = observed_at or datetime.now().isoformat()
+        rows = [
+            (change.kind.value, change.airline, change.origin, change.destination, change.travel_date, change.cabin,
+             change.old_points, change.new_points, observed_at)
+            for change in changes
+        ]
+        with self.conn:
+            self.conn.executemany(INSERT_CHANGE, rows)
+            self.conn.execute("DELETE FROM change_events WHERE id <= (SELECT MAX(id) FROM change_events) - ?",
+                              (CHANGE_LOG_ROWS,))
+        return len(rows)
+
+    def changes_since(self, after_id: int, until_id: Optional[int] = None, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Logged changes with after_id < id <= until_id, oldest first"""
+        query = "SELECT * FROM change_events WHERE id > ?"
+        params: List[Any] = [after_id]
+        if until_id is not None:
+            query += " AND id <= ?"
+            params.append(until_id)
+        query += " ORDER BY id LIMIT ?"
+        params.append(limit)
+        return [dict(row) for row in self.conn.execute(query, params)]
+
+    def last_change_id(self) -> int:
+        return self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM change_events").fetchone()[0]
+
+    def change_cursor(self, name: str) -> Optional[int]:
+        row = self.conn.execute("SELECT change_id FROM change_cursors WHERE name = ?", (name,)).fetchone()
+        return row["change_id"] if row else None
+
+    def set_change_cursor(self, name: str, change_id: int):
+        with self.conn:
+            self.conn.execute("INSERT INTO change_cursors (name, change_id) VALUES (?, ?) "
+                              "ON CONFLICT (name) DO UPDATE SET change_id = excluded.change_id", (name, change_id))
+
+    def latest_snapshot(self, origin: str, destination: str, start_date: str, end_date: str,
+                        cabin: Optional[str] = None, airline: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Most recent observation per travel date and cabin between two ISO dates"""
+        query = """
+            SELECT airline, origin, destination, travel_date, cabin, points, available, observed_at
+            FROM latest_observations
+            WHERE origin = ? AND destination = ? AND travel_date BETWEEN ? AND ?
+        """
+        params: List[Any] = [origin, destination, start_date, end_date]
+        if cabin:
+            query += " AND cabin = ?"
+            params.append(cabin)
+        if airline:
+            query += " AND airline = ?"
+            params.append(airline)
+        query += " ORDER BY travel_date, cabin"
+        return [dict(row) for row in self.conn.execute(query, params)]
+
+    def iter_latest(self) -> Iterator[Dict[str, Any]]:
+        """Every route's latest observation per travel date and cabin"""
+        query = """
+            SELECT airline, origin, destination, travel_date, cabin, points, available
+            FROM latest_observations
+        """
+        for row in self.conn.execute(query):
+            yield dict(row)
+
+    def history(self, origin: str, destination: str, travel_date: str,
+                cabin: Optional[str] = None, airline: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Every observation for one travel date, oldest first"""
+        query = """
+            SELECT airline, cabin, points, available, observed_at
+            FROM observations
+            WHERE origin = ? AND destination = ? AND travel_date = ?
+        """
+        params: List[Any] = [origin, destination, travel_date]
+        if cabin:
+            query += " AND cabin = ?"
+            params.append(cabin)
+        if airline:
+            query += " AND airline = ?"
+            params.append(airline)
+        query += " ORDER BY cabin, observed_at"
+        return [dict(row) for row in self.conn.execute(query, params)]
+
+    def price_history(self, origin: str, destination: str, start_date: str, end_date: str,
+                      cabin: Optional[str] = None, airline: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Rollup per travel date and cabin between two ISO dates: points range, last price, when seats were seen"""
+        query = """
+            SELECT airline, travel_date, cabin, observations, min_points, max_points, last_points,
+                   first_observed_at, last_observed_at, first_available_at, last_available_at
+            FROM price_rollups
+            WHERE origin = ? AND destination = ? AND travel_date BETWEEN ? AND ?
+        """
+        params: List[Any] = [origin, destination, start_date, end_date]
+        if cabin:
+            query += " AND cabin = ?"
+            params.append(cabin)
+        if airline:
+            query += " AND airline = ?"
+            params.append(airline)
+        query += " ORDER BY travel_date, cabin"
+        return [dict(row) for row in self.conn.execute(query, params)]
+
+    def price_trend(self, origin: str, destination: str, cabin: str, start_date: str, end_date: str,
+                    since: Optional[str] = None, airline: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Per observation day: cheapest and dearest seats across the travel dates, and how many had seats"""
+        query = """
+            SELECT observed_on,
+                   MIN(min_points) AS min_points,
+                   MAX(max_points) AS max_points,
+                   SUM(observations) AS observations,
+                   SUM(available_observations) AS available_observations,
+                   COUNT(DISTINCT CASE WHEN available_observations > 0 THEN travel_date END) AS dates_with_seats
+            FROM daily_rollups
+            WHERE origin = ? AND destination = ? AND cabin = ? AND observed_on >= ?
+              AND travel_date BETWEEN ? AND ?
+        """
+        params: List[Any] = [origin, destination, cabin, since or "", start_date, end_date]
+        if airline:
+            query += " AND airline = ?"
+            params.append(airline)
+        query += " GROUP BY observed_on ORDER BY observed_on"
+        return [dict(row) for row in self.conn.execute(query, params)]
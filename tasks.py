@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Celery worker pool: each worker process keeps a warm browser and scrapes (route, month, airline) jobs
+
+Each airline has its own queue, owned by exactly one single-process worker so the
+host's pace and circuit breaker live in one place:
+
+    celery -A tasks worker --concurrency 1 --queues scrape.virgin_atlantic -n virgin_atlantic@%h
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from celery import Celery
+from celery.result import AsyncResult, GroupResult
+from celery.signals import worker_process_shutdown
+from celery.utils import uuid
+
+from browser_pool import PoolExhausted
+from change_detection import detect_changes
+from config import load_config
+from models import FlightResult, FlightSearch, UnsupportedAirline
+from politeness import Blocked, CircuitOpen
+from refresh import MonthFetch
+
+logger = logging.getLogger(__name__)
+
+def celery_settings(config: Dict[str, Any]) -> Dict[str, Any]:
+    workers = config.get("workers", {})
+    settings = {
+        "broker_url": workers.get("broker_url", "redis://localhost:6379/0"),
+        "result_backend": workers.get("result_backend", "redis://localhost:6379/1"),
+        "task_serializer": "json",
+        "result_serializer": "json",
+        "accept_content": ["json"],
+        # A job whose worker dies mid-scrape goes back on the queue
+        "task_acks_late": True,
+        "task_reject_on_worker_lost": True,
+        # One job at a time per browser; a long scrape never holds others hostage
+        "worker_prefetch_multiplier": 1,
+        "result_expires": workers.get("result_expires_seconds", 3600),
+        "task_default_queue": workers.get("queue", "scrape"),
+    }
+    # Redis-free local runs: kombu's filesystem transport plus the file result backend
+    if settings["broker_url"].startswith("filesystem://"):
+        folder = workers.get("broker_folder") or os.path.join(os.path.dirname(os.path.abspath(__file__)), ".celery")
+        for sub in ("queue", "processed", "control"):
+            os.makedirs(os.path.join(folder, sub), exist_ok=True)
+        settings["broker_transport_options"] = {
+            "data_folder_in": os.path.join(folder, "queue"),
+            "data_folder_out": os.path.join(folder, "queue"),
+            "processed_folder": os.path.join(folder, "processed"),
+            "control_folder": os.path.join(folder, "control"),
+            "polling_interval": 0.05,
+        }
+    return settings
+
+celery_app = Celery("reward_seat_tracker")
+celery_app.conf.update(celery_settings(load_config()))
+
+def airline_queue(airline: str) -> str:
+    """The queue an airline's jobs go to
+
+    Politeness (token bucket and circuit breaker) is per process, so two
+    processes scraping one host would each pace themselves at the full
+    rate. Pinning an airline to one queue consumed by one --concurrency 1
+    worker keeps a single pace per host however many workers there are.
+    """
+    return f"{celery_app.conf.task_default_queue}.{airline}"
+
+def default_tracker():
+    """The tracker each worker process runs: a single-page pool, results returned rather than stored"""
+    from tracker import RewardSeatTracker
+    from politeness import Politeness
+
+    config = load_config()
+    return RewardSeatTracker(
+        pool_settings={**config.get("browser_pool", {}), "size": 1},
+        fetch_mode=config.get("scraping", {}).get("fetch_mode", "api"),
+        browser_profile=config.get("browser", {}).get("profile"),
+        politeness=Politeness.from_config(config),
+    )
+
+# Swapped out by benchmarks to run workers without Chromium
+tracker_factory: Callable[[], Any] = default_tracker
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_tracker = None
+
+def worker_tracker():
+    """This process's tracker, started on its first job and kept warm for the rest"""
+    global _loop, _tracker
+    if _tracker is None:
+        _loop = asyncio.new_event_loop()
+        tracker = tracker_factory()
+        _loop.run_until_complete(tracker.start_browser())
+        _tracker = tracker
+    return _tracker
+
+@worker_process_shutdown.connect
+def close_worker_tracker(**kwargs):
+    if _tracker is not None:
+        _loop.run_until_complete(_tracker.close_browser())
+        _loop.close()
+
+def encode_error(error: Exception) -> Dict[str, Any]:
+    return {
+        "type": type(error).__name__,
+        "message": str(error),
+        "status": getattr(error, "status", None),
+        "retry_after": getattr(error, "retry_after", None),
+        "host": getattr(error, "host", None),
+        "retry_in": getattr(error, "retry_in", None),
+    }
+
+def decode_error(error: Dict[str, Any]) -> Exception:
+    """Rebuild the exceptions callers tell apart; anything else becomes a RuntimeError"""
+    if error["type"] == "Blocked":
+        return Blocked(error["message"], error["status"], error["retry_after"])
+    if error["type"] == "CircuitOpen":
+        return CircuitOpen(error["host"], error["retry_in"])
+    if error["type"] == "PoolExhausted":
+        return PoolExhausted(error["message"])
+    if error["type"] == "UnsupportedAirline":
+        return UnsupportedAirline(error["message"])
+    return RuntimeError(f"{error['type']}: {error['message']}")
+
+@celery_app.task(name="reward_seat_tracker.fetch_month")
+def fetch_month(search: Dict[str, Any], known_hash: Optional[str] = None) -> Dict[str, Any]:
+    """Scrape one month; errors come back as data so Blocked stays distinguishable from a crash"""
+    tracker = worker_tracker()
+    try:
+        fetched = _loop.run_until_complete(tracker.fetch_month(FlightSearch(**search), known_hash))
+    except Exception as e:
+        logger.warning(f"{search['airline']} {search['origin']}-{search['destination']} "
+                       f"{search['year']}-{search['month']:02d} failed: {e}")
+        status = "blocked" if isinstance(e, (Blocked, CircuitOpen)) else "error"
+        return {"search": search, "status": status, "error": encode_error(e)}
+    results = None if fetched.unchanged else [result.model_dump(mode="json") for result in fetched.results]
+    return {
+        "search": search,
+        "status": "ok" if fetched.unchanged or fetched.results else "empty",
+        "results": results,
+        "content_hash": fetched.content_hash,
+        "worker": os.getpid(),
+    }
+
+def decode_fetch(payload: Dict[str, Any]) -> MonthFetch:
+    """A fetch_month task result as a MonthFetch, raising the error it carried"""
+    if payload.get("error"):
+        raise decode_error(payload["error"])
+    results = payload["results"]
+    return MonthFetch(
+        results=None if results is None else [FlightResult(**result) for result in results],
+        content_hash=payload["content_hash"],
+    )
+
+class RemoteTracker:
+    """Stands in for RewardSeatTracker, running every fetch on a Celery worker
+
+    The orchestrator, /search, /search/range and the scheduler use it
+    unchanged; throughput scales with the airlines being scraped, one worker each.
+    """
+
+    def __init__(self, store=None, timeout_seconds: float = 120, poll_seconds: float = 0.05,
+                 max_poll_seconds: float = 0.5):
+        self.store = store
+        self.timeout_seconds = timeout_seconds
+        self.poll_seconds = poll_seconds
+        self.max_poll_seconds = max_poll_seconds
+        self.browser = None
+        self.pool = None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], store=None) -> "RemoteTracker":
+        workers = config.get("workers", {})
+        return cls(store=store, timeout_seconds=workers.get("timeout_seconds", 120),
+                   poll_seconds=workers.get("poll_seconds", 0.05))
+
+    async def start_browser(self):
+        pass
+
+    async def close_browser(self):
+        if self.store:
+            self.store.close()
+
+    async def wait(self, result: AsyncResult) -> Dict[str, Any]:
+        """Poll the result backend with backoff instead of holding a thread for the whole job
+
+        Each poll is a backend round trip, so it runs in a thread rather
+        than on the event loop.
+        """
+        deadline = time.monotonic() + self.timeout_seconds
+        delay = self.poll_seconds
+        while not await asyncio.to_thread(result.ready):
+            if time.monotonic() > deadline:
+                await asyncio.to_thread(result.revoke)
+                raise asyncio.TimeoutError(f"No worker finished task {result.id} in {self.timeout_seconds:g}s")
+            await asyncio.sleep(delay)
+            delay = min(self.max_poll_seconds, delay * 1.5)
+        return await asyncio.to_thread(result.get, propagate=True)
+
+    async def fetch_month(self, search: FlightSearch, known_hash: Optional[str] = None) -> MonthFetch:
+        result = await asyncio.to_thread(fetch_month.apply_async, args=[search.model_dump(), known_hash],
+                                         queue=airline_queue(search.airline))
+        fetched = decode_fetch(await self.wait(result))
+        if self.store and fetched.results:
+            detect_changes(self.store, search, fetched.results)
+        return fetched
+
+    async def fetch(self, search: FlightSearch) -> List[FlightResult]:
+        return (await self.fetch_month(search)).results
+
+def submit(searches: List[FlightSearch]) -> GroupResult:
+    """Queue one task per search as a saved group that can be polled by id"""
+    group = GroupResult(uuid(), results=[fetch_month.apply_async(args=[search.model_dump()],
+                                                                 queue=airline_queue(search.airline))
+                                         for search in searches], app=celery_app)
+    group.save()
+    return group
+
+def job_status(job_id: str) -> Optional[Dict[str, Any]]:
+    """Progress and finished months of a submitted group, or None if the id is unknown"""
+    group = GroupResult.restore(job_id, app=celery_app)
+    if group is None:
+        return None
+    months = []
+    for result in group.results:
+        if not result.ready():
+            continue
+        if result.failed():
+            months.append({"status": "error", "error": {"type": "TaskFailed", "message": str(result.result)}})
+        else:
+            months.append(result.result)
+    return {"job_id": job_id, "total": len(group.results), "completed": len(months),
+            "done": len(months) == len(group.results), "months": months}
@@ -0,0 +1,27 @@
+"""
+Parsing availability API payloads into day -> cabin -> points
+"""
+
+import pytest
+
+from availability_api import parse_availability_json
+
+def payload(*fares) -> dict:
+    return {"data": {"days": [{"date": "2025-10-19", "cabins": list(fares)}]}}
+
+@pytest.mark.parametrize("points", [47500, 47500.0, "47500", "47,500", " 47,500 ", "47.5k"])
+def test_points_in_any_format(points):
+    assert parse_availability_json(payload({"cabinClass": "Upper Class", "points": points})) == {
+        19: {"upper_class": 47500}}
+
+def test_unavailable_and_unknown_cabins():
+    calendar = parse_availability_json(payload(
+        {"cabinClass": "Economy", "points": "10,000", "available": False},
+        {"cabinClass": "Premium", "miles": None},
+        {"cabinClass": "Lounge", "points": 1},
+    ))
+    assert calendar == {19: {"economy": None, "premium": None}}
+
+def test_payload_without_days():
+    with pytest.raises(ValueError):
+        parse_availability_json({"data": {}})
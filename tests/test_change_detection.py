@@ -0,0 +1,124 @@
+"""
+diff_snapshots, Thresholds and detect_changes against synthetic snapshots
+"""
+
+from datetime import datetime
+
+import pytest
+
+from change_detection import AvailabilityChange, ChangeType, Thresholds, detect_changes, diff_snapshots
+from models import FlightResult, FlightSearch
+from storage import AvailabilityStore
+
+SEARCH = FlightSearch(origin="LHR", destination="BLR", month=10, year=2025)
+
+def result(day: int, cabin: str, points):
+    return FlightResult(date=f"2025-10-{day:02d}", availability=points is not None, price="", booking_class=cabin,
+                        timestamp=datetime(2025, 9, 1, 9, 0), points=points)
+
+def change(kind: ChangeType, old=None, new=None, cabin: str = "upper_class") -> AvailabilityChange:
+    return AvailabilityChange(kind=kind, airline="virgin_atlantic", origin="LHR", destination="BLR",
+                              travel_date="2025-10-19", cabin=cabin, old_points=old, new_points=new)
+
+@pytest.fixture
+def store():
+    store = AvailabilityStore(":memory:")
+    yield store
+    store.close()
+
+def test_first_scrape_is_a_baseline():
+    assert diff_snapshots(SEARCH, {}, {("2025-10-19", "upper_class"): 50000}) == []
+
+def test_each_kind_of_change():
+    old = {
+        ("2025-10-19", "upper_class"): None,
+        ("2025-10-20", "upper_class"): 50000,
+        ("2025-10-21", "upper_class"): 50000,
+        ("2025-10-22", "upper_class"): 50000,
+        ("2025-10-23", "upper_class"): 50000,
+    }
+    new = {
+        ("2025-10-19", "upper_class"): 47500,
+        ("2025-10-20", "upper_class"): None,
+        ("2025-10-21", "upper_class"): 40000,
+        ("2025-10-22", "upper_class"): 60000,
+        ("2025-10-23", "upper_class"): 50000,
+        # Not in the previous snapshot at all
+        ("2025-10-24", "economy"): 10000,
+    }
+    changes = diff_snapshots(SEARCH, old, new, Thresholds(notify_points_rose=True))
+    assert [(c.travel_date, c.kind, c.old_points, c.new_points) for c in changes] == [
+        ("2025-10-19", ChangeType.SEAT_APPEARED, None, 47500),
+        ("2025-10-20", ChangeType.SEAT_DISAPPEARED, 50000, None),
+        ("2025-10-21", ChangeType.POINTS_DROPPED, 50000, 40000),
+        ("2025-10-22", ChangeType.POINTS_ROSE, 50000, 60000),
+        ("2025-10-24", ChangeType.SEAT_APPEARED, None, 10000),
+    ]
+    assert all(c.origin == "LHR" and c.destination == "BLR" and c.airline == SEARCH.airline for c in changes)
+
+def test_rises_are_left_out_by_default():
+    old = {("2025-10-19", "upper_class"): 50000}
+    assert diff_snapshots(SEARCH, old, {("2025-10-19", "upper_class"): 60000}) == []
+
+def test_missing_dates_are_not_scraped_rather_than_gone():
+    old = {("2025-10-19", "upper_class"): 50000, ("2025-10-20", "upper_class"): 50000}
+    assert diff_snapshots(SEARCH, old, {("2025-10-19", "upper_class"): 50000}) == []
+
+def test_new_date_without_seats_is_not_a_change():
+    old = {("2025-10-19", "upper_class"): 50000}
+    assert diff_snapshots(SEARCH, old, {**old, ("2025-10-20", "upper_class"): None}) == []
+
+def test_thresholds_filter_cabins():
+    thresholds = Thresholds(cabins=["upper_class"])
+    assert thresholds.allows(change(ChangeType.SEAT_APPEARED, new=50000))
+    assert not thresholds.allows(change(ChangeType.SEAT_APPEARED, new=10000, cabin="economy"))
+
+def test_thresholds_ignore_rises_unless_asked():
+    rose = change(ChangeType.POINTS_ROSE, old=40000, new=50000)
+    assert not Thresholds().allows(rose)
+    assert Thresholds(notify_points_rose=True).allows(rose)
+
+def test_thresholds_min_points_change():
+    thresholds = Thresholds(min_points_change=5000)
+    assert not thresholds.allows(change(ChangeType.POINTS_DROPPED, old=50000, new=47500))
+    assert thresholds.allows(change(ChangeType.POINTS_DROPPED, old=50000, new=45000))
+    # Appearances have no old price to compare
+    assert thresholds.allows(change(ChangeType.SEAT_APPEARED, new=50000))
+
+def test_thresholds_max_points():
+    thresholds = Thresholds(max_points=50000, notify_points_rose=True)
+    assert thresholds.allows(change(ChangeType.SEAT_APPEARED, new=50000))
+    assert not thresholds.allows(change(ChangeType.SEAT_APPEARED, new=60000))
+    assert not thresholds.allows(change(ChangeType.POINTS_DROPPED, old=80000, new=70000))
+    # Losing seats is always worth knowing, whatever the ceiling
+    assert thresholds.allows(change(ChangeType.SEAT_DISAPPEARED, old=40000))
+    assert thresholds.allows(change(ChangeType.POINTS_ROSE, old=50000, new=60000))
+
+def test_thresholds_from_config_ignores_unknown_keys():
+    assert Thresholds.from_config({"max_points": 60000, "colour": "red"}) == Thresholds(max_points=60000)
+
+def test_detect_changes_against_store(store):
+    assert detect_changes(store, SEARCH, [result(19, "upper_class", 50000), result(20, "upper_class", None)]) == []
+    assert len(store.latest_snapshot("LHR", "BLR", "2025-10-01", "2025-10-31")) == 2
+
+    changes = detect_changes(store, SEARCH, [result(19, "upper_class", 47500), result(20, "upper_class", 50000)])
+    assert [(c.travel_date, c.kind) for c in changes] == [
+        ("2025-10-19", ChangeType.POINTS_DROPPED),
+        ("2025-10-20", ChangeType.SEAT_APPEARED),
+    ]
+    latest = {row["travel_date"]: row["points"]
+              for row in store.latest_snapshot("LHR", "BLR", "2025-10-01", "2025-10-31")}
+    assert latest == {"2025-10-19": 47500, "2025-10-20": 50000}
+
+def test_detect_changes_logs_everything_but_returns_what_passes(store):
+    detect_changes(store, SEARCH, [result(19, "upper_class", 50000), result(19, "economy", 20000)])
+    changes = detect_changes(store, SEARCH, [result(19, "upper_class", 40000), result(19, "economy", 10000)],
+                             Thresholds(cabins=["upper_class"]))
+    assert [c.cabin for c in changes] == ["upper_class"]
+    assert [row["cabin"] for row in store.changes_since(0)] == ["economy", "upper_class"]
+
+def test_detect_changes_ignores_other_airlines(store):
+    detect_changes(store, SEARCH, [result(19, "upper_class", 50000)])
+    other = FlightSearch(origin="LHR", destination="BLR", month=10, year=2025, airline="british_airways")
+    # British Airways has no stored snapshot yet, so this is its baseline
+    assert detect_changes(store, other, [result(19, "upper_class", 20000)]) == []
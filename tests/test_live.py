@@ -0,0 +1,120 @@
+"""
+ChangeHub fan-out and eviction, and ChangeFeed tailing and replaying the change log
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from change_detection import AvailabilityChange, ChangeType
+from live import SLOW_CONSUMER, ChangeFeed, ChangeHub, Event, SubscriptionClosed, parse_months, parse_routes
+from storage import AvailabilityStore
+
+def event(id: int, route: str = "LHR-BLR", month: str = "2025-10", cabin: str = "upper_class") -> Event:
+    origin, destination = route.split("-")
+    return Event(id, origin, destination, month, cabin, "{}")
+
+def ids(events) -> list:
+    return [e.id for e in events]
+
+def test_events_reach_only_interested_subscriptions():
+    hub = ChangeHub()
+    october = hub.subscribe([("LHR", "BLR")], months=["2025-10"])
+    economy = hub.subscribe([("LHR", "BLR")], cabins=["economy"])
+    everything = hub.subscribe([("LHR", "BLR"), ("LHR", "JFK")])
+    delivered = hub.publish([event(1), event(2, month="2025-11", cabin="economy"), event(3, route="LHR-JFK"),
+                             event(4, route="LHR-DEL")])
+    assert delivered == 5
+    assert ids(asyncio.run(october.next_batch(0))) == [1]
+    assert ids(asyncio.run(economy.next_batch(0))) == [2]
+    assert ids(asyncio.run(everything.next_batch(0))) == [1, 2, 3]
+    assert everything.last_id == 3
+    assert hub.stats() == {"subscriptions": 3, "last_id": 4, "published": 4, "delivered": 5, "evicted": 0}
+
+def test_slow_consumer_is_evicted_without_holding_up_others():
+    hub = ChangeHub(buffer_size=2)
+    slow = hub.subscribe([("LHR", "BLR")])
+    fast = hub.subscribe([("LHR", "BLR")], months=["2025-10"])
+    hub.publish([event(1), event(2)])
+    assert ids(asyncio.run(fast.next_batch(0))) == [1, 2]
+    hub.publish([event(3), event(4)])
+    with pytest.raises(SubscriptionClosed, match=SLOW_CONSUMER):
+        asyncio.run(slow.next_batch(0))
+    assert ids(asyncio.run(fast.next_batch(0))) == [3, 4]
+    assert (hub.stats()["evicted"], hub.stats()["subscriptions"]) == (1, 1)
+    assert hub.index == {("LHR", "BLR", "2025-10"): {fast}}
+    # Unsubscribing an evicted subscription doesn't count it twice
+    hub.unsubscribe(slow)
+    assert hub.subscriptions == 1
+
+def test_waiting_subscriber_wakes_on_publish():
+    hub = ChangeHub()
+    subscription = hub.subscribe([("LHR", "BLR")])
+
+    async def main():
+        waiting = asyncio.create_task(subscription.next_batch(5))
+        await asyncio.sleep(0)
+        hub.publish([event(1)])
+        return await asyncio.wait_for(waiting, 1)
+
+    assert ids(asyncio.run(main())) == [1]
+    assert asyncio.run(subscription.next_batch(0.01)) == []
+
+def test_subscription_limit():
+    hub = ChangeHub(max_subscriptions=1)
+    subscription = hub.subscribe([("LHR", "BLR")])
+    with pytest.raises(OverflowError):
+        hub.subscribe([("LHR", "JFK")])
+    hub.unsubscribe(subscription)
+    assert hub.index == {}
+    hub.subscribe([("LHR", "JFK")])
+
+def change(day: int, points: int, destination: str = "BLR") -> AvailabilityChange:
+    return AvailabilityChange(kind=ChangeType.POINTS_DROPPED, airline="virgin_atlantic", origin="LHR",
+                              destination=destination, travel_date=f"2025-10-{day:02d}", cabin="upper_class",
+                              old_points=points + 10000, new_points=points)
+
+@pytest.fixture
+def writer(tmp_path):
+    store = AvailabilityStore(str(tmp_path / "availability.db"))
+    yield store
+    store.close()
+
+@pytest.fixture
+def feed(writer):
+    feed = ChangeFeed(writer.path, ChangeHub(buffer_size=4))
+    yield feed
+    asyncio.run(feed.stop())
+
+def test_feed_publishes_what_other_connections_log(writer, feed):
+    writer.record_changes([change(1, 40000)])
+    # Changes from before the feed started aren't pushed
+    feed.hub.last_id = writer.last_change_id()
+    subscription = feed.hub.subscribe([("LHR", "BLR")])
+    writer.record_changes([change(2, 40000), change(3, 40000, "JFK")])
+    assert asyncio.run(feed.poll()) == 2
+    assert asyncio.run(feed.poll()) == 0
+    [pushed] = asyncio.run(subscription.next_batch(0))
+    assert (pushed.id, pushed.month) == (2, "2025-10")
+    payload = json.loads(pushed.payload)
+    assert (payload["event"], payload["new_points"], payload["message"]) == (
+        "change", 40000, change(2, 40000).describe())
+
+def test_replay_fills_the_gap_up_to_what_was_sent(writer, feed):
+    writer.record_changes([change(day, 40000, "JFK" if day % 2 else "BLR") for day in range(1, 13)])
+    subscription = feed.hub.subscribe([("LHR", "BLR")])
+    subscription.last_id = 10
+    # BLR events 2..10 after id 1, capped at the buffer size, keeping the most recent
+    assert ids(feed.replay(subscription, 1)) == [4, 6, 8, 10]
+    assert ids(feed.replay(subscription, 7)) == [8, 10]
+    assert feed.replay(subscription, 10) == []
+
+def test_parse_routes_and_months():
+    assert parse_routes(["lhr-blr", "LHR-JFK"]) == [("LHR", "BLR"), ("LHR", "JFK")]
+    for bad in (["LHRBLR"], ["LHR-B1R"], []):
+        with pytest.raises(ValueError):
+            parse_routes(bad)
+    assert parse_months(["2025-10"]) == ["2025-10"]
+    with pytest.raises(ValueError):
+        parse_months(["2025-13"])
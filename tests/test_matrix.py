@@ -0,0 +1,55 @@
+"""
+AvailabilityMatrix queries, in memory and memory-mapped from a saved file
+"""
+
+from datetime import date
+
+import pytest
+
+from availability_matrix import NO_POINTS, AvailabilityMatrix
+
+BLR = ("virgin_atlantic", "LHR", "BLR")
+JFK = ("virgin_atlantic", "LHR", "JFK")
+
+def row(route, day: int, points, cabin: str = "upper_class") -> dict:
+    airline, origin, destination = route
+    return {"airline": airline, "origin": origin, "destination": destination, "travel_date": f"2025-10-{day:02d}",
+            "cabin": cabin, "points": points, "available": points is not None}
+
+ROWS = [
+    row(BLR, 1, 57500), row(BLR, 2, 47500), row(BLR, 3, None), row(BLR, 4, 47500),
+    row(JFK, 2, None), row(JFK, 3, 35000), row(JFK, 4, 10000, cabin="economy"),
+]
+
+@pytest.fixture(params=["memory", "mapped"])
+def matrix(request, tmp_path):
+    matrix = AvailabilityMatrix.from_rows(ROWS)
+    if request.param == "mapped":
+        matrix.save(str(tmp_path / "availability.matrix"))
+        matrix = AvailabilityMatrix.open(str(tmp_path / "availability.matrix"))
+    yield matrix
+    matrix.close()
+
+def test_cheapest_per_route_takes_the_earliest_lowest_day(matrix):
+    assert matrix.cheapest_per_route("upper_class") == {BLR: (date(2025, 10, 2), 47500),
+                                                        JFK: (date(2025, 10, 3), 35000)}
+    assert matrix.cheapest_per_route("upper_class", date(2025, 10, 3), routes=[BLR, ("x", "y", "z")]) == {
+        BLR: (date(2025, 10, 4), 47500)}
+    assert matrix.cheapest_per_route("upper_class", date(2025, 10, 2), date(2025, 10, 2)) == {
+        BLR: (date(2025, 10, 2), 47500)}
+    assert matrix.cheapest_per_route("first") == {}
+
+def test_cheapest(matrix):
+    assert matrix.cheapest("upper_class") == {"route": "virgin_atlantic:LHR-JFK", "date": "2025-10-03",
+                                              "cabin": "upper_class", "points": 35000}
+    assert matrix.cheapest("upper_class", date(2025, 11, 1)) is None
+
+def test_available_by_route_then_date(matrix):
+    assert [(m["route"][-3:], m["date"][-2:], m["points"]) for m in matrix.available("upper_class")] == [
+        ("BLR", "01", 57500), ("BLR", "02", 47500), ("BLR", "04", 47500), ("JFK", "03", 35000)]
+    assert [m["date"] for m in matrix.available("upper_class", max_points=40000, routes=[JFK])] == ["2025-10-03"]
+    assert matrix.available("economy", end=date(2025, 10, 3)) == []
+
+def test_points_range(matrix):
+    assert matrix.points_range(BLR, "upper_class", date(2025, 10, 2)).tolist() == [47500, NO_POINTS, 47500]
+    assert matrix.points_range(("x", "y", "z"), "upper_class").tolist() == []
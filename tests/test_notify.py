@@ -0,0 +1,100 @@
+"""
+SmtpChannel's connection pool against a local aiosmtpd server
+"""
+
+import asyncio
+import smtplib
+import socket
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from notify_dispatcher import SmtpChannel
+
+class Mailbox:
+    """Accepts everything except mail to refused@example.com"""
+
+    def __init__(self):
+        self.messages = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address == "refused@example.com":
+            return "550 no such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((envelope.rcpt_tos, envelope.content.decode()))
+        return "250 Message accepted"
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+def mailbox():
+    mailbox = Mailbox()
+    mailbox.port = free_port()
+    controller = Controller(mailbox, hostname="127.0.0.1", port=mailbox.port)
+    controller.start()
+    yield mailbox
+    controller.stop()
+
+def channel(mailbox, pool_size: int = 1) -> SmtpChannel:
+    return SmtpChannel("127.0.0.1", mailbox.port, sender="tracker@example.com", recipients=[],
+                       use_tls=False, pool_size=pool_size, timeout=5)
+
+def test_connections_are_reused(mailbox):
+    async def main():
+        email = channel(mailbox)
+        for n in range(3):
+            await email.send("me@example.com", f"Seats {n}", "LHR-BLR", key=f"k{n}")
+        opened = (email._opened, len(email._connections))
+        await email.close()
+        return opened
+
+    assert asyncio.run(main()) == (1, 1)
+    assert len(mailbox.messages) == 3
+    assert "Message-ID: <k0@reward-seat-tracker>" in mailbox.messages[0][1]
+
+def test_failed_send_discards_its_connection(mailbox):
+    async def main():
+        email = channel(mailbox)
+        with pytest.raises(smtplib.SMTPRecipientsRefused):
+            await email.send("refused@example.com", "Seats", "LHR-BLR")
+        assert (email._opened, email._connections, email._idle) == (0, [], [])
+        # The slot came back, so the pool isn't left waiting for a connection that's gone
+        await asyncio.wait_for(email.send("me@example.com", "Seats", "LHR-BLR"), 5)
+        await email.close()
+
+    asyncio.run(main())
+    assert [rcpt for rcpt, _ in mailbox.messages] == [["me@example.com"]]
+
+def test_failures_free_slots_for_waiting_sends(mailbox):
+    async def main():
+        email = channel(mailbox, pool_size=2)
+        sends = [email.send("refused@example.com" if n % 2 else "me@example.com", "Seats", "LHR-BLR")
+                 for n in range(6)]
+        outcomes = await asyncio.wait_for(asyncio.gather(*sends, return_exceptions=True), 10)
+        assert email._opened == len(email._connections) == len(email._idle) <= 2
+        await email.close()
+        return outcomes
+
+    outcomes = asyncio.run(main())
+    assert [isinstance(outcome, smtplib.SMTPRecipientsRefused) for outcome in outcomes] == [False, True] * 3
+    assert len(mailbox.messages) == 3
+
+def test_dropped_idle_connection_is_replaced(mailbox):
+    async def main():
+        email = channel(mailbox)
+        await email.send("me@example.com", "Seats", "LHR-BLR")
+        stale = email._idle[0]
+        stale.close()
+        await email.send("me@example.com", "Seats", "LHR-BLR")
+        assert stale not in email._connections
+        assert (email._opened, len(email._connections)) == (1, 1)
+        await email.close()
+
+    asyncio.run(main())
+    assert len(mailbox.messages) == 2
@@ -0,0 +1,118 @@
+"""
+Outbox leases, retries with backoff and dead letters, on a clock the tests move by hand
+"""
+
+import asyncio
+
+import pytest
+
+import outbox as outbox_module
+from outbox import Outbox, OutboxWorker, idempotency_key
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+class Channel:
+    """Fails the first `failures` sends, then records what it delivers"""
+    name = "email"
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.sent = []
+
+    async def send(self, recipient: str, subject: str, body: str, key=None):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("smtp down")
+        self.sent.append((recipient, subject, key))
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(outbox_module, "time", clock)
+    return clock
+
+@pytest.fixture
+def outbox(clock):
+    outbox = Outbox(":memory:")
+    yield outbox
+    outbox.close()
+
+def message(recipient: str = "me@example.com", channel: str = "email", batch: str = "b1") -> dict:
+    return {"idempotency_key": idempotency_key(batch, channel, recipient), "channel": channel,
+            "recipient": recipient, "subject": "Seats", "body": "LHR-BLR"}
+
+def status(outbox: Outbox) -> dict:
+    stats = outbox.stats()
+    return {status: stats[status] for status in ("pending", "in_flight", "delivered", "dead")}
+
+def test_enqueueing_a_batch_again_is_a_no_op(outbox):
+    assert outbox.enqueue([message(), message("you@example.com")]) == 2
+    assert outbox.enqueue([message(), message("you@example.com")]) == 0
+    assert outbox.enqueue([message(batch="b2")]) == 1
+
+def test_lease_hides_a_message_until_it_runs_out(outbox, clock):
+    outbox.enqueue([message()])
+    assert len(outbox.claim(lease_seconds=60)) == 1
+    assert outbox.claim(lease_seconds=60) == []
+    # The worker that leased it never reported back
+    clock.now += 61
+    assert [m.recipient for m in outbox.claim(lease_seconds=60)] == ["me@example.com"]
+
+def test_failures_retry_with_exponential_backoff(outbox, clock):
+    channel = Channel(failures=2)
+    worker = OutboxWorker(outbox, [channel], max_attempts=5, backoff_seconds=10)
+    outbox.enqueue([message()])
+    assert asyncio.run(worker.drain()) == {"delivered": 0, "retried": 1, "dead": 0}
+    clock.now += 9
+    assert asyncio.run(worker.drain())["retried"] == 0
+    clock.now += 1
+    assert asyncio.run(worker.drain())["retried"] == 1
+    # The second retry waits twice as long
+    clock.now += 19
+    assert asyncio.run(worker.drain()) == {"delivered": 0, "retried": 0, "dead": 0}
+    clock.now += 1
+    assert asyncio.run(worker.drain()) == {"delivered": 1, "retried": 0, "dead": 0}
+    assert channel.sent == [("me@example.com", "Seats", message()["idempotency_key"])]
+    assert status(outbox) == {"pending": 0, "in_flight": 0, "delivered": 1, "dead": 0}
+
+def test_dead_letter_after_max_attempts_and_requeue(outbox, clock):
+    channel = Channel(failures=3)
+    worker = OutboxWorker(outbox, [channel], max_attempts=3, backoff_seconds=1)
+    outbox.enqueue([message()])
+    outcomes = []
+    for _ in range(3):
+        outcomes.append(asyncio.run(worker.drain()))
+        clock.now += 10
+    assert outcomes[-1] == {"delivered": 0, "retried": 0, "dead": 1}
+    [dead] = outbox.dead_letters()
+    assert (dead["attempts"], dead["last_error"]) == (3, "ConnectionError: smtp down")
+    assert asyncio.run(worker.drain())["dead"] == 0
+
+    assert outbox.requeue_dead() == 1
+    assert asyncio.run(worker.drain())["delivered"] == 1
+    assert outbox.dead_letters() == []
+
+def test_unconfigured_channel_is_dead_lettered_at_once(outbox):
+    worker = OutboxWorker(outbox, [Channel()])
+    outbox.enqueue([message(channel="sms", recipient="+447700900123")])
+    assert asyncio.run(worker.drain()) == {"delivered": 0, "retried": 0, "dead": 1}
+    assert outbox.dead_letters()[0]["last_error"] == "channel 'sms' is not configured"
+
+def test_delivered_rows_are_purged_once_old(outbox, clock):
+    worker = OutboxWorker(outbox, [Channel()], keep_delivered_seconds=100, purge_interval_seconds=50)
+    outbox.enqueue([message()])
+    asyncio.run(worker.drain())
+    clock.now += 60
+    assert worker.purge() == 0
+    clock.now += 60
+    assert worker.purge() == 1
+    # Re-enqueueing after the purge delivers again: the key is only remembered while the row is kept
+    assert outbox.enqueue([message()]) == 1
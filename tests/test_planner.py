@@ -0,0 +1,56 @@
+"""
+Fetch planning: one fetch per (airline, route, month) and who wanted each
+"""
+
+from datetime import date
+
+from models import FlightSearch
+from planner import plan_cycle, unique_searches, watch_months
+from watches import Watch
+
+CONFIG = {"routes": [
+    {"origin": "LHR", "destination": "BLR", "year": 2025, "months": [10, 11],
+     "airlines": ["virgin_atlantic", "british_airways"]},
+]}
+TODAY = date(2025, 10, 15)
+
+def watch(id: int, start: str, end: str, origin: str = "LHR", destination: str = "BLR", airline=None) -> Watch:
+    return Watch(id=id, origin=origin, destination=destination, start=date.fromisoformat(start),
+                 end=date.fromisoformat(end), cabin=None, max_points=None, airline=airline,
+                 recipients=("email:me@example.com",))
+
+def search(month: int, airline: str = "virgin_atlantic", destination: str = "BLR") -> FlightSearch:
+    return FlightSearch(origin="LHR", destination=destination, month=month, year=2025, airline=airline)
+
+def test_watch_months_cross_the_year():
+    assert list(watch_months(date(2025, 11, 20), date(2026, 2, 1))) == [(2025, 11), (2025, 12), (2026, 1), (2026, 2)]
+
+def test_unique_searches_keeps_the_first_of_each_month():
+    searches = [search(10), search(11), search(10), search(10, "british_airways")]
+    assert list(unique_searches(searches)) == [search(10), search(11), search(10, "british_airways")]
+
+def test_overlapping_consumers_share_one_fetch():
+    watches = [watch(1, "2025-10-20", "2025-12-05"), watch(2, "2025-11-01", "2025-11-30", airline="virgin_atlantic")]
+    plan = plan_cycle(CONFIG, watches, adhoc=[search(11), search(11)], today=TODAY)
+    # 4 route months, 6 for watch 1 (only December is new), 1 each for watch 2 and the ad-hoc search
+    assert len(plan.searches) == 6
+    assert plan.consumers_of(search(11)) == ["route:LHR-BLR", "watch:1", "watch:2", "adhoc:request"]
+    assert plan.consumers_of(search(12, "british_airways")) == ["watch:1"]
+    assert plan.stats() == {"requests": 12, "fetches": 6, "dedup_ratio": 2.0}
+
+def test_wanted_by_kind():
+    plan = plan_cycle(CONFIG, [watch(1, "2025-12-01", "2025-12-31")], adhoc=[search(10)], today=TODAY)
+    assert plan.wanted_by(search(10), "route") and plan.wanted_by(search(10), "adhoc")
+    assert not plan.wanted_by(search(10), "watch")
+    assert plan.wanted_by(search(12), "watch") and not plan.wanted_by(search(12), "route")
+    assert not plan.wanted_by(search(1), "route")
+
+def test_watches_skip_past_months_and_fall_back_to_the_default_airline():
+    watches = [watch(1, "2025-08-01", "2025-09-30"), watch(2, "2025-09-01", "2025-10-31", destination="JFK")]
+    plan = plan_cycle({}, watches, today=TODAY)
+    assert plan.searches == [search(10, destination="JFK")]
+    assert plan.consumers_of(search(10, destination="JFK")) == ["watch:2"]
+
+def test_empty_plan():
+    plan = plan_cycle({}, today=TODAY)
+    assert (plan.searches, plan.dedup_ratio) == ([], 1.0)
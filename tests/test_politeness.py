@@ -0,0 +1,103 @@
+"""
+Circuit breaker, token bucket and host policy outcomes
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from politeness import Blocked, CircuitBreaker, CircuitOpen, HostPolicy, TokenBucket
+
+def opened(breaker: CircuitBreaker) -> CircuitBreaker:
+    for _ in range(breaker.failure_threshold):
+        breaker.check("host")
+        breaker.record_failure()
+    assert breaker.state == "open"
+    return breaker
+
+def cool_down(breaker: CircuitBreaker):
+    breaker.opened_at -= breaker.cooldown
+
+def test_opens_after_threshold():
+    breaker = opened(CircuitBreaker(failure_threshold=3, cooldown_seconds=10))
+    assert breaker.opens == 1
+    with pytest.raises(CircuitOpen):
+        breaker.check("host")
+
+def test_stragglers_do_not_escalate_the_cooldown():
+    breaker = opened(CircuitBreaker(failure_threshold=2, cooldown_seconds=10))
+    # Requests admitted before the circuit opened fail afterwards
+    for _ in range(3):
+        breaker.record_failure()
+    assert (breaker.cooldown, breaker.opens) == (10, 1)
+
+def test_failed_probe_doubles_the_cooldown():
+    breaker = opened(CircuitBreaker(failure_threshold=2, cooldown_seconds=10, max_cooldown_seconds=15))
+    cool_down(breaker)
+    assert breaker.check("host") is True
+    # Only one probe at a time
+    with pytest.raises(CircuitOpen):
+        breaker.check("host")
+    breaker.record_failure(probe=True)
+    assert (breaker.cooldown, breaker.opens, breaker.state) == (15, 2, "open")
+
+def test_successful_probe_closes():
+    breaker = opened(CircuitBreaker(failure_threshold=2, cooldown_seconds=10))
+    cool_down(breaker)
+    assert breaker.check("host") is True
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.check("host") is False
+
+def test_policy_passes_the_probe_through():
+    policy = HostPolicy("host", rate=0, failure_threshold=1, cooldown_seconds=10)
+
+    async def attempt():
+        probe = await policy.acquire()
+        with policy.request(probe):
+            raise Blocked("too many requests", 429)
+
+    with pytest.raises(Blocked):
+        asyncio.run(attempt())
+    cool_down(policy.breaker)
+    with pytest.raises(Blocked):
+        asyncio.run(attempt())
+    assert policy.breaker.cooldown == 20
+
+def test_unlimited_bucket_waits_out_a_pause():
+    bucket = TokenBucket(rate=0)
+    bucket.pause(0.05)
+    started = time.monotonic()
+    asyncio.run(bucket.acquire())
+    assert time.monotonic() - started >= 0.05
+    asyncio.run(bucket.acquire())
+
+def test_cancellation_is_not_a_host_failure():
+    policy = HostPolicy("host", rate=1, failure_threshold=1, cooldown_seconds=10)
+
+    async def attempt():
+        probe = await policy.acquire()
+        with policy.request(probe):
+            await asyncio.sleep(10)
+
+    async def cancelled():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(attempt(), 0.01)
+
+    asyncio.run(cancelled())
+    assert (policy.breaker.state, policy.counts["error"], policy.rate) == ("closed", 0, 1)
+
+def test_cancelled_probe_frees_the_slot():
+    policy = HostPolicy("host", rate=0, failure_threshold=1, cooldown_seconds=10)
+    opened(policy.breaker)
+    cool_down(policy.breaker)
+
+    async def attempt():
+        probe = await policy.acquire()
+        with policy.request(probe):
+            raise asyncio.CancelledError
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(attempt())
+    assert policy.breaker.check("host") is True
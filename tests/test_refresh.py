@@ -0,0 +1,84 @@
+"""
+Content hashing per month and cabin, and the refresh policy's intervals
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import FlightResult, FlightSearch
+from refresh import MonthFetch, MonthState, RefreshPolicy, RefreshState, cabin_hashes, content_hash, month_key
+
+NOW = datetime(2025, 10, 1, 12)
+
+def result(day: int, points, cabin: str = "upper_class") -> FlightResult:
+    return FlightResult(date=f"2025-10-{day:02d}", availability=points is not None, price="",
+                        booking_class=cabin, timestamp=NOW, points=points)
+
+def search(month: int = 10, year: int = 2025) -> FlightSearch:
+    return FlightSearch(origin="LHR", destination="BLR", month=month, year=year)
+
+def test_content_hash_ignores_key_order():
+    assert content_hash({"a": 1, "b": [1, 2]}) == content_hash({"b": [1, 2], "a": 1})
+    assert content_hash({"a": 1, "b": [1, 2]}) != content_hash({"a": 1, "b": [2, 1]})
+
+def test_cabin_hashes_ignore_row_order_and_observation_time():
+    rows = [result(1, 47500), result(2, None), result(1, 10000, "economy")]
+    later = [r.model_copy(update={"timestamp": NOW + timedelta(hours=6)}) for r in reversed(rows)]
+    assert cabin_hashes(rows) == cabin_hashes(later)
+    assert set(cabin_hashes(rows)) == {"upper_class", "economy"}
+
+def test_only_the_changed_cabin_hash_moves():
+    before = cabin_hashes([result(1, 47500), result(1, 10000, "economy")])
+    after = cabin_hashes([result(1, 50000), result(1, 10000, "economy")])
+    assert before["economy"] == after["economy"]
+    assert before["upper_class"] != after["upper_class"]
+
+def test_month_fetch_unchanged():
+    assert MonthFetch(results=None, content_hash="abc").unchanged
+    assert not MonthFetch(results=[], content_hash="abc").unchanged
+
+def test_new_months_are_always_due():
+    policy = RefreshPolicy()
+    assert policy.is_due(search(), None, NOW)
+    assert policy.is_due(search(), MonthState(), NOW)
+
+def test_interval_grows_with_horizon_and_quietness():
+    policy = RefreshPolicy(min_interval_hours=6, max_interval_hours=72, horizon_weight=0.5, min_change_rate=0.05)
+    hot = MonthState(change_rate=1.0, checked_at=NOW)
+    assert policy.interval(search(10), hot, NOW) == timedelta(hours=6)
+    assert policy.interval(search(12), hot, NOW) == timedelta(hours=12)
+    assert policy.interval(search(10), MonthState(change_rate=0.5, checked_at=NOW), NOW) == timedelta(hours=12)
+    # Quiet, far-off months are capped
+    assert policy.interval(search(6, 2026), MonthState(change_rate=0.0, checked_at=NOW), NOW) == timedelta(hours=72)
+
+def test_plan_splits_due_from_waiting():
+    policy = RefreshPolicy(min_interval_hours=6)
+    states = {month_key(search(10)): MonthState(checked_at=NOW - timedelta(hours=7)),
+              month_key(search(11)): MonthState(checked_at=NOW - timedelta(hours=1))}
+    due, waiting = policy.plan([search(10), search(11), search(12)], states, NOW)
+    assert [s.month for s in due] == [10, 12]
+    assert [s.month for s in waiting] == [11]
+    assert RefreshPolicy(enabled=False).plan([search(11)], states, NOW) == ([search(11)], [])
+
+def test_observe_smooths_the_change_rate():
+    policy = RefreshPolicy(smoothing=0.5)
+    state = policy.observe(None, changed=False, now=NOW)
+    assert (state.checks, state.changes, state.change_rate, state.changed_at) == (1, 0, 0.5, None)
+    state = policy.observe(state, changed=True, now=NOW)
+    assert (state.checks, state.changes, state.change_rate, state.changed_at) == (2, 1, 0.75, NOW)
+
+@pytest.fixture
+def refresh_state():
+    state = RefreshState(":memory:")
+    yield state
+    state.close()
+
+def test_states_round_trip(refresh_state):
+    key = month_key(search())
+    state = MonthState(payload_hash="p", cabin_hashes={"economy": "e", "upper_class": "u"}, checks=3, changes=1,
+                       change_rate=0.4, checked_at=NOW, changed_at=NOW - timedelta(days=1))
+    refresh_state.save({key: state})
+    assert refresh_state.states() == {key: state}
+    refresh_state.save({key: RefreshPolicy().observe(state, changed=False, now=NOW)})
+    assert refresh_state.states()[key].checks == 4
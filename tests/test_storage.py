@@ -0,0 +1,96 @@
+"""
+AvailabilityStore: price rollups, the change log and its consumers' cursors
+"""
+
+import pytest
+
+from change_detection import AvailabilityChange, ChangeType
+from models import FlightSearch
+from storage import AvailabilityStore
+
+@pytest.fixture
+def store():
+    store = AvailabilityStore(":memory:")
+    yield store
+    store.close()
+
+def change(day: int, points: int) -> AvailabilityChange:
+    return AvailabilityChange(kind=ChangeType.POINTS_DROPPED, airline="virgin_atlantic", origin="LHR",
+                              destination="BLR", travel_date=f"2025-10-{day:02d}", cabin="upper_class",
+                              old_points=points + 10000, new_points=points)
+
+def test_change_log_round_trip(store):
+    store.record_changes([change(19, 40000), change(20, 50000)])
+    rows = store.changes_since(0)
+    assert [row["id"] for row in rows] == [1, 2]
+    assert [AvailabilityChange.from_row(row) for row in rows] == [change(19, 40000), change(20, 50000)]
+    assert store.changes_since(1) == rows[1:]
+    assert store.changes_since(0, until_id=1) == rows[:1]
+    assert store.last_change_id() == 2
+
+def test_change_cursor(store):
+    assert store.change_cursor("route_digest") is None
+    store.set_change_cursor("route_digest", 5)
+    store.set_change_cursor("route_digest", 7)
+    assert store.change_cursor("route_digest") == 7
+    assert store.change_cursor("other") is None
+
+def observation(day: int, points, observed_at: str, cabin: str = "upper_class") -> tuple:
+    return ("virgin_atlantic", "LHR", "BLR", f"2025-10-{day:02d}", cabin, points, int(points is not None),
+            observed_at)
+
+def history(store) -> dict:
+    return {(row["travel_date"], row["cabin"]): row
+            for row in store.price_history("LHR", "BLR", "2025-10-01", "2025-10-31")}
+
+HISTORY = [
+    observation(19, 50000, "2025-09-01T08:00:00"),
+    observation(19, None, "2025-09-02T08:00:00"),
+    observation(19, 47500, "2025-09-03T08:00:00"),
+    # Arrives late: counted, but not the latest price
+    observation(19, 60000, "2025-09-02T20:00:00"),
+    observation(20, None, "2025-09-01T08:00:00"),
+]
+
+def test_rollups_follow_observations(store):
+    store.save_rows(HISTORY)
+    seats = history(store)[("2025-10-19", "upper_class")]
+    assert (seats["observations"], seats["min_points"], seats["max_points"], seats["last_points"]) == (
+        4, 47500, 60000, 47500)
+    assert (seats["first_observed_at"], seats["last_observed_at"]) == ("2025-09-01T08:00:00", "2025-09-03T08:00:00")
+    assert (seats["first_available_at"], seats["last_available_at"]) == (
+        "2025-09-01T08:00:00", "2025-09-03T08:00:00")
+    never = history(store)[("2025-10-20", "upper_class")]
+    assert (never["observations"], never["min_points"], never["first_available_at"]) == (1, None, None)
+
+def test_daily_trend(store):
+    store.save_rows(HISTORY)
+    trend = store.price_trend("LHR", "BLR", "upper_class", "2025-10-01", "2025-10-31")
+    assert [(day["observed_on"], day["min_points"], day["observations"], day["dates_with_seats"])
+            for day in trend] == [("2025-09-01", 50000, 2, 1), ("2025-09-02", 60000, 2, 1),
+                                  ("2025-09-03", 47500, 1, 1)]
+
+def test_rebuild_matches_incremental(store):
+    store.save_rows(HISTORY)
+    incremental = history(store)
+    assert store.rebuild_rollups(batch_size=2) == len(HISTORY)
+    assert history(store) == incremental
+
+def test_touch_rollups_counts_unchanged_fetches(store):
+    store.save_rows([observation(19, 47500, "2025-09-01T08:00:00"),
+                     observation(19, 10000, "2025-09-01T08:00:00", cabin="economy"),
+                     observation(20, None, "2025-09-01T08:00:00")])
+    search = FlightSearch(origin="LHR", destination="BLR", month=10, year=2025)
+    assert store.touch_rollups(search, "2025-09-05T08:00:00", cabins=["upper_class"]) == 2
+    rollups = history(store)
+    assert (rollups[("2025-10-19", "upper_class")]["observations"],
+            rollups[("2025-10-19", "upper_class")]["last_available_at"]) == (2, "2025-09-05T08:00:00")
+    assert (rollups[("2025-10-20", "upper_class")]["observations"],
+            rollups[("2025-10-20", "upper_class")]["last_available_at"]) == (2, None)
+    assert rollups[("2025-10-19", "economy")]["observations"] == 1
+    trend = store.price_trend("LHR", "BLR", "upper_class", "2025-10-01", "2025-10-31", since="2025-09-05")
+    assert [(day["observed_on"], day["observations"], day["dates_with_seats"]) for day in trend] == [
+        ("2025-09-05", 2, 1)]
+    # Touching adds nothing to the raw history, and a month never scraped has nothing to touch
+    assert store.conn.execute("SELECT COUNT(*) FROM observations").fetchone()[0] == 3
+    assert store.touch_rollups(search.model_copy(update={"month": 11}), "2025-09-05T08:00:00") == 0
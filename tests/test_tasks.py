@@ -0,0 +1,95 @@
+"""
+RemoteTracker against an eager Celery app: routing, results and errors crossing the task boundary
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+import tasks
+from models import FlightResult, FlightSearch
+from politeness import Blocked, CircuitOpen
+from refresh import MonthFetch
+
+class FakeTracker:
+    """Stands in for a worker's browser: answers from a table, or raises what it was given"""
+
+    def __init__(self, outcome):
+        self.outcome = outcome
+        self.searches = []
+
+    async def start_browser(self):
+        pass
+
+    async def close_browser(self):
+        pass
+
+    async def fetch_month(self, search: FlightSearch, known_hash=None) -> MonthFetch:
+        self.searches.append((search, known_hash))
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self.outcome
+
+@pytest.fixture
+def worker(monkeypatch):
+    """Run tasks in-process, with the worker tracker swapped for a FakeTracker"""
+    monkeypatch.setattr(tasks.celery_app.conf, "task_always_eager", True)
+    monkeypatch.setattr(tasks, "_tracker", None)
+    monkeypatch.setattr(tasks, "_loop", None)
+    published = []
+    apply_async = tasks.fetch_month.apply_async
+
+    def record(*args, **kwargs):
+        published.append(kwargs.get("queue"))
+        return apply_async(*args, **kwargs)
+
+    monkeypatch.setattr(tasks.fetch_month, "apply_async", record)
+
+    def start(outcome):
+        monkeypatch.setattr(tasks, "tracker_factory", lambda: FakeTracker(outcome))
+        return published
+
+    yield start
+    if tasks._loop is not None:
+        tasks._loop.close()
+
+def search(airline: str = "virgin_atlantic") -> FlightSearch:
+    return FlightSearch(origin="LHR", destination="BLR", month=10, year=2025, airline=airline)
+
+def fetched(points: int) -> MonthFetch:
+    return MonthFetch(results=[FlightResult(date="2025-10-19", availability=True, price=f"{points:,} pts",
+                                            booking_class="upper_class", timestamp=datetime(2025, 9, 1),
+                                            points=points)], content_hash="abc")
+
+def test_jobs_go_to_their_airline_queue(worker):
+    published = worker(fetched(47500))
+    asyncio.run(tasks.RemoteTracker().fetch_month(search("british_airways")))
+    assert published == [tasks.airline_queue("british_airways")]
+    assert tasks.airline_queue("british_airways") == f"{tasks.celery_app.conf.task_default_queue}.british_airways"
+
+def test_results_and_known_hash_round_trip(worker):
+    worker(fetched(47500))
+    result = asyncio.run(tasks.RemoteTracker().fetch_month(search(), known_hash="old"))
+    assert result.content_hash == "abc"
+    assert [(r.date, r.points) for r in result.results] == [("2025-10-19", 47500)]
+    assert tasks._tracker.searches == [(search(), "old")]
+
+def test_unchanged_month_stays_unchanged(worker):
+    worker(MonthFetch(results=None, content_hash="abc"))
+    assert asyncio.run(tasks.RemoteTracker().fetch_month(search(), known_hash="abc")).unchanged
+
+@pytest.mark.parametrize("error", [
+    Blocked("challenge page", 403, 30),
+    CircuitOpen("www.virginatlantic.com", 12.5),
+])
+def test_politeness_errors_keep_their_type(worker, error):
+    worker(error)
+    with pytest.raises(type(error)) as raised:
+        asyncio.run(tasks.RemoteTracker().fetch_month(search()))
+    assert vars(raised.value) == vars(error)
+
+def test_other_errors_become_runtime_errors(worker):
+    worker(ValueError("calendar did not render"))
+    with pytest.raises(RuntimeError, match="ValueError: calendar did not render"):
+        asyncio.run(tasks.RemoteTracker().fetch_month(search()))
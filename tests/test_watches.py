@@ -0,0 +1,124 @@
+"""
+Watch specs, recipient validation and matching watches against stored months
+"""
+
+import argparse
+
+import pytest
+from pydantic import ValidationError
+
+import cli
+import watches
+from change_detection import ChangeType
+from models import WatchSpec
+from watches import WatchRegistry
+
+def spec(**fields) -> WatchSpec:
+    return WatchSpec(**{"origin": "LHR", "destination": "BLR", "start_date": "2025-10-19",
+                        "end_date": "2025-10-20", "cabin": "upper_class", **fields})
+
+@pytest.mark.parametrize("recipient", [
+    "email:me@example.com",
+    "sms:+447700900123",
+    "imessage:+14129616513",
+    "webhook:https://hooks.example.com/seats",
+])
+def test_well_formed_recipients(recipient):
+    assert spec(recipients=[recipient]).recipients == [recipient]
+
+@pytest.mark.parametrize("recipient", [
+    # Quotes would have ended the AppleScript string the number used to be pasted into
+    'imessage:+14129616513" \nend tell\ndo shell script "id',
+    "imessage:4129616513",
+    "imessage:+14129616513\n",
+    "sms:+44 7700 900123",
+    "email:not an email",
+    "email:me@example.com\nBcc: everyone@example.com",
+    "webhook:file:///etc/passwd",
+    "fax:+447700900123",
+    "email",
+])
+def test_malformed_recipients_are_rejected(recipient):
+    with pytest.raises(ValidationError):
+        spec(recipients=[recipient])
+
+def test_window_is_checked():
+    with pytest.raises(ValidationError):
+        spec(start_date="2025-10-20", end_date="2025-10-19", recipients=["email:me@example.com"])
+    with pytest.raises(ValidationError):
+        spec(end_date="2026-12-31", recipients=["email:me@example.com"])
+
+@pytest.fixture
+def registry():
+    registry = WatchRegistry(":memory:")
+    yield registry
+    registry.close()
+
+def row(day: int, points, cabin: str = "upper_class", airline: str = "virgin_atlantic") -> dict:
+    return {"airline": airline, "origin": "LHR", "destination": "BLR", "travel_date": f"2025-10-{day:02d}",
+            "cabin": cabin, "points": points, "available": int(points is not None)}
+
+def check(registry, rows):
+    """One scheduler check's worth: match, then remember as if the alerts were queued"""
+    matched, seen = registry.match(rows)
+    registry.remember(seen)
+    return {recipient: [(c.travel_date, c.kind, c.old_points, c.new_points) for c in changes]
+            for recipient, changes in matched.items()}
+
+def test_seats_already_there_fire_once(registry):
+    registry.add(spec(recipients=["email:me@example.com"]))
+    # No diff would see these: the month's first scrape, or seats that predate the watch
+    rows = [row(19, 47500), row(20, None), row(21, 10000)]
+    assert check(registry, rows) == {"email:me@example.com": [("2025-10-19", ChangeType.SEAT_APPEARED, None, 47500)]}
+    assert check(registry, rows) == {}
+
+def test_only_drops_below_what_was_seen_fire_again(registry):
+    registry.add(spec(recipients=["email:me@example.com"]))
+    check(registry, [row(19, 47500)])
+    assert check(registry, [row(19, 57500)]) == {}
+    assert check(registry, [row(19, 50000)]) == {
+        "email:me@example.com": [("2025-10-19", ChangeType.POINTS_DROPPED, 57500, 50000)]}
+
+def test_seat_that_comes_back_fires_again(registry):
+    registry.add(spec(recipients=["email:me@example.com"]))
+    check(registry, [row(19, 47500)])
+    assert check(registry, [row(19, None)]) == {}
+    assert check(registry, [row(19, 47500)]) == {
+        "email:me@example.com": [("2025-10-19", ChangeType.SEAT_APPEARED, None, 47500)]}
+
+def test_ceiling_cabin_and_airline(registry):
+    registry.add(spec(max_points=50000, airline="virgin_atlantic", recipients=["email:me@example.com"]))
+    rows = [row(19, 60000), row(19, 10000, cabin="economy"), row(20, 40000, airline="british_airways")]
+    assert check(registry, rows) == {}
+    # Dropping under the ceiling counts as the seat turning up for this watch
+    assert check(registry, [row(19, 50000)]) == {
+        "email:me@example.com": [("2025-10-19", ChangeType.SEAT_APPEARED, None, 50000)]}
+
+def test_each_seat_once_per_recipient(registry):
+    registry.add(spec(recipients=["email:me@example.com"]))
+    registry.add(spec(end_date="2025-10-31", recipients=["email:me@example.com", "sms:+447700900123"]))
+    matched = check(registry, [row(19, 47500), row(25, 47500)])
+    assert [seat[0] for seat in matched["email:me@example.com"]] == ["2025-10-19", "2025-10-25"]
+    assert [seat[0] for seat in matched["sms:+447700900123"]] == ["2025-10-19", "2025-10-25"]
+
+def test_nothing_is_remembered_until_asked(registry):
+    registry.add(spec(recipients=["email:me@example.com"]))
+    registry.match([row(19, 47500)])
+    # The alerts were never queued, so they come round again
+    assert check(registry, [row(19, 47500)]) != {}
+
+def test_removing_a_watch_forgets_what_it_saw(registry):
+    watch = registry.add(spec(recipients=["email:me@example.com"]))
+    check(registry, [row(19, 47500)])
+    registry.remove(watch.id)
+    assert registry.conn.execute("SELECT COUNT(*) FROM watch_alerts").fetchone()[0] == 0
+    assert check(registry, [row(19, 47500)]) == {}
+
+def test_cli_reports_an_invalid_watch(monkeypatch, capsys, tmp_path):
+    monkeypatch.setattr(watches, "watches_path", lambda config: str(tmp_path / "watches.db"))
+    args = argparse.Namespace(action="add", origin="LHR", destination="BLR", start="2025-10-19", end="2025-10-20",
+                              cabin=None, max_points=None, airline=None, notify=["imessage:4129616513"])
+    assert cli.cmd_watch(args) == 1
+    assert capsys.readouterr().err.startswith("Invalid watch: Value error, recipient 'imessage:")
+    args.notify = ["imessage:+14129616513"]
+    assert cli.cmd_watch(args) == 0
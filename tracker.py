@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+RewardSeatTracker: one browser, a page pool and per-host politeness behind fetch()
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+from airlines import AirlineAdapter, get_adapter
+from browser_factory import start_browser
+from browser_pool import BrowserPool, PoolExhausted
+from change_detection import detect_changes
+from metrics import span
+from models import FlightResult, FlightSearch, UnsupportedAirline, calendar_to_results
+from politeness import Blocked, CircuitOpen, Politeness
+from readiness import AdaptiveTimeouts
+from refresh import MonthFetch
+from storage import AvailabilityStore
+
+logger = logging.getLogger(__name__)
+
+class RewardSeatTracker:
+    def __init__(self, pool_settings: Dict[str, Any] = None, base_urls: Optional[Dict[str, str]] = None,
+                 fetch_mode: str = "api", store: Optional[AvailabilityStore] = None,
+                 browser_profile: Optional[str] = None, politeness: Optional[Politeness] = None):
+        self.browser = None
+        self.browser_profile = browser_profile
+        self.pool = None
+        self.pool_settings = pool_settings or {}
+        # Per-airline site overrides, e.g. the benchmark fixture server
+        self.base_urls = base_urls or {}
+        self.adapters: Dict[str, AirlineAdapter] = {}
+        # "api" captures the availability XHR and falls back to "dom" scraping
+        self.fetch_mode = fetch_mode
+        self.timeouts = AdaptiveTimeouts()
+        self.store = store
+        # Per-host rate and circuit breaker, shared by every search path
+        self.politeness = politeness or Politeness()
+        
+    async def start_browser(self):
+        """Initialize the browser session and the page pool"""
+        self.browser = await start_browser(self.browser_profile)
+        self.pool = BrowserPool(self.browser, **self.pool_settings)
+        await self.pool.start()
+        
+    async def close_browser(self):
+        """Close browser and cleanup"""
+        self.timeouts.save()
+        if self.pool:
+            await self.pool.close()
+        if self.browser:
+            await self.browser.close()
+        if self.store:
+            self.store.close()
+    
+    def adapter(self, airline: str) -> AirlineAdapter:
+        """The airline's adapter, kept so captured API URLs are reused; raises UnsupportedAirline"""
+        if airline not in self.adapters:
+            self.adapters[airline] = get_adapter(airline, self.base_urls.get(airline))
+        return self.adapters[airline]
+            
+    async def search(self, search: FlightSearch) -> List[FlightResult]:
+        """Search for reward seats, returning [] on scrape errors"""
+        try:
+            return await self.fetch(search)
+        except (PoolExhausted, UnsupportedAirline, Blocked, CircuitOpen):
+            # Propagates so callers can tell throttling or a bad airline from no seats
+            raise
+        except Exception as e:
+            logger.error(f"Error searching {search.airline}: {e}")
+            return []
+    
+    async def fetch(self, search: FlightSearch) -> List[FlightResult]:
+        """Search one airline, raising on scrape errors so callers can retry"""
+        return (await self.fetch_month(search)).results
+
+    async def fetch_month(self, search: FlightSearch, known_hash: Optional[str] = None) -> MonthFetch:
+        """Like fetch, but with the month's content hash; results are None if it still matches known_hash"""
+        adapter = self.adapter(search.airline)
+        host = self.politeness.for_host(urlparse(adapter.base_url).netloc, adapter.name, adapter.rate_limit)
+        probe = await host.acquire()
+        async with self.pool.page() as page:
+            with host.request(probe):
+                calendar, digest = await adapter.fetch_month(page, search, self.timeouts, self.fetch_mode,
+                                                             known_hash)
+        if calendar is None:
+            return MonthFetch(results=None, content_hash=digest)
+        
+        results = calendar_to_results(calendar, search)
+        if self.store:
+            with span("persist", search.airline):
+                # Diffed first so API scrapes reach the change log and live subscribers too
+                detect_changes(self.store, search, results)
+        return MonthFetch(results=results, content_hash=digest)
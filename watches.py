@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Watch registry: many users' alert criteria, indexed by route and travel week so seats only meet relevant watches
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from change_detection import AvailabilityChange, ChangeType
+from models import WatchSpec
+from storage import BASE_DIR, DB_PATH
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS watches (
+    id INTEGER PRIMARY KEY,
+    watch_key TEXT NOT NULL UNIQUE,
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    cabin TEXT,
+    max_points INTEGER,
+    airline TEXT,
+    recipients TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+-- What each watch last saw of a seat it wants, so a seat is reported once, not on every check
+CREATE TABLE IF NOT EXISTS watch_alerts (
+    travel_date TEXT NOT NULL,
+    cabin TEXT NOT NULL,
+    airline TEXT NOT NULL,
+    watch_id INTEGER NOT NULL,
+    points INTEGER NOT NULL,
+    PRIMARY KEY (travel_date, cabin, airline, watch_id)
+);
+"""
+
+INSERT_WATCH = """
+INSERT OR IGNORE INTO watches (watch_key, origin, destination, start_date, end_date, cabin, max_points,
+                               airline, recipients, created_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+UPSERT_ALERT = """
+INSERT INTO watch_alerts (travel_date, cabin, airline, watch_id, points) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (travel_date, cabin, airline, watch_id) DO UPDATE SET points = excluded.points
+"""
+
+# Travel dates per index bucket; a watch is filed under every bucket its window touches
+BUCKET_DAYS = 7
+
+# (travel_date, cabin, airline, watch_id) -> points the watch last saw, None once it no longer qualifies
+AlertState = Dict[Tuple[str, str, str, int], Optional[int]]
+
+@dataclass
+class Watch:
+    id: int
+    origin: str
+    destination: str
+    start: date
+    end: date
+    cabin: Optional[str]
+    max_points: Optional[int]
+    airline: Optional[str]
+    recipients: Tuple[str, ...]
+
+    def covers(self, airline: str, cabin: str, travel_date: date) -> bool:
+        """Whether the watch is about this seat at all, whatever it costs"""
+        if not self.start <= travel_date <= self.end:
+            return False
+        if self.cabin is not None and cabin != self.cabin:
+            return False
+        return self.airline is None or airline == self.airline
+
+    def wants(self, points: Optional[int]) -> bool:
+        return points is not None and (self.max_points is None or points <= self.max_points)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "origin": self.origin,
+            "destination": self.destination,
+            "start_date": self.start.isoformat(),
+            "end_date": self.end.isoformat(),
+            "cabin": self.cabin,
+            "max_points": self.max_points,
+            "airline": self.airline,
+            "recipients": list(self.recipients),
+        }
+
+def watch_key(spec: WatchSpec) -> str:
+    """Same criteria and recipients, same key: re-adding a watch (e.g. from config.json) is a no-op"""
+    fields = spec.model_dump(mode="json")
+    fields["recipients"] = sorted(fields["recipients"])
+    encoded = json.dumps(fields, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(encoded.encode(), digest_size=16).hexdigest()
+
+def _bucket(day: date) -> int:
+    return day.toordinal() // BUCKET_DAYS
+
+class WatchIndex:
+    """Watches by (origin, destination) then travel-date bucket
+
+    Matching a seat looks at one bucket of one route, so its cost
+    follows how many watches cover that route and week, not how many
+    watches exist.
+    """
+
+    def __init__(self):
+        self.watches: Dict[int, Watch] = {}
+        self.buckets: Dict[Tuple[str, str], Dict[int, List[Watch]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.watches)
+
+    def add(self, watch: Watch):
+        self.watches[watch.id] = watch
+        route = self.buckets.setdefault((watch.origin, watch.destination), {})
+        for bucket in range(_bucket(watch.start), _bucket(watch.end) + 1):
+            route.setdefault(bucket, []).append(watch)
+
+    def remove(self, watch_id: int) -> Optional[Watch]:
+        watch = self.watches.pop(watch_id, None)
+        if watch is None:
+            return None
+        route = self.buckets[(watch.origin, watch.destination)]
+        for bucket in range(_bucket(watch.start), _bucket(watch.end) + 1):
+            route[bucket] = [other for other in route[bucket] if other.id != watch_id]
+            if not route[bucket]:
+                del route[bucket]
+        if not route:
+            del self.buckets[(watch.origin, watch.destination)]
+        return watch
+
+    def candidates(self, origin: str, destination: str, travel_date: date) -> List[Watch]:
+        """Watches on the route whose bucket covers travel_date; callers still check the exact window"""
+        return self.buckets.get((origin, destination), {}).get(_bucket(travel_date), [])
+
+    def covering(self, rows: Iterable[Dict[str, Any]]) -> Iterator[Tuple[Watch, Dict[str, Any]]]:
+        """(watch, row) for every stored seat row a watch covers, priced within its ceiling or not"""
+        for row in rows:
+            travel_date = date.fromisoformat(row["travel_date"])
+            for watch in self.candidates(row["origin"], row["destination"], travel_date):
+                if watch.covers(row["airline"], row["cabin"], travel_date):
+                    yield watch, row
+
+def match_rows(pairs: Iterable[Tuple[Watch, Dict[str, Any]]], seen: AlertState
+               ) -> Tuple[Dict[str, List[AvailabilityChange]], AlertState]:
+    """recipient -> seats to tell them about, and the alert state to store once they're queued
+
+    A watch reports a seat the first time it qualifies, and again only
+    when its points drop below what the watch last saw or after it has
+    gone and come back. Each seat goes once to each recipient.
+    """
+    matched: Dict[str, Dict[Tuple[str, str, str], AvailabilityChange]] = {}
+    updates: AlertState = {}
+    for watch, row in pairs:
+        key = (row["travel_date"], row["cabin"], row["airline"], watch.id)
+        points = row["points"]
+        last = seen.get(key)
+        if not watch.wants(points):
+            if last is not None:
+                updates[key] = None
+            continue
+        if points != last:
+            updates[key] = points
+        if last is not None and points >= last:
+            continue
+        change = AvailabilityChange(
+            kind=ChangeType.SEAT_APPEARED if last is None else ChangeType.POINTS_DROPPED,
+            airline=row["airline"], origin=row["origin"], destination=row["destination"],
+            travel_date=row["travel_date"], cabin=row["cabin"], old_points=last, new_points=points,
+        )
+        for recipient in watch.recipients:
+            matched.setdefault(recipient, {}).setdefault((row["travel_date"], row["cabin"], row["airline"]), change)
+    return {
+        recipient: sorted(changes.values(), key=lambda change: (change.travel_date, change.cabin))
+        for recipient, changes in matched.items()
+    }, updates
+
+class WatchRegistry:
+    """Watches stored in SQLite and mirrored in a WatchIndex
+
+    Writes through this registry update the index in place; refresh()
+    reloads it when another process (the API, the CLI) has changed the
+    table since.
+    """
+
+    def __init__(self, path: str = DB_PATH):
+        if path != ":memory:" and not os.path.isabs(path):
+            path = os.path.join(BASE_DIR, path)
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.index = WatchIndex()
+        self._version: Optional[int] = None
+        self.refresh()
+
+    def close(self):
+        self.conn.close()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @staticmethod
+    def _from_row(row: sqlite3.Row) -> Watch:
+        return Watch(
+            id=row["id"],
+            origin=row["origin"],
+            destination=row["destination"],
+            start=date.fromisoformat(row["start_date"]),
+            end=date.fromisoformat(row["end_date"]),
+            cabin=row["cabin"],
+            max_points=row["max_points"],
+            airline=row["airline"],
+            recipients=tuple(json.loads(row["recipients"])),
+        )
+
+    def refresh(self, force: bool = False) -> bool:
+        """Rebuild the index if another connection committed changes; returns whether it did"""
+        # data_version only moves for commits made by other connections
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._version and not force:
+            return False
+        index = WatchIndex()
+        for row in self.conn.execute("SELECT * FROM watches"):
+            index.add(self._from_row(row))
+        self.index = index
+        self._version = version
+        return True
+
+    def _insert(self, specs: Iterable[WatchSpec]) -> int:
+        now = time.time()
+        rows = [
+            (watch_key(spec), spec.origin, spec.destination, spec.start_date.isoformat(), spec.end_date.isoformat(),
+             spec.cabin, spec.max_points, spec.airline, json.dumps(spec.recipients), now)
+            for spec in specs
+        ]
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(INSERT_WATCH, rows)
+            return self.conn.total_changes - before
+
+    def add(self, spec: WatchSpec) -> Watch:
+        """Register a watch, or return the existing one with the same criteria and recipients"""
+        self._insert([spec])
+        row = self.conn.execute("SELECT * FROM watches WHERE watch_key = ?", (watch_key(spec),)).fetchone()
+        watch = self._from_row(row)
+        if watch.id not in self.index.watches:
+            self.index.add(watch)
+        return watch
+
+    def add_many(self, specs: Iterable[WatchSpec]) -> int:
+        """Bulk insert in one transaction; returns how many were new"""
+        added = self._insert(specs)
+        if added:
+            self.refresh(force=True)
+        return added
+
+    def remove(self, watch_id: int) -> bool:
+        with self.conn:
+            deleted = self.conn.execute("DELETE FROM watches WHERE id = ?", (watch_id,)).rowcount
+            self.conn.execute("DELETE FROM watch_alerts WHERE watch_id = ?", (watch_id,))
+        self.index.remove(watch_id)
+        return bool(deleted)
+
+    def get(self, watch_id: int) -> Optional[Watch]:
+        return self.index.watches.get(watch_id)
+
+    def list(self, origin: Optional[str] = None, destination: Optional[str] = None) -> List[Watch]:
+        return [
+            watch for watch in sorted(self.index.watches.values(), key=lambda watch: watch.id)
+            if (origin is None or watch.origin == origin) and (destination is None or watch.destination == destination)
+        ]
+
+    def match(self, rows: Iterable[Dict[str, Any]]) -> Tuple[Dict[str, List[AvailabilityChange]], AlertState]:
+        """Match a fetched month's current rows (AvailabilityStore.latest_snapshot) against every watch
+
+        Nothing is recorded: pass the returned state to remember() once
+        the alerts are safely queued.
+        """
+        pairs = list(self.index.covering(rows))
+        if not pairs:
+            return {}, {}
+        dates = [row["travel_date"] for _, row in pairs]
+        seen: AlertState = {
+            (row["travel_date"], row["cabin"], row["airline"], row["watch_id"]): row["points"]
+            for row in self.conn.execute("SELECT * FROM watch_alerts WHERE travel_date BETWEEN ? AND ?",
+                                         (min(dates), max(dates)))
+        }
+        return match_rows(pairs, seen)
+
+    def remember(self, updates: AlertState):
+        with self.conn:
+            self.conn.executemany(UPSERT_ALERT, [(*key, points) for key, points in updates.items()
+                                                 if points is not None])
+            self.conn.executemany(
+                "DELETE FROM watch_alerts WHERE travel_date = ? AND cabin = ? AND airline = ? AND watch_id = ?",
+                [key for key, points in updates.items() if points is None])
+
+    def sync_config(self, config: Dict[str, Any]) -> int:
+        """Register the watches listed under "watches" in config.json"""
+        return self.add_many(WatchSpec(**watch) for watch in config.get("watches", []))
+
+def watches_path(config: Dict[str, Any]) -> str:
+    """Watches live next to the availability history"""
+    return config.get("storage", {}).get("path", DB_PATH)
+
+if __name__ == "__main__":
+    import sys
+
+    from cli import main
+
+    sys.exit(main(["watch", *sys.argv[1:]]))